@@ -0,0 +1,599 @@
+"""
+HeatSeeker data-access layer - Async repository over players.db
+
+Every query runs on one dedicated worker thread that owns the SQLite
+connection, so blocking database work never stalls the Discord event loop.
+Each call opens its own cursor instead of sharing a module-level one.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('HeatSeeker')
+
+DB_PATH = "players.db"
+
+# Columns returned by get_player
+PLAYER_COLUMNS = ('id', 'username', 'mmr', 'wins', 'losses',
+                  'placement_matches_remaining', 'is_placed')
+
+# Columns of the player dicts returned by fetch_match_rosters
+ROSTER_COLUMNS = ('id', 'username', 'mmr', 'wins', 'losses', 'mmr_before',
+                  'mmr_after')
+
+# Filter used by the combined (ranked + placement) leaderboard
+ACTIVE_PLAYER_FILTER = "wins > 0 OR losses > 0 OR placement_matches_remaining < 5"
+
+# Connection tuning applied to every connection that opens players.db
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",  # readers no longer block the writer
+    "PRAGMA synchronous = NORMAL",  # safe with WAL, far fewer fsyncs
+    "PRAGMA cache_size = -16000",  # ~16 MB page cache
+    "PRAGMA mmap_size = 134217728",  # 128 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Secondary indexes for the hot queries (created by migrations.py)
+INDEXES = (
+    # Leaderboard pages and rank positions: WHERE is_placed = 1 ORDER BY mmr DESC
+    # (covering, so pages never touch the table)
+    "CREATE INDEX IF NOT EXISTS idx_players_placed_mmr ON players (is_placed, mmr DESC, id, username, wins, losses)",
+    # restore_active_matches and result claims: WHERE winner IS NULL
+    "CREATE INDEX IF NOT EXISTS idx_matches_winner ON matches (winner)",
+    # generate_match_hsm_number: MAX(hsm_number)
+    "CREATE INDEX IF NOT EXISTS idx_matches_hsm_number ON matches (hsm_number)",
+    # Private chat lookups by owner and active HSM numbers
+    "CREATE INDEX IF NOT EXISTS idx_private_chats_active ON private_chats (is_active, creator_id)",
+)
+
+
+def apply_pragmas(conn):
+    """Enable WAL and the tuned cache/sync settings on a connection"""
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+
+
+def insert_match_participants(cursor, match_id, team1, team2):
+    """Record both rosters of a new match with each player's pre-match MMR"""
+    cursor.executemany(
+        "INSERT OR REPLACE INTO match_participants (match_id, player_id, team, mmr_before) VALUES (?, ?, ?, ?)",
+        [(match_id, player['id'], team, player['mmr'])
+         for team, players in ((1, team1), (2, team2)) for player in players])
+
+
+def fetch_match_rosters(cursor, match_ids):
+    """Return {match_id: {1: [player dicts], 2: [player dicts]}} in one JOIN
+
+    Player dicts carry id, username, current mmr, wins, losses and the
+    match's mmr_before/mmr_after. Unknown players are skipped.
+    """
+    match_ids = list(match_ids)
+    rosters = {match_id: {1: [], 2: []} for match_id in match_ids}
+    if not match_ids:
+        return rosters
+    cursor.execute(
+        f"""
+        SELECT mp.match_id, mp.team, p.id, p.username, p.mmr, p.wins, p.losses,
+               mp.mmr_before, mp.mmr_after
+        FROM match_participants mp
+        JOIN players p ON p.id = mp.player_id
+        WHERE mp.match_id IN ({', '.join('?' * len(match_ids))})
+        ORDER BY mp.match_id, mp.team, mp.rowid
+    """, match_ids)
+    for row in cursor.fetchall():
+        match_id, team = row[0], row[1]
+        rosters[match_id][team].append(dict(zip(ROSTER_COLUMNS, row[2:])))
+    return rosters
+
+
+def fetch_recent_teammates(cursor, player_ids, match_limit=20):
+    """Return {frozenset((a, b)): times} for pairs of player_ids that were
+    teammates in a match among each one's own last match_limit matches"""
+    player_ids = list(player_ids)
+    if len(player_ids) < 2:
+        return {}
+    cursor.execute(
+        f"""
+        WITH recent AS (
+            SELECT match_id, player_id, team FROM (
+                SELECT match_id, player_id, team,
+                       ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY match_id DESC) AS n
+                FROM match_participants
+                WHERE player_id IN ({', '.join('?' * len(player_ids))}))
+            WHERE n <= ?)
+        SELECT a.player_id, b.player_id, COUNT(*)
+        FROM recent a
+        JOIN recent b
+          ON b.match_id = a.match_id AND b.team = a.team AND b.player_id > a.player_id
+        GROUP BY a.player_id, b.player_id
+    """, player_ids + [match_limit])
+    return {frozenset((a, b)): times for a, b, times in cursor.fetchall()}
+
+
+def record_mmr_after(cursor, match_id, deltas=None):
+    """Set each participant's mmr_after to mmr_before plus their delta
+
+    deltas maps player id -> MMR change for this match; players missing from
+    it (ties, cancellations) get mmr_after = mmr_before. players.mmr is not
+    read, since it already includes any match played after this one.
+    """
+    cursor.execute(
+        "UPDATE match_participants SET mmr_after = mmr_before WHERE match_id = ?",
+        (match_id, ))
+    cursor.executemany(
+        "UPDATE match_participants SET mmr_after = mmr_before + ? WHERE match_id = ? AND player_id = ?",
+        [(delta, match_id, player_id)
+         for player_id, delta in (deltas or {}).items()])
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error(f"DATABASE: Background write failed: {future.exception()}")
+
+
+class Database:
+    """Awaitable repository; all SQLite calls run on a single worker thread"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix="heatseeker-db")
+
+    def _connection(self):
+        """Open the connection lazily on the worker thread"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            apply_pragmas(self._conn)
+        return self._conn
+
+    def _call(self, func, args):
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            return func(conn, cursor, *args)
+        finally:
+            cursor.close()
+
+    async def run(self, func, *args):
+        """Run func(conn, cursor, *args) on the worker thread and await it"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, func,
+                                          args)
+
+    def submit(self, func, *args):
+        """Queue func(conn, cursor, *args) on the worker thread, not awaited
+
+        Calls run in submission order with every other query; failures are
+        logged instead of raised.
+        """
+        future = self._executor.submit(self._call, func, args)
+        future.add_done_callback(_log_failure)
+        return future
+
+    def close(self):
+        """Close the connection and stop the worker thread"""
+        if self._conn is not None:
+            self._executor.submit(self._conn.close).result()
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+    # Generic helpers
+    async def execute(self, sql, params=()):
+        """Execute a write statement and commit it"""
+
+        def _execute(conn, cursor):
+            cursor.execute(sql, params)
+            conn.commit()
+            return cursor.rowcount
+
+        return await self.run(_execute)
+
+    async def fetchone(self, sql, params=()):
+        """Execute a query and return the first row"""
+
+        def _fetchone(conn, cursor):
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+
+        return await self.run(_fetchone)
+
+    async def fetchall(self, sql, params=()):
+        """Execute a query and return all rows"""
+
+        def _fetchall(conn, cursor):
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+        return await self.run(_fetchall)
+
+    # Player repository
+    async def get_player(self, player_id):
+        """Return a player row as a dict, or None if the player is unknown"""
+
+        def _get_player(conn, cursor):
+            cursor.execute(
+                f"SELECT {', '.join(PLAYER_COLUMNS)} FROM players WHERE id = ?",
+                (str(player_id), ))
+            row = cursor.fetchone()
+            return dict(zip(PLAYER_COLUMNS, row)) if row else None
+
+        return await self.run(_get_player)
+
+    async def get_players(self, player_ids):
+        """Return {player_id: player dict} for many players in one query"""
+        player_ids = [str(player_id) for player_id in player_ids]
+
+        def _get_players(conn, cursor):
+            players = {}
+            if player_ids:
+                cursor.execute(
+                    f"SELECT {', '.join(PLAYER_COLUMNS)} FROM players WHERE id IN ({', '.join('?' * len(player_ids))})",
+                    player_ids)
+                for row in cursor.fetchall():
+                    players[row[0]] = dict(zip(PLAYER_COLUMNS, row))
+            return players
+
+        return await self.run(_get_players)
+
+    async def add_or_update_player(self, player_id, display_name):
+        """Create a new player (with placement matches) or refresh their name"""
+
+        def _add_or_update(conn, cursor):
+            cursor.execute("SELECT 1 FROM players WHERE id = ?",
+                           (player_id, ))
+            if cursor.fetchone():
+                cursor.execute("UPDATE players SET username = ? WHERE id = ?",
+                               (display_name, player_id))
+                created = False
+            else:
+                cursor.execute(
+                    "INSERT INTO players (id, username, mmr, placement_matches_remaining, is_placed) VALUES (?, ?, ?, ?, ?)",
+                    (player_id, display_name, 1250, 5, 0))
+                created = True
+            conn.commit()
+            return created
+
+        return await self.run(_add_or_update)
+
+    async def apply_match_result(self,
+                                 match_id,
+                                 team_number,
+                                 winning_team,
+                                 losing_team,
+                                 mmr_changes,
+                                 ended_at,
+                                 admin_modified=False):
+        """Write wins/losses, MMR and placement progress for a finished match
+
+        Everything is written in one BEGIN IMMEDIATE transaction, so a crash
+        never leaves half a team updated. Returns a dict of player_id ->
+        (placement_matches_remaining, is_placed) as it was before the update,
+        or None for unknown players. Returns None without writing anything
+        if the match already has a result or was cancelled (a second click).
+        admin_modified flags a result set from the admin panel.
+        """
+
+        def _apply(conn, cursor):
+            deltas = mmr_changes['deltas']
+            participants = [(player, deltas[player['id']], 1, 0)
+                            for player in winning_team]
+            participants += [(player, deltas[player['id']], 0, 1)
+                             for player in losing_team]
+            player_ids = [player['id'] for player, _, _, _ in participants]
+
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                # Claim the match first; only one report can set its winner
+                cursor.execute(
+                    "UPDATE matches SET winner = ?, ended_at = ?, admin_modified = ? WHERE match_id = ? AND winner IS NULL AND COALESCE(cancelled, 0) = 0",
+                    (team_number, ended_at, int(admin_modified), match_id))
+                if cursor.rowcount == 0:
+                    conn.rollback()
+                    return None
+
+                # One prefetch of every participant's placement state
+                cursor.execute(
+                    f"SELECT id, placement_matches_remaining, is_placed FROM players WHERE id IN ({', '.join('?' * len(player_ids))})",
+                    player_ids)
+                placement_before = {row[0]: row[1:] for row in cursor.fetchall()}
+
+                updates = []
+                for player, delta, won, lost in participants:
+                    placement_data = placement_before.get(player['id'])
+                    if not placement_data:
+                        continue
+                    remaining, is_placed = placement_data
+                    if remaining > 0 and is_placed == 0:
+                        remaining -= 1
+                        if remaining == 0:
+                            is_placed = 1
+                            logger.info(
+                                f"PLACEMENT: Player {player['id']} completed placement matches - Final MMR: {player['mmr'] + delta}"
+                            )
+                        else:
+                            logger.info(
+                                f"PLACEMENT: Player {player['id']} - {remaining} placement matches remaining"
+                            )
+                    updates.append((won, lost, delta, remaining, is_placed,
+                                    player['id']))
+
+                cursor.executemany(
+                    "UPDATE players SET wins = wins + ?, losses = losses + ?, mmr = mmr + ?, placement_matches_remaining = ?, is_placed = ? WHERE id = ?",
+                    updates)
+                record_mmr_after(cursor, match_id, deltas)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return {player_id: placement_before.get(player_id)
+                    for player_id in player_ids}
+
+        return await self.run(_apply)
+
+    async def modify_match_result(self, match_id, current_winner, winner_team,
+                                  roster, deltas):
+        """Replace a match's result (admin edit) in one transaction
+
+        current_winner is the winner the edit was based on and roster the
+        match's fetch_match_rosters entry. The old result is reverted from
+        each player's recorded delta, then winner_team (1 or 2, 0 for a
+        tie, -1 to cancel) is applied with deltas (player id -> change,
+        None for ties and cancellations). Returns False without writing if
+        the winner changed since current_winner was read.
+        """
+
+        def _modify(conn, cursor):
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute("SELECT winner FROM matches WHERE match_id = ?",
+                               (match_id, ))
+                row = cursor.fetchone()
+                if row is None or row[0] != current_winner:
+                    conn.rollback()
+                    return False
+
+                # Revert the previous result, using each player's recorded delta
+                if current_winner in (1, 2):
+                    reverts = []
+                    for team in (1, 2):
+                        won = team == current_winner
+                        for player in roster[team]:
+                            if player['mmr_before'] is not None and player[
+                                    'mmr_after'] is not None:
+                                delta = player['mmr_after'] - player[
+                                    'mmr_before']
+                            else:
+                                delta = 25 if won else -25  # legacy match
+                            reverts.append((int(won), int(not won), delta,
+                                            player['id']))
+                    cursor.executemany(
+                        "UPDATE players SET wins = wins - ?, losses = losses - ?, mmr = mmr - ? WHERE id = ?",
+                        reverts)
+
+                # Legacy matches have no pre-match MMR; the reverted MMR is it
+                cursor.execute(
+                    """
+                    UPDATE match_participants
+                    SET mmr_before = (SELECT mmr FROM players WHERE players.id = match_participants.player_id)
+                    WHERE match_id = ? AND mmr_before IS NULL
+                """, (match_id, ))
+
+                # Apply the new result (ties and cancellations change no MMR)
+                if winner_team in (1, 2):
+                    cursor.executemany(
+                        "UPDATE players SET wins = wins + ?, losses = losses + ?, mmr = mmr + ? WHERE id = ?",
+                        [(int(team == winner_team), int(team != winner_team),
+                          deltas[player['id']], player['id'])
+                         for team in (1, 2) for player in roster[team]])
+
+                cursor.execute(
+                    "UPDATE matches SET winner = ?, admin_modified = 1, cancelled = ? WHERE match_id = ?",
+                    (winner_team, int(winner_team == -1), match_id))
+                record_mmr_after(cursor, match_id, deltas)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return True
+
+        return await self.run(_modify)
+
+    async def reset_season(self, starting_mmr):
+        """Reset every player to starting_mmr and placement, and delete all
+        match history, in one transaction"""
+
+        def _reset(conn, cursor):
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute(
+                    "UPDATE players SET mmr = ?, wins = 0, losses = 0, placement_matches_remaining = 5, is_placed = 0",
+                    (starting_mmr, ))
+                cursor.execute("DELETE FROM matches")
+                cursor.execute("DELETE FROM match_participants")
+                cursor.execute(
+                    "DELETE FROM sqlite_sequence WHERE name = 'matches'")
+                cursor.execute("UPDATE private_chats SET is_active = 0")
+                cursor.execute("UPDATE private_matches SET is_active = 0")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        await self.run(_reset)
+
+    # Match repository
+    async def match_rosters(self, match_ids):
+        """Awaitable fetch_match_rosters"""
+
+        def _rosters(conn, cursor):
+            return fetch_match_rosters(cursor, match_ids)
+
+        return await self.run(_rosters)
+
+    async def recent_teammates(self, player_ids):
+        """Awaitable fetch_recent_teammates"""
+
+        def _teammates(conn, cursor):
+            return fetch_recent_teammates(cursor, player_ids)
+
+        return await self.run(_teammates)
+
+    # Leaderboard repository
+    async def page_leaderboard(self, page, per_page, ranked_only=True):
+        """Return one leaderboard page of player rows
+
+        ranked_only=True returns (id, username, mmr, wins, losses) for placed
+        players; otherwise every active player is returned with placement
+        columns, placed players first.
+        """
+        offset = (page - 1) * per_page
+        if ranked_only:
+            sql = """
+                SELECT id, username, mmr, wins, losses
+                FROM players
+                WHERE is_placed = 1
+                ORDER BY mmr DESC
+                LIMIT ? OFFSET ?
+            """
+        else:
+            sql = f"""
+                SELECT id, username, mmr, wins, losses, placement_matches_remaining, is_placed
+                FROM players
+                WHERE {ACTIVE_PLAYER_FILTER}
+                ORDER BY
+                    CASE WHEN is_placed = 1 THEN 0 ELSE 1 END,
+                    mmr DESC
+                LIMIT ? OFFSET ?
+            """
+        return await self.fetchall(sql, (per_page, offset))
+
+    async def leaderboard_counts(self):
+        """Return (active players, ranked players, players in placement)"""
+
+        def _counts(conn, cursor):
+            cursor.execute(
+                f"SELECT COUNT(*) FROM players WHERE {ACTIVE_PLAYER_FILTER}")
+            total_active = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM players WHERE is_placed = 1")
+            total_ranked = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT COUNT(*) FROM players WHERE placement_matches_remaining > 0 AND is_placed = 0"
+            )
+            total_placement = cursor.fetchone()[0]
+            return total_active, total_ranked, total_placement
+
+        return await self.run(_counts)
+
+    async def ranked_position(self, mmr):
+        """Return the 1-based position of an MMR among placed players"""
+        row = await self.fetchone(
+            "SELECT COUNT(*) FROM players WHERE mmr > ? AND is_placed = 1",
+            (mmr, ))
+        return row[0] + 1
+
+
+class QueueJournal:
+    """Mirrors queue joins, leaves and settings into players.db
+
+    PlayerQueue calls these hooks on every change; each one is a small
+    committed write handed to the database worker without awaiting, so the
+    queue survives a crash or restart. load() reads everything back in one
+    pass on startup.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        # (guild_id, mode) -> (timeout_minutes, message_id,
+        # ready_check_seconds) as last persisted
+        self._settings = {}
+
+    def settings_of(self, guild_id, mode):
+        """A queue's persisted settings tuple, or None"""
+        return self._settings.get((guild_id, mode))
+
+    def added(self, queue, player):
+        now = time.time()
+        row = (queue.guild_id, queue.mode, player['id'], player['username'],
+               player['mmr'], int(bool(player.get('is_placement'))), now, now)
+
+        def _added(conn, cursor):
+            cursor.execute(
+                "INSERT OR REPLACE INTO queue_entries (guild_id, mode, player_id, username, mmr, is_placement, joined_at, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row)
+            conn.commit()
+
+        self.db.submit(_added)
+
+    def refreshed(self, queue, player_id):
+        row = (time.time(), queue.guild_id, player_id)
+
+        def _refreshed(conn, cursor):
+            cursor.execute(
+                "UPDATE queue_entries SET last_seen = ? WHERE guild_id = ? AND player_id = ?",
+                row)
+            conn.commit()
+
+        self.db.submit(_refreshed)
+
+    def removed(self, queue, player_ids):
+        rows = [(queue.guild_id, player_id) for player_id in player_ids]
+
+        def _removed(conn, cursor):
+            cursor.executemany(
+                "DELETE FROM queue_entries WHERE guild_id = ? AND player_id = ?",
+                rows)
+            conn.commit()
+
+        self.db.submit(_removed)
+
+    def cleared(self, queue):
+        key = (queue.guild_id, queue.mode)
+
+        def _cleared(conn, cursor):
+            cursor.execute(
+                "DELETE FROM queue_entries WHERE guild_id = ? AND mode = ?",
+                key)
+            conn.commit()
+
+        self.db.submit(_cleared)
+
+    def configured(self, queue):
+        row = (queue.guild_id, queue.mode, queue.timeout_minutes,
+               queue.message_id, queue.ready_check_seconds)
+        self._settings[row[:2]] = row[2:]
+
+        def _configured(conn, cursor):
+            cursor.execute(
+                "INSERT OR REPLACE INTO queue_settings (guild_id, mode, timeout_minutes, message_id, ready_check_seconds) VALUES (?, ?, ?, ?, ?)",
+                row)
+            conn.commit()
+
+        self.db.submit(_configured)
+
+    async def load(self):
+        """Return (settings rows, entry rows) of every guild's queues
+
+        The settings are also kept for settings_of().
+
+        Settings rows are (guild_id, mode, timeout_minutes, message_id,
+        ready_check_seconds);
+        entry rows are (guild_id, mode, player_id, username, mmr,
+        is_placement, joined_at, last_seen) in join order.
+        """
+
+        def _load(conn, cursor):
+            cursor.execute(
+                "SELECT guild_id, mode, timeout_minutes, message_id, ready_check_seconds FROM queue_settings"
+            )
+            settings = cursor.fetchall()
+            self._settings = {row[:2]: row[2:] for row in settings}
+            cursor.execute(
+                "SELECT guild_id, mode, player_id, username, mmr, is_placement, joined_at, last_seen FROM queue_entries ORDER BY joined_at"
+            )
+            return settings, cursor.fetchall()
+
+        return await self.db.run(_load)
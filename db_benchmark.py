@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Database Benchmark - Hot bot queries before/after WAL pragmas and the index pack
+
+Generates a players.db-shaped database (100k players, 1M matches by default),
+times the queries the bot runs on every click, then applies the pragmas from
+database.py and the index migration and times them again.
+
+Usage: python db_benchmark.py [players] [matches]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from database import apply_pragmas
+from migrations import run_migrations
+
+# (label, sql, params factory)
+QUERIES = (
+    ("leaderboard page 1",
+     "SELECT id, username, mmr, wins, losses FROM players WHERE is_placed = 1 ORDER BY mmr DESC LIMIT 15 OFFSET 0",
+     lambda: ()),
+    ("leaderboard page 200",
+     "SELECT id, username, mmr, wins, losses FROM players WHERE is_placed = 1 ORDER BY mmr DESC LIMIT 15 OFFSET 3000",
+     lambda: ()),
+    ("global rank (COUNT mmr > ?)",
+     "SELECT COUNT(*) FROM players WHERE mmr > ? AND is_placed = 1",
+     lambda: (random.randint(800, 1800), )),
+    ("ranked player count",
+     "SELECT COUNT(*) FROM players WHERE is_placed = 1", lambda: ()),
+    ("active matches (restore)",
+     "SELECT match_id, team1_players, team2_players, created_at, channel_id FROM matches WHERE winner IS NULL OR winner = 0",
+     lambda: ()),
+    ("next HSM number",
+     "SELECT MAX(hsm_number) FROM matches WHERE hsm_number IS NOT NULL",
+     lambda: ()),
+    ("active private chat by owner",
+     "SELECT hsm_number FROM private_chats WHERE creator_id = ? AND is_active = 1",
+     lambda: (str(random.randint(1, 100000)), )),
+)
+
+
+def generate(path, player_count, match_count):
+    """Fill a fresh database with synthetic players, matches and chats"""
+    conn = sqlite3.connect(path)
+    # Tables and columns only; the index pack (v3) is applied after timing
+    run_migrations(conn, target=2)
+
+    rng = random.Random(42)
+    conn.executemany(
+        "INSERT INTO players VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((str(i), f"Player{i}", rng.randint(600, 2000), rng.randint(0, 200),
+          rng.randint(0, 200), 0 if i % 5 else rng.randint(1, 5),
+          1 if i % 5 else 0) for i in range(1, player_count + 1)))
+
+    def match_rows():
+        for match_id in range(1, match_count + 1):
+            ids = [str(rng.randint(1, player_count)) for _ in range(4)]
+            # The newest handful are still active
+            winner = None if match_id > match_count - 20 else rng.choice(
+                (1, 2))
+            yield (match_id, ','.join(ids[:2]), ','.join(ids[2:]), winner,
+                   "2025-01-01T00:00:00", None, "0", 0, 0, match_id)
+
+    conn.executemany(
+        "INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        match_rows())
+    conn.executemany(
+        "INSERT INTO private_chats VALUES (?, ?, ?, ?, ?, ?)",
+        ((n, str(rng.randint(1, player_count)), "0", "0",
+          "2025-01-01T00:00:00", 1 if n % 10 == 0 else 0)
+         for n in range(1, 10000)))
+    conn.commit()
+    conn.close()
+
+
+def time_queries(conn, repeat=20):
+    """Return {label: average milliseconds} for every benchmark query"""
+    results = {}
+    for label, sql, params in QUERIES:
+        conn.execute(sql, params()).fetchall()  # warm the cache
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params()).fetchall()
+        results[label] = (time.perf_counter() - start) * 1000 / repeat
+    return results
+
+
+def main():
+    player_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    match_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_players.db")
+        print(f"📦 Generating {player_count:,} players and "
+              f"{match_count:,} matches...")
+        start = time.perf_counter()
+        generate(path, player_count, match_count)
+        print(f"   done in {time.perf_counter() - start:.1f}s")
+
+        conn = sqlite3.connect(path)
+        before = time_queries(conn)
+        conn.close()
+
+        conn = sqlite3.connect(path)
+        apply_pragmas(conn)
+        start = time.perf_counter()
+        run_migrations(conn)
+        print(f"🔧 Index pack built in {time.perf_counter() - start:.1f}s")
+        after = time_queries(conn)
+        conn.close()
+
+    print()
+    print(f"{'Query':<32} {'Before (ms)':>12} {'After (ms)':>12} {'Speedup':>9}")
+    print("=" * 68)
+    for label, _, _ in QUERIES:
+        speedup = before[label] / after[label] if after[label] else float(
+            'inf')
+        print(f"{label:<32} {before[label]:>12.3f} {after[label]:>12.3f} "
+              f"{speedup:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
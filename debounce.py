@@ -0,0 +1,67 @@
+"""
+HeatSeeker debounce - Coalesce bursts of Discord updates
+
+Refreshing a message on every click burns API calls and hits rate limits
+during join/leave bursts. A Debouncer runs at most one call per key every
+interval seconds: the first request runs right away, requests arriving
+inside the interval are merged, and only the latest one runs when the
+interval is up.
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger('HeatSeeker')
+
+# Default minimum seconds between two calls for the same key
+DEFAULT_INTERVAL = 1.5
+
+
+class Debouncer:
+    """At most one call per key per interval, latest request wins"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, clock=time.monotonic):
+        self.interval = interval
+        self.clock = clock
+        self._pending = {}  # key -> latest coroutine function
+        self._last_run = {}  # key -> clock() of the last call
+        self._tasks = {}  # key -> task draining that key
+
+    def __contains__(self, key):
+        return key in self._pending
+
+    def schedule(self, key, func):
+        """Run func() (a coroutine function) for key, merged with any
+        request already waiting; must be called from the event loop"""
+        self._pending[key] = func
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.get_running_loop().create_task(
+                self._drain(key))
+
+    async def _drain(self, key):
+        try:
+            while key in self._pending:
+                last_run = self._last_run.get(key)
+                if last_run is not None:
+                    wait = last_run + self.interval - self.clock()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                func = self._pending.pop(key)
+                self._last_run[key] = self.clock()
+                try:
+                    await func()
+                except Exception as e:
+                    logger.error(f"DEBOUNCE: Update for {key} failed: {e}")
+        finally:
+            del self._tasks[key]
+            self._forget_stale()
+
+    def _forget_stale(self):
+        """Drop last-run times older than the interval (no longer limiting)"""
+        now = self.clock()
+        for key in [
+                key for key, last_run in self._last_run.items()
+                if now - last_run >= self.interval and key not in self._tasks
+        ]:
+            del self._last_run[key]
@@ -4,6 +4,7 @@ import sqlite3
 import asyncio
 import random
 from datetime import datetime
+from migrations import run_migrations
 
 # Bot setup
 intents = discord.Intents.default()
@@ -21,25 +22,9 @@ QUEUE_CHANNEL_NAME = "2v2-queue"  # Change this to your channel name
 # Database setup
 conn = sqlite3.connect("players.db")
 c = conn.cursor()
-c.execute('''CREATE TABLE IF NOT EXISTS players (
-    id TEXT PRIMARY KEY,
-    username TEXT,
-    mmr INTEGER DEFAULT 1000,
-    wins INTEGER DEFAULT 0,
-    losses INTEGER DEFAULT 0
-)''')
 
-# Create matches table
-c.execute('''CREATE TABLE IF NOT EXISTS matches (
-    match_id INTEGER PRIMARY KEY,
-    team1_players TEXT,
-    team2_players TEXT,
-    winner INTEGER,
-    created_at TEXT,
-    ended_at TEXT,
-    channel_id TEXT
-)''')
-conn.commit()
+# Shared, versioned schema (same tables as main.py)
+run_migrations(conn)
 
 # Add sample data for demonstration
 def add_sample_data():
@@ -0,0 +1,147 @@
+"""
+HeatSeeker guild state - Per-guild in-memory state for multi-server use
+
+Everything the bot keeps in memory about a guild (queues, active matches,
+ready checks, captain drafts, private chats, ping cooldowns, leaderboard
+channel) lives in one GuildState looked up by guild id. States are created
+on first use and evicted once the guild has nothing in flight and has been
+idle for a while, so memory grows with the number of active guilds, not
+joined guilds.
+"""
+
+import time
+
+from matchmaking import (DEFAULT_TIMEOUT_MINUTES, ActiveMatches, PlayerQueue,
+                         size_for_mode)
+
+# Idle guilds are evicted after this many seconds (matches the ping cooldown,
+# so an evicted guild never loses a cooldown that still applies)
+IDLE_EVICTION_SECONDS = 3600
+
+
+class GuildState:
+    """In-memory state of one guild"""
+
+    def __init__(self,
+                 guild_id,
+                 timeout_minutes=DEFAULT_TIMEOUT_MINUTES,
+                 journal=None):
+        self.guild_id = guild_id
+        self.timeout_minutes = timeout_minutes
+        self.journal = journal  # QueueJournal given to every queue
+        self.queues = {}  # mode -> PlayerQueue
+        self.active_matches = ActiveMatches()
+        self.captain_draft_state = {}  # draft_id -> draft data
+        self.pending_team_selection = {}  # hsm_number -> selection data
+        self.private_chats = {}  # hsm_number -> private chat data
+        self.ping_cooldowns = {}  # user id -> datetime of last ping
+        self.ready_checks = {}  # ready check id -> ready check data
+        self.leaderboard_channel = None
+        self.leaderboard_message_id = None  # the one leaderboard message
+        self.leaderboard_version = None  # rank index version last shown
+        self.leaderboard_rows = None  # top rows last shown
+        self.last_used = time.monotonic()
+
+    def get_queue(self, mode):
+        """The queue for mode, created on first use
+
+        A created queue takes its persisted settings back from the journal,
+        so an evicted guild's queues keep their timeout, ready check and
+        display message. Raises ValueError for a mode that is not "<n>v<n>".
+        """
+        queue = self.queues.get(mode)
+        if queue is None:
+            size = size_for_mode(mode)
+            if size is None:
+                raise ValueError(f"Invalid queue mode: {mode}")
+            queue = PlayerQueue(size, self.timeout_minutes)
+            queue.guild_id = self.guild_id
+            queue.journal = self.journal
+            settings = (self.journal.settings_of(self.guild_id, mode)
+                        if self.journal else None)
+            if settings:
+                timeout_minutes, message_id, ready_check_seconds = settings
+                queue.timeout_minutes = timeout_minutes or self.timeout_minutes
+                queue.message_id = int(message_id) if message_id else None
+                queue.ready_check_seconds = ready_check_seconds or 0
+            self.queues[mode] = queue
+        return queue
+
+    def set_leaderboard_channel(self, channel):
+        """Show the leaderboard in channel (its message is looked up anew)"""
+        self.leaderboard_channel = channel
+        self.leaderboard_message_id = None
+        self.leaderboard_version = None
+        self.leaderboard_rows = None
+
+    def queue_list(self):
+        """The guild's queues, smallest format first"""
+        return sorted(self.queues.values(), key=lambda queue: queue.size)
+
+    def queue_of(self, player_id):
+        """The queue a player is waiting in, or None"""
+        for queue in self.queues.values():
+            if player_id in queue:
+                return queue
+        return None
+
+    def ready_check_of(self, player_id):
+        """The ready check a player is part of, or None"""
+        for check in self.ready_checks.values():
+            if any(player['id'] == player_id for player in check['players']):
+                return check
+        return None
+
+    def is_idle(self):
+        """True when nothing is in flight that eviction would lose"""
+        return (not any(self.queues.values()) and not self.active_matches
+                and not self.captain_draft_state
+                and not self.pending_team_selection and not self.private_chats
+                and not self.ready_checks
+                and self.leaderboard_channel is None)
+
+
+class GuildStates:
+    """GuildState per guild id, created lazily and evicted when idle"""
+
+    def __init__(self,
+                 timeout_minutes=DEFAULT_TIMEOUT_MINUTES,
+                 idle_seconds=IDLE_EVICTION_SECONDS,
+                 clock=time.monotonic,
+                 journal=None):
+        self.timeout_minutes = timeout_minutes
+        self.journal = journal
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self._states = {}
+
+    def __len__(self):
+        return len(self._states)
+
+    def __iter__(self):
+        """The current states; safe to evict while looping"""
+        return iter(list(self._states.values()))
+
+    def get(self, guild_id):
+        """The guild's state, created on first use; marks it as used"""
+        state = self._states.get(guild_id)
+        if state is None:
+            state = GuildState(guild_id, self.timeout_minutes, self.journal)
+            self._states[guild_id] = state
+        state.last_used = self.clock()
+        return state
+
+    def peek(self, guild_id):
+        """The guild's state if it exists, without creating or touching it"""
+        return self._states.get(guild_id)
+
+    def evict_idle(self, now=None):
+        """Drop idle states unused for idle_seconds; returns their guild ids"""
+        now = self.clock() if now is None else now
+        evicted = [
+            guild_id for guild_id, state in self._states.items()
+            if now - state.last_used >= self.idle_seconds and state.is_idle()
+        ]
+        for guild_id in evicted:
+            del self._states[guild_id]
+        return evicted
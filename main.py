@@ -6,9 +6,25 @@ import sqlite3
 import asyncio
 import random
 import os
+import itertools
 import logging
-from datetime import datetime, timedelta
-from itertools import combinations
+import time
+from datetime import datetime
+from database import (Database, QueueJournal, apply_pragmas,
+                      fetch_match_rosters, insert_match_participants)
+from migrations import run_migrations
+import mmr_engine
+import team_balancer
+from matchmaking import mode_for_size
+from guild_state import GuildStates
+from debounce import Debouncer
+from scheduler import DeadlineScheduler
+from role_cache import RoleCache
+from rank_sync import RankSync
+from rank_index import RankIndex
+from rank_tiers import RankTable, load_rank_tiers
+from page_cache import VersionedCache
+from role_executor import RoleExecutor
 
 # Setup logging system
 logging.basicConfig(level=logging.INFO,
@@ -27,27 +43,20 @@ intents.members = True  # إضافة صلاحية الأعضاء للرتب ال
 bot = commands.Bot(command_prefix="!", intents=intents)
 
 # Global variables for queue and match system
-player_queue = []
-active_matches = {}
+# (per-guild state - queues, active matches, drafts, private chats, ping
+# cooldowns, leaderboard channel - lives in guild_states, see guild_state())
 match_id_counter = 1
 queue_timeout_task = None
-queue_last_activity = None
-pending_team_selection = {}  # Store pending team selection data
-captain_draft_state = {}  # Store captain draft state
 
-# Dynamic queue configuration
-QUEUE_SIZE = 2  # Default queue size (changed from 4 to 2)
-TEAM_SIZE = 1  # Default team size (1v1 instead of 2v2)
+# Queue configuration - every guild can run several formats ("1v1", "2v2",
+# ...) at once, each with its own queue, size, timeout and matchmaker
+DEFAULT_QUEUE_MODE = "1v1"  # Queue used by /queue and on first startup
+TEAM_BALANCE_TIME_BUDGET = 0.05  # Seconds the team search may take per match
 leaderboard_task = None  # For auto-updating leaderboard
-leaderboard_channel = None  # Store leaderboard channel
 
 # Global variables for private chat system
-private_chats = {}  # Store private chat data
 used_hsm_numbers = set()  # Track used HSM numbers
 
-# Global variable for ping cooldown system
-ping_cooldowns = {}  # Store last ping times by user ID
-
 # Channel configuration
 QUEUE_CHANNEL_NAME = "heatseeker-queue"  # Main queue channel
 RESULTS_CHANNEL_NAME = "heatseeker-results"  # Results channel for completed matches
@@ -117,80 +126,26 @@ RANK_ROLES = {
     }
 }
 
+# Tiers can be replaced by a JSON file of the same shape (see rank_tiers.py)
+RANK_TIERS_FILE = os.getenv('RANK_TIERS_FILE', 'rank_tiers.json')
+RANK_ROLES = load_rank_tiers(RANK_TIERS_FILE, RANK_ROLES)
+
 # قاعدة البيانات
-conn = sqlite3.connect("players.db")
+# Legacy synchronous connection, used on the event loop by startup code and
+# match creation. It is a second writer next to db's worker thread (whose
+# BEGIN IMMEDIATE transactions hold the write lock), so it waits at most
+# LEGACY_DB_TIMEOUT seconds for the lock instead of sqlite's default 5;
+# admin and result writes go through db.
+LEGACY_DB_TIMEOUT = 1.0
+conn = sqlite3.connect("players.db", timeout=LEGACY_DB_TIMEOUT)
+apply_pragmas(conn)
 c = conn.cursor()
-c.execute('''CREATE TABLE IF NOT EXISTS players (
-    id TEXT PRIMARY KEY,
-    username TEXT,
-    mmr INTEGER DEFAULT 1000,
-    wins INTEGER DEFAULT 0,
-    losses INTEGER DEFAULT 0,
-    placement_matches_remaining INTEGER DEFAULT 5,
-    is_placed INTEGER DEFAULT 0
-)''')
-
-# Add new columns for existing players
-try:
-    c.execute(
-        "ALTER TABLE players ADD COLUMN placement_matches_remaining INTEGER DEFAULT 5"
-    )
-    conn.commit()
-    print("[DEBUG] Added placement_matches_remaining column")
-except sqlite3.OperationalError:
-    # Column already exists
-    pass
 
-try:
-    c.execute("ALTER TABLE players ADD COLUMN is_placed INTEGER DEFAULT 0")
-    conn.commit()
-    print("[DEBUG] Added is_placed column")
-except sqlite3.OperationalError:
-    # Column already exists
-    pass
-
-# Create matches table for queue system
-c.execute('''CREATE TABLE IF NOT EXISTS matches (
-    match_id INTEGER PRIMARY KEY,
-    team1_players TEXT,
-    team2_players TEXT,
-    winner INTEGER,
-    created_at TEXT,
-    ended_at TEXT,
-    channel_id TEXT,
-    admin_modified INTEGER DEFAULT 0,
-    cancelled INTEGER DEFAULT 0,
-    hsm_number INTEGER
-)''')
-
-# Add hsm_number column if it doesn't exist (for existing databases)
-try:
-    c.execute("ALTER TABLE matches ADD COLUMN hsm_number INTEGER")
-    conn.commit()
-    print("[DEBUG] Added hsm_number column to matches table")
-except sqlite3.OperationalError:
-    # Column already exists
-    pass
-
-# Create private chats table
-c.execute('''CREATE TABLE IF NOT EXISTS private_chats (
-    hsm_number INTEGER PRIMARY KEY,
-    creator_id TEXT,
-    channel_id TEXT,
-    voice_channel_id TEXT,
-    created_at TEXT,
-    is_active INTEGER DEFAULT 1
-)''')
-
-# Create private matches table for queue participants
-c.execute('''CREATE TABLE IF NOT EXISTS private_matches (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id TEXT NOT NULL,
-    channel_id TEXT NOT NULL,
-    created_at TEXT NOT NULL,
-    is_active INTEGER DEFAULT 1
-)''')
-conn.commit()
+# Bring the schema up to date (no-op when already current)
+run_migrations(conn)
+
+# Async repository - runs queries off the event loop on its own worker thread
+db = Database("players.db")
 
 
 def initialize_match_counter():
@@ -211,33 +166,45 @@ def initialize_match_counter():
 
 
 def restore_active_matches():
-    """Restore active matches from database on bot restart"""
-    global active_matches
+    """Restore active matches from database on bot restart
+
+    Each match goes back into the state of the guild owning its match
+    channel; matches whose channel is gone are cancelled.
+    """
+    restored_guilds = set()
     try:
-        # Get all matches that don't have a winner set (active matches)
+        # Get all matches that can still be reported (no winner, not
+        # cancelled); winner = 0 is a tie and already decided
         c.execute("""
-            SELECT match_id, team1_players, team2_players, created_at, channel_id
+            SELECT match_id, created_at, channel_id
             FROM matches 
-            WHERE winner IS NULL OR winner = 0
+            WHERE winner IS NULL AND COALESCE(cancelled, 0) = 0
         """)
         db_matches = c.fetchall()
 
+        # Both rosters of every active match in one JOIN
+        rosters = fetch_match_rosters(c, [row[0] for row in db_matches])
+
         restored_count = 0
         cancelled_count = 0
 
-        for match_id, team1_ids, team2_ids, created_at, channel_id in db_matches:
+        for match_id, created_at, channel_id in db_matches:
+            team1 = [{
+                'id': p['id'],
+                'username': p['username'],
+                'mmr': p['mmr']
+            } for p in rosters[match_id][1]]
+            team2 = [{
+                'id': p['id'],
+                'username': p['username'],
+                'mmr': p['mmr']
+            } for p in rosters[match_id][2]]
             logger.info(
-                f"RESTORE: Processing match {match_id} - team1: '{team1_ids}', team2: '{team2_ids}'"
+                f"RESTORE: Processing match {match_id} - team1: {[p['id'] for p in team1]}, team2: {[p['id'] for p in team2]}"
             )
 
-            # Parse team player IDs
-            team1_player_ids = team1_ids.split(
-                ',') if team1_ids and team1_ids.strip() else []
-            team2_player_ids = team2_ids.split(
-                ',') if team2_ids and team2_ids.strip() else []
-
             # Check for empty teams
-            if not team1_player_ids or not team2_player_ids:
+            if not team1 or not team2:
                 logger.warning(
                     f"RESTORE: Match {match_id} has empty team data - cancelling"
                 )
@@ -249,42 +216,11 @@ def restore_active_matches():
                 cancelled_count += 1
                 continue
 
-            # Get player data for each team
-            team1 = []
-            team2 = []
-
-            for player_id in team1_player_ids:
-                if player_id.strip():  # Only process non-empty player IDs
-                    c.execute("SELECT username, mmr FROM players WHERE id = ?",
-                              (player_id.strip(), ))
-                    result = c.fetchone()
-                    if result:
-                        username, mmr = result
-                        team1.append({
-                            'id': player_id.strip(),
-                            'username': username,
-                            'mmr': mmr
-                        })
-
-            for player_id in team2_player_ids:
-                if player_id.strip():  # Only process non-empty player IDs
-                    c.execute("SELECT username, mmr FROM players WHERE id = ?",
-                              (player_id.strip(), ))
-                    result = c.fetchone()
-                    if result:
-                        username, mmr = result
-                        team2.append({
-                            'id': player_id.strip(),
-                            'username': username,
-                            'mmr': mmr
-                        })
-
-            # Check if we have valid team data
-            expected_team_size = QUEUE_SIZE // 2
-            if len(team1) != expected_team_size or len(
-                    team2) != expected_team_size:
+            # Check if we have valid team data (queues can run different
+            # formats, so only require matching team sizes)
+            if len(team1) != len(team2):
                 logger.warning(
-                    f"RESTORE: Match {match_id} has incomplete team data - team1: {len(team1)}, team2: {len(team2)}, expected: {expected_team_size}"
+                    f"RESTORE: Match {match_id} has incomplete team data - team1: {len(team1)}, team2: {len(team2)}"
                 )
                 # Cancel this corrupted match
                 c.execute(
@@ -294,18 +230,29 @@ def restore_active_matches():
                 cancelled_count += 1
                 continue
 
+            # The match channel tells us which guild the match belongs to
+            channel = bot.get_channel(int(channel_id)) if channel_id else None
+            if channel is None or getattr(channel, 'guild', None) is None:
+                logger.warning(
+                    f"RESTORE: Match {match_id} channel no longer exists - cancelling"
+                )
+                c.execute(
+                    "UPDATE matches SET winner = -1, cancelled = 1 WHERE match_id = ?",
+                    (match_id, ))
+                conn.commit()
+                cancelled_count += 1
+                continue
+
             # Generate HSM number (simplified - use match_id as HSM number)
             hsm_number = match_id
 
-            active_matches[match_id] = {
+            restored_guilds.add(channel.guild)
+            guild_state(channel.guild).active_matches[match_id] = {
                 'team1':
                 team1,
                 'team2':
                 team2,
-                'players': [
-                    p.strip() for p in team1_player_ids + team2_player_ids
-                    if p.strip()
-                ],
+                'players': [p['id'] for p in team1 + team2],
                 'channel_id':
                 channel_id,
                 'hsm_number':
@@ -329,7 +276,8 @@ def restore_active_matches():
     except Exception as e:
         logger.error(f"RESTORE: Error restoring active matches: {e}")
         print(f"[DEBUG] Error restoring active matches: {e}")
-        active_matches = {}
+        for guild in restored_guilds:
+            guild_state(guild).active_matches.clear()
 
 
 # Add sample data for demonstration
@@ -379,24 +327,73 @@ def log_player_update(player_name, old_stats, new_stats):
     )
 
 
+# Rank role lookups by name, cached per guild (see role_cache.py)
+RANK_ROLE_NAMES = frozenset(rank['role_name'] for rank in RANK_ROLES.values())
+rank_role_cache = RoleCache(RANK_ROLE_NAMES
+                            | {rank['role_name']
+                               for rank in UNRANK_RANK.values()})
+
+
+def member_rank_roles(guild, member):
+    """The rank roles a member holds, in RANK_ROLES order"""
+    held = {
+        role.name: role
+        for role in rank_role_cache.member_roles(guild, member)
+    }
+    return [
+        held[rank['role_name']] for rank in RANK_ROLES.values()
+        if rank['role_name'] in held
+    ]
+
+
+# Bulk role edits: rank syncs and season resets (see role_executor.py)
+role_executor = RoleExecutor()
+
+
+# Pseudo-rank of players still in placement matches
+PLACEMENT_RANK = {
+    'role_name': 'PLACEMENT',
+    'min_mmr': 0,
+    'max_mmr': 9999,
+    'name': 'PLACEMENT MATCHES',
+    'emoji': '🔄',
+    'color': 0x808080
+}
+
+# RANK_ROLES compiled for bisect lookups; MMRs outside every rank are UNRANKED
+rank_table = RankTable(RANK_ROLES.values(), UNRANK_RANK['UNRANKED'])
+
+
 def get_rank_from_mmr(mmr, is_placed=True):
     """Get rank information based on MMR"""
     # Players in placement matches have no rank
     if not is_placed:
-        return {
-            'role_name': 'PLACEMENT',
-            'min_mmr': 0,
-            'max_mmr': 9999,
-            'name': 'PLACEMENT MATCHES',
-            'emoji': '🔄',
-            'color': 0x808080
-        }
+        return PLACEMENT_RANK
+    return rank_table.lookup(mmr)
 
-    for rank_key, rank_data in RANK_ROLES.items():
-        if rank_data['min_mmr'] <= mmr <= rank_data['max_mmr']:
-            return rank_data
-    # Default to UNRANKED if no match found
-    return UNRANK_RANK['UNRANKED']
+
+async def create_rank_role(guild, rank):
+    """Create a missing rank role; returns it, or None on failure"""
+    try:
+        role = await guild.create_role(
+            name=rank['role_name'],
+            color=discord.Color(rank['color']),
+            reason=f"Auto-created rank role for HeatSeeker system")
+        logger.info(
+            f"RANK SYSTEM: Created new role {rank['role_name']} in {guild.name}")
+        return role
+    except discord.Forbidden:
+        logger.error(
+            f"RANK SYSTEM: No permission to create role {rank['role_name']} in {guild.name}"
+        )
+    except discord.HTTPException as e:
+        logger.error(
+            f"RANK SYSTEM: HTTP error creating role {rank['role_name']}: {e}")
+    except Exception as e:
+        logger.error(
+            f"RANK SYSTEM: Unexpected error creating role {rank['role_name']}: {e}"
+        )
+    return None
 
 
 async def update_player_rank_role(guild, user_id, new_mmr):
@@ -416,53 +413,24 @@ async def update_player_rank_role(guild, user_id, new_mmr):
             return False
 
         # Check if member already has the correct rank
-        current_rank_role = None
-        for rank_data in RANK_ROLES.values():
-            role = discord.utils.get(guild.roles, name=rank_data['role_name'])
-            if role and role in member.roles:
-                current_rank_role = role
-                break
+        held_rank_roles = member_rank_roles(guild, member)
+        current_rank_role = held_rank_roles[0] if held_rank_roles else None
 
         # If they already have the correct rank, skip
-        target_role = discord.utils.get(guild.roles,
-                                        name=new_rank['role_name'])
+        target_role = rank_role_cache.get(guild, new_rank['role_name'])
         if current_rank_role == target_role and target_role:
+            rank_sync.record(str(guild.id), str(user_id), new_rank['role_name'])
             return True
 
         # Find or create the new role
-        new_role = discord.utils.get(guild.roles, name=new_rank['role_name'])
+        new_role = target_role or await create_rank_role(guild, new_rank)
         if not new_role:
-            try:
-                # Create the role if it doesn't exist
-                new_role = await guild.create_role(
-                    name=new_rank['role_name'],
-                    color=discord.Color(new_rank['color']),
-                    reason=f"Auto-created rank role for HeatSeeker system")
-                logger.info(
-                    f"RANK SYSTEM: Created new role {new_rank['role_name']} in {guild.name}"
-                )
-            except discord.Forbidden:
-                logger.error(
-                    f"RANK SYSTEM: No permission to create role {new_rank['role_name']} in {guild.name}"
-                )
-                return False
-            except discord.HTTPException as e:
-                logger.error(
-                    f"RANK SYSTEM: HTTP error creating role {new_rank['role_name']}: {e}"
-                )
-                return False
-            except Exception as e:
-                logger.error(
-                    f"RANK SYSTEM: Unexpected error creating role {new_rank['role_name']}: {e}"
-                )
-                return False
+            return False
 
         # Remove all rank roles from user (cleaned up approach)
-        rank_roles_to_remove = []
-        for rank_data in RANK_ROLES.values():
-            role = discord.utils.get(guild.roles, name=rank_data['role_name'])
-            if role and role in member.roles and role != new_role:
-                rank_roles_to_remove.append(role)
+        rank_roles_to_remove = [
+            role for role in held_rank_roles if role != new_role
+        ]
 
         # Remove old rank roles
         if rank_roles_to_remove:
@@ -540,6 +508,7 @@ async def update_player_rank_role(guild, user_id, new_mmr):
                 logger.error(f"RANK SYSTEM: Error adding new role: {e}")
                 return False
 
+        rank_sync.record(str(guild.id), str(user_id), new_rank['role_name'])
         return True
 
     except Exception as e:
@@ -548,17 +517,99 @@ async def update_player_rank_role(guild, user_id, new_mmr):
         return False
 
 
-async def sync_all_player_ranks(guild):
+async def bulk_update_rank_roles(guild, players, progress=None):
+    """Give each (player_id, mmr) their rank role with one role edit per
+    member (see role_executor.py); returns the executor stats
+
+    Players who are not in the guild are left out of the stats.
+    """
+    rank_roles = {}  # role name -> role, created up front if missing
+    changes = []
+    member_players = {}  # member id -> (player id, rank role name)
+    ranks = rank_table.lookup_many([mmr for _, mmr in players])
+    for (player_id, _), rank in zip(players, ranks):
+        member = guild.get_member(int(player_id))
+        if member is None:
+            continue
+        role_name = rank['role_name']
+        if role_name not in rank_roles:
+            rank_roles[role_name] = rank_role_cache.get(
+                guild, role_name) or await create_rank_role(guild, rank)
+        role = rank_roles[role_name]
+        if role is None:
+            continue
+        changes.append((member, [role], [
+            held for held in member_rank_roles(guild, member) if held != role
+        ]))
+        member_players[member.id] = (str(player_id), role_name)
+
+    stats = await role_executor.run(changes,
+                                    reason="Automatic rank update",
+                                    progress=progress)
+    for member in stats['applied']:
+        player_id, role_name = member_players[member.id]
+        rank_sync.record(str(guild.id), player_id, role_name)
+    return stats
+
+
+def role_progress_reporter(interaction, title, description=""):
+    """progress callback showing a bulk role update in the interaction's
+    original response"""
+
+    async def report(stats):
+        await interaction.edit_original_response(embed=discord.Embed(
+            title=title,
+            description=
+            f"{description}\n**{stats['done']}/{stats['total']}** members ({stats['rate']:.1f}/s)"
+            .strip(),
+            color=discord.Color.orange()))
+
+    return report
+
+
+async def reset_member_rank_roles(guild, progress=None):
+    """Swap every member's rank roles for UNRANKED with one role edit per
+    member (season reset); returns (rank roles removed, UNRANKED added)"""
+    unranked_rank = UNRANK_RANK['UNRANKED']
+    unranked_role = rank_role_cache.get(
+        guild, unranked_rank['role_name']) or await create_rank_role(
+            guild, unranked_rank)
+    if not unranked_role:
+        logger.error("SEASON RESET: Failed to find or create UNRANKED role")
+
+    changes = []
+    planned = {}  # member id -> (rank roles removed, gets UNRANKED)
+    for member in guild.members:
+        if member.bot:
+            continue
+        rank_roles = member_rank_roles(guild, member)
+        gets_unranked = bool(unranked_role) and member.get_role(
+            unranked_role.id) is None
+        changes.append(
+            (member, [unranked_role] if unranked_role else [], rank_roles))
+        planned[member.id] = (len(rank_roles), gets_unranked)
+
+    stats = await role_executor.run(
+        changes,
+        reason="Season reset - replacing rank roles with UNRANKED",
+        progress=progress)
+    removed_roles_count = unranked_members_count = 0
+    for member in stats['applied']:
+        removed, gets_unranked = planned[member.id]
+        removed_roles_count += removed
+        unranked_members_count += gets_unranked
+    logger.info(
+        f"SEASON RESET: Removed {removed_roles_count} rank roles, added UNRANKED to {unranked_members_count} members"
+    )
+    return removed_roles_count, unranked_members_count
+
+
+async def sync_all_player_ranks(guild, progress=None):
     """Sync all players' ranks based on their current MMR (Admin function)"""
     try:
-        c.execute("SELECT id, username, mmr FROM players WHERE mmr > 0")
-        players = c.fetchall()
-
-        updated_count = 0
-        for user_id, username, mmr in players:
-            success = await update_player_rank_role(guild, user_id, mmr)
-            if success:
-                updated_count += 1
+        players = await db.fetchall("SELECT id, mmr FROM players WHERE mmr > 0")
+        stats = await bulk_update_rank_roles(guild, players, progress)
+        updated_count = len(stats['applied'])
 
         logger.info(
             f"RANK SYSTEM: Synced ranks for {updated_count}/{len(players)} players"
@@ -571,42 +622,85 @@ async def sync_all_player_ranks(guild):
 
 
 # Button Views for Professional Queue System
+QUEUE_BUTTONS = {
+    'join': ('🎮 Join Queue', discord.ButtonStyle.green),
+    'leave': ('🚪 Leave Queue', discord.ButtonStyle.red),
+    'status': ('📊 Queue Status', discord.ButtonStyle.blurple),
+    'ping': ('🔔 Ping', discord.ButtonStyle.secondary),
+}
+
+
+class QueueButton(discord.ui.DynamicItem[discord.ui.Button],
+                  template=r'queue:(?P<action>join|leave|status|ping):'
+                  r'(?P<mode>\d+v\d+)'):
+    """Persistent queue button, routed to its queue by custom_id
+
+    The custom_id is queue:<action>:<mode>, so one registration
+    (bot.add_dynamic_items) serves every queue, including ones created
+    after the bot started.
+    """
+
+    def __init__(self, action, mode):
+        label, style = QUEUE_BUTTONS[action]
+        super().__init__(
+            discord.ui.Button(label=label,
+                              style=style,
+                              custom_id=f"queue:{action}:{mode}"))
+        self.action = action
+        self.mode = mode
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match['action'], match['mode'])
+
+    async def callback(self, interaction: discord.Interaction):
+        if self.action == 'join':
+            await handle_join_queue(interaction, self.mode)
+        elif self.action == 'leave':
+            await handle_leave_queue(interaction, self.mode)
+        elif self.action == 'status':
+            await handle_queue_status(interaction, self.mode)
+        else:
+            await handle_ping_role(interaction)
+
+
 class QueueView(discord.ui.View):
 
-    def __init__(self):
+    def __init__(self, mode=DEFAULT_QUEUE_MODE):
         super().__init__(timeout=None)
+        for action in QUEUE_BUTTONS:
+            self.add_item(QueueButton(action, mode))
 
-    @discord.ui.button(label='🎮 Join Queue',
-                       style=discord.ButtonStyle.green,
-                       custom_id='join_queue')
-    async def join_queue(self, interaction: discord.Interaction,
-                         button: discord.ui.Button):
-        await handle_join_queue(interaction)
 
-    @discord.ui.button(label='🚪 Leave Queue',
-                       style=discord.ButtonStyle.red,
-                       custom_id='leave_queue')
-    async def leave_queue(self, interaction: discord.Interaction,
-                          button: discord.ui.Button):
-        await handle_leave_queue(interaction)
+class ReadyButton(discord.ui.DynamicItem[discord.ui.Button],
+                  template=r'ready:(?P<check_id>\d+)'):
+    """Ready check button; its countdown runs on the shared deadline
+    scheduler instead of a per-view timeout"""
 
-    @discord.ui.button(label='📊 Queue Status',
-                       style=discord.ButtonStyle.blurple,
-                       custom_id='queue_status')
-    async def queue_status(self, interaction: discord.Interaction,
-                           button: discord.ui.Button):
-        await handle_queue_status(interaction)
+    def __init__(self, check_id):
+        super().__init__(
+            discord.ui.Button(label='✅ Ready',
+                              style=discord.ButtonStyle.green,
+                              custom_id=f"ready:{check_id}"))
+        self.check_id = check_id
 
-    @discord.ui.button(label='🔔 Ping',
-                       style=discord.ButtonStyle.secondary,
-                       custom_id='ping_role')
-    async def ping_role(self, interaction: discord.Interaction,
-                        button: discord.ui.Button):
-        await handle_ping_role(interaction)
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match['check_id']))
+
+    async def callback(self, interaction: discord.Interaction):
+        await handle_ready_click(interaction, self.check_id)
+
+
+class ReadyCheckView(discord.ui.View):
+
+    def __init__(self, check_id):
+        super().__init__(timeout=None)
+        self.add_item(ReadyButton(check_id))
 
 
 async def handle_ping_role(interaction):
-    global ping_cooldowns
+    ping_cooldowns = guild_state(interaction.guild).ping_cooldowns
 
     # حط هنا الـ ID الخاص بقناة الكيو فقط
     QUEUE_CHANNEL_ID = 1395514922573758584  # ← استبدل هذا بالـ ID الحقيقي
@@ -779,6 +873,8 @@ class CaptainDraftView(discord.ui.View):
     async def interaction_check(self,
                                 interaction: discord.Interaction) -> bool:
         # Only allow the current captain to pick
+        captain_draft_state = guild_state(interaction.guild).captain_draft_state
+
         draft_state = captain_draft_state.get(self.draft_id)
         if not draft_state:
             print(
@@ -806,56 +902,77 @@ class CaptainDraftView(discord.ui.View):
 
 
 # Helper functions for button interactions
-async def handle_join_queue(interaction: discord.Interaction):
+async def handle_join_queue(interaction: discord.Interaction,
+                            mode=DEFAULT_QUEUE_MODE):
     """Handle join queue button press"""
+    active_matches = guild_state(interaction.guild).active_matches
+
     if not is_queue_channel(interaction.channel):
         await interaction.response.send_message(
             f"❌ Please use the #{QUEUE_CHANNEL_NAME} channel!", ephemeral=True)
         return
 
-    add_or_update_player(interaction.user)
+    await add_or_update_player(interaction.user)
     user_id = str(interaction.user.id)
-
-    # Check if player is already in queue
-    if any(player['id'] == user_id for player in player_queue):
+    player_queue = get_queue(interaction.guild, mode)
+
+    # Check if player is already in a queue (one queue at a time); joining
+    # the same queue again refreshes their AFK timer
+    current_queue = guild_state(interaction.guild).queue_of(user_id)
+    if current_queue is player_queue:
+        player_queue.refresh(user_id)
+        arm_player_expiry(player_queue, user_id)
         await interaction.response.send_message(
-            "❌ You are already in the queue!", ephemeral=True)
+            f"⏰ Your spot in the {player_queue.mode} queue was refreshed for another {player_queue.timeout_minutes} minutes!",
+            ephemeral=True)
+        await update_queue_display(interaction.channel, player_queue)
+        return
+    if current_queue:
+        await interaction.response.send_message(
+            f"❌ You are already in the {current_queue.mode} queue!",
+            ephemeral=True)
         return
 
-    # Check if player is in an active match
-    if any(user_id in match['players'] for match in active_matches.values()):
+    # Check if player is in an active match or a ready check
+    if active_matches.match_of(user_id) is not None:
         await interaction.response.send_message(
             "❌ You are currently in an active match!", ephemeral=True)
         return
+    if guild_state(interaction.guild).ready_check_of(user_id):
+        await interaction.response.send_message(
+            "❌ You are in a ready check! Click **✅ Ready** on it first.",
+            ephemeral=True)
+        return
 
     # Add player to queue
-    c.execute("SELECT username, mmr FROM players WHERE id = ?", (user_id, ))
-    result = c.fetchone()
-    if result:
-        username, mmr = result
-        player_queue.append({
+    player = await db.get_player(user_id)
+    if player:
+        player_queue.add({
             'id': user_id,
-            'username': username,
-            'mmr': mmr,
+            'username': player['username'],
+            'mmr': player['mmr'],
+            'is_placement': mmr_engine.is_in_placement(player),
             'user': interaction.user
         })
-
-        # Update queue activity for timeout system
-        update_queue_activity()
+        arm_player_expiry(player_queue, user_id)
 
         await interaction.response.send_message(
-            f"✅ **{interaction.user.display_name}** joined the queue! ({len(player_queue)}/{QUEUE_SIZE})\n⏰ Queue timeout: {QUEUE_TIMEOUT_MINUTES} minutes",
+            f"✅ **{interaction.user.display_name}** joined the {player_queue.mode} queue! ({len(player_queue)}/{player_queue.size})\n⏰ You will be removed after {player_queue.timeout_minutes} minutes unless you click **🎮 Join Queue** again",
             ephemeral=True)
 
         # Update the queue display
-        await update_queue_display(interaction.channel)
+        await update_queue_display(interaction.channel, player_queue)
 
-        # Check if we have enough players to start a match
-        if len(player_queue) >= QUEUE_SIZE:
-            await create_match(interaction.channel, interaction.guild)
+        # Start a match if the new player completes one within MMR range
+        if len(player_queue) >= player_queue.size:
+            await create_match(player_queue,
+                               interaction.channel,
+                               interaction.guild,
+                               around=user_id)
 
 
-async def handle_leave_queue(interaction: discord.Interaction):
+async def handle_leave_queue(interaction: discord.Interaction,
+                             mode=DEFAULT_QUEUE_MODE):
     """Handle leave queue button press"""
     if not is_queue_channel(interaction.channel):
         await interaction.response.send_message(
@@ -863,46 +980,43 @@ async def handle_leave_queue(interaction: discord.Interaction):
         return
 
     user_id = str(interaction.user.id)
+    player_queue = get_queue(interaction.guild, mode)
 
     # Remove player from queue
-    global player_queue
-    original_length = len(player_queue)
-    player_queue = [p for p in player_queue if p['id'] != user_id]
-
-    if len(player_queue) == original_length:
+    if player_queue.remove(user_id) is None:
         await interaction.response.send_message("❌ You are not in the queue!",
                                                 ephemeral=True)
         return
-
-    # Update queue activity for timeout system
-    update_queue_activity()
+    disarm_player_expiry(player_queue, user_id)
 
     await interaction.response.send_message(
-        f"✅ **{interaction.user.display_name}** left the queue! ({len(player_queue)}/{QUEUE_SIZE})",
+        f"✅ **{interaction.user.display_name}** left the {player_queue.mode} queue! ({len(player_queue)}/{player_queue.size})",
         ephemeral=True)
 
     # Update the queue display
-    await update_queue_display(interaction.channel)
+    await update_queue_display(interaction.channel, player_queue)
 
 
-async def handle_queue_status(interaction: discord.Interaction):
+async def handle_queue_status(interaction: discord.Interaction,
+                              mode=DEFAULT_QUEUE_MODE):
     """Handle queue status button press"""
     if not is_queue_channel(interaction.channel):
         await interaction.response.send_message(
             f"❌ Please use the #{QUEUE_CHANNEL_NAME} channel!", ephemeral=True)
         return
 
+    player_queue = get_queue(interaction.guild, mode)
     if not player_queue:
         embed = discord.Embed(
-            title="📋 Queue Status",
+            title=f"📋 {player_queue.mode} Queue Status",
             description=
             "Queue is empty. Click **🎮 Join Queue** to get started!",
             color=discord.Color.blue())
     else:
         embed = discord.Embed(
-            title="📋 Queue Status",
+            title=f"📋 {player_queue.mode} Queue Status",
             description=
-            f"**{len(player_queue)}/{QUEUE_SIZE}** players in queue",
+            f"**{len(player_queue)}/{player_queue.size}** players in queue",
             color=discord.Color.blue())
 
         queue_text = ""
@@ -919,6 +1033,8 @@ async def handle_queue_status(interaction: discord.Interaction):
 async def handle_match_result(interaction: discord.Interaction,
                               team_number: int, match_id: int):
     """Handle match result button press"""
+    active_matches = guild_state(interaction.guild).active_matches
+
     logger.info(
         f"MATCH RESULT: Processing team {team_number} win for match {match_id} by {interaction.user.display_name}"
     )
@@ -988,100 +1104,34 @@ async def handle_match_result(interaction: discord.Interaction,
         'team1']
 
     # Calculate MMR changes
-    mmr_changes = calculate_mmr_changes(winning_team, losing_team)
-
-    # Update player stats and ranks with placement matches handling
-    for player in winning_team:
-        # Get old MMR for rank comparison
-        old_mmr = player['mmr']
-        new_mmr = old_mmr + mmr_changes['winners']
-
-        # Check if player is in placement matches
-        c.execute(
-            "SELECT placement_matches_remaining, is_placed FROM players WHERE id = ?",
-            (player['id'], ))
-        placement_data = c.fetchone()
-
-        if placement_data and placement_data[0] > 0 and placement_data[1] == 0:
-            # Player is in placement matches
-            remaining = placement_data[0] - 1
-            if remaining == 0:
-                # Finished placement matches
-                c.execute(
-                    "UPDATE players SET wins = wins + 1, mmr = mmr + ?, placement_matches_remaining = 0, is_placed = 1 WHERE id = ?",
-                    (mmr_changes['winners'], player['id']))
-                logger.info(
-                    f"PLACEMENT: Player {player['id']} completed placement matches - Final MMR: {new_mmr}"
-                )
-            else:
-                # Still in placement matches
-                c.execute(
-                    "UPDATE players SET wins = wins + 1, mmr = mmr + ?, placement_matches_remaining = ? WHERE id = ?",
-                    (mmr_changes['winners'], remaining, player['id']))
-                logger.info(
-                    f"PLACEMENT: Player {player['id']} - {remaining} placement matches remaining"
-                )
-        else:
-            # Normal player update
-            c.execute(
-                "UPDATE players SET wins = wins + 1, mmr = mmr + ? WHERE id = ?",
-                (mmr_changes['winners'], player['id']))
-
-        # Update rank role only if placement is complete
-        if not placement_data or placement_data[0] <= 1:
-            await update_player_rank_role(interaction.guild, player['id'],
-                                          new_mmr)
-
-    for player in losing_team:
-        # Get old MMR for rank comparison
-        old_mmr = player['mmr']
-        new_mmr = old_mmr + mmr_changes['losers']
-
-        # Check if player is in placement matches
-        c.execute(
-            "SELECT placement_matches_remaining, is_placed FROM players WHERE id = ?",
-            (player['id'], ))
-        placement_data = c.fetchone()
-
-        if placement_data and placement_data[0] > 0 and placement_data[1] == 0:
-            # Player is in placement matches
-            remaining = placement_data[0] - 1
-            if remaining == 0:
-                # Finished placement matches
-                c.execute(
-                    "UPDATE players SET losses = losses + 1, mmr = mmr + ?, placement_matches_remaining = 0, is_placed = 1 WHERE id = ?",
-                    (mmr_changes['losers'], player['id']))
-                logger.info(
-                    f"PLACEMENT: Player {player['id']} completed placement matches - Final MMR: {new_mmr}"
-                )
-            else:
-                # Still in placement matches
-                c.execute(
-                    "UPDATE players SET losses = losses + 1, mmr = mmr + ?, placement_matches_remaining = ? WHERE id = ?",
-                    (mmr_changes['losers'], remaining, player['id']))
-                logger.info(
-                    f"PLACEMENT: Player {player['id']} - {remaining} placement matches remaining"
-                )
-        else:
-            # Normal player update
-            c.execute(
-                "UPDATE players SET losses = losses + 1, mmr = mmr + ? WHERE id = ?",
-                (mmr_changes['losers'], player['id']))
+    mmr_changes = await calculate_mmr_changes(winning_team, losing_team)
+
+    # Update player stats, placement progress and match record off the event loop
+    placement_before = await db.apply_match_result(
+        match_id, team_number, winning_team, losing_team, mmr_changes,
+        datetime.now().isoformat())
+    if placement_before is None:
+        logger.warning(
+            f"MATCH RESULT: Match {match_id} already has a result - ignoring report by {interaction.user.display_name}"
+        )
+        await interaction.response.send_message(
+            "❌ Match not found or already completed!", ephemeral=True)
+        return
+    await rank_index.refresh(
+        [player['id'] for player in winning_team + losing_team])
 
-        # Update rank role only if placement is complete
+    # Update rank roles only for players whose placement is complete
+    for player in winning_team + losing_team:
+        placement_data = placement_before.get(player['id'])
         if not placement_data or placement_data[0] <= 1:
-            await update_player_rank_role(interaction.guild, player['id'],
-                                          new_mmr)
-
-    # Update match record
-    c.execute("UPDATE matches SET winner = ?, ended_at = ? WHERE match_id = ?",
-              (team_number, datetime.now().isoformat(), match_id))
-    conn.commit()
+            await update_player_rank_role(
+                interaction.guild, player['id'],
+                player['mmr'] + mmr_changes['deltas'][player['id']])
 
     # Log the match completion
     log_match_event(
         "COMPLETED", f"Match {match_id}",
-        f"Team {team_number} won - MMR changes: Winners +{mmr_changes['winners']}, Losers {mmr_changes['losers']}"
+        f"Team {team_number} won - MMR changes: {mmr_changes['deltas']}"
     )
 
     # CRITICAL FIX: Remove players from active match immediately after database update
@@ -1104,11 +1154,13 @@ async def handle_match_result(interaction: discord.Interaction,
 
     embed.add_field(
         name="🎉 Winners",
-        value=f"{winner_mentions}\n**+{mmr_changes['winners']} MMR**",
+        value=
+        f"{winner_mentions}\n{format_mmr_deltas(winning_team, mmr_changes)}",
+        inline=True)
+    embed.add_field(
+        name="💔 Losers",
+        value=f"{loser_mentions}\n{format_mmr_deltas(losing_team, mmr_changes)}",
         inline=True)
-    embed.add_field(name="💔 Losers",
-                    value=f"{loser_mentions}\n**{mmr_changes['losers']} MMR**",
-                    inline=True)
     embed.add_field(
         name="📬 DMs Sent",
         value="All players have been notified with detailed results!",
@@ -1130,6 +1182,8 @@ async def handle_match_result(interaction: discord.Interaction,
 
 async def handle_cancel_match(interaction: discord.Interaction, match_id: int):
     """Handle cancel match button press"""
+    active_matches = guild_state(interaction.guild).active_matches
+
     if match_id not in active_matches:
         await interaction.response.send_message(
             "❌ Match not found or already completed!", ephemeral=True)
@@ -1166,6 +1220,8 @@ async def handle_cancel_match(interaction: discord.Interaction, match_id: int):
 # Private chat handler functions
 async def handle_create_private_chat(interaction: discord.Interaction):
     """Handle create private chat button press"""
+    private_chats = guild_state(interaction.guild).private_chats
+
     user_id = str(interaction.user.id)
 
     # Check if user already has an active private chat
@@ -1291,6 +1347,8 @@ async def handle_create_private_chat(interaction: discord.Interaction):
 
 async def handle_delete_private_chat(interaction: discord.Interaction):
     """Handle delete private chat button press"""
+    private_chats = guild_state(interaction.guild).private_chats
+
     user_id = str(interaction.user.id)
 
     # Check if user has an active private chat
@@ -1375,139 +1433,300 @@ def generate_match_hsm_number():
 # Automatic Queue Timeout System
 QUEUE_TIMEOUT_MINUTES = 5
 
+# Queue display edits are debounced per message (latest state wins)
+QUEUE_DISPLAY_INTERVAL = 1.5
+queue_display_updates = Debouncer(QUEUE_DISPLAY_INTERVAL)
 
-# Automatic Rank Update System - تحديث الرتب كل 10 دقائق
-@tasks.loop(minutes=10)
-async def auto_update_ranks():
-    """تحديث تلقائي للرتب كل 10 دقائق لجميع اللاعبين"""
-    logger.info("AUTO RANK UPDATE: Starting automatic rank sync")
+# In-memory state per guild, created on first use and evicted when idle;
+# queue changes are journaled to players.db and replayed on startup
+queue_journal = QueueJournal(db)
+guild_states = GuildStates(QUEUE_TIMEOUT_MINUTES, journal=queue_journal)
 
-    try:
-        # الحصول على جميع اللاعبين النشطين
-        c.execute(
-            "SELECT id, username, mmr FROM players WHERE wins > 0 OR losses > 0"
-        )
-        active_players = c.fetchall()
+# Queue timeouts, matchmaking retries and guild eviction run at exact
+# deadlines instead of from a polling loop
+deadlines = DeadlineScheduler()
 
-        updated_count = 0
-        for guild in bot.guilds:
-            for player_id, username, mmr in active_players:
-                try:
-                    # تحديث رتبة اللاعب
-                    success = await update_player_rank_role(
-                        guild, player_id, mmr)
-                    if success:
-                        updated_count += 1
-                except Exception as e:
-                    logger.error(
-                        f"AUTO RANK UPDATE: Error updating {username}: {e}")
+# Retry delay for a group that fits its window but could not be matched
+MATCHMAKING_RETRY_SECONDS = 60
 
-        logger.info(
-            f"AUTO RANK UPDATE: Updated {updated_count} players across all guilds"
-        )
+# Minimum AFK time left to players restored into a queue after a restart
+RESTORE_GRACE_SECONDS = 60
 
-    except Exception as e:
-        logger.error(f"AUTO RANK UPDATE: System error: {e}")
+# Applied rank role per (guild, player); MMR changes mark players dirty and
+# a sync RANK_SYNC_DELAY seconds later updates only the changed ranks
+RANK_SYNC_DELAY = 5
+rank_sync = RankSync(db, lambda mmr: get_rank_from_mmr(mmr)['role_name'])
 
+# Leaderboard order, positions and counts in memory (see rank_index.py);
+# every write to players refreshes the rows it touched
+rank_index = RankIndex(db)
 
-@tasks.loop(minutes=1)
-async def check_queue_timeout():
-    """Check if queue should be cleared due to inactivity"""
-    global player_queue, queue_last_activity
+# Leaderboard pages per (guild, view, page), valid while rank_index.version
+# is unchanged (at most LEADERBOARD_PAGE_TTL seconds)
+LEADERBOARD_PAGE_TTL = 60
+leaderboard_pages = VersionedCache(LEADERBOARD_PAGE_TTL)
 
-    if not player_queue:
-        return  # No players in queue
+# Finished embeds of /rank, !rank, !stats and leaderboard pages, keyed by
+# what they show and valid while rank_index.version is unchanged
+EMBED_CACHE_TTL = 60
+rendered_embeds = VersionedCache(EMBED_CACHE_TTL)
 
-    if queue_last_activity is None:
-        return  # No activity timestamp recorded
 
-    # Check if queue has been inactive for more than 5 minutes
-    current_time = datetime.now()
-    time_since_activity = current_time - queue_last_activity
+def cached_embed(key, build):
+    """The embed rendered for key at the current rank index version,
+    built with build() on a miss"""
+    version = rank_index.version
+    embed = rendered_embeds.get(key, version)
+    if embed is None:
+        embed = build()
+        rendered_embeds.put(key, version, embed)
+    return embed
 
-    if time_since_activity >= timedelta(minutes=QUEUE_TIMEOUT_MINUTES):
-        # Queue has been inactive for 5+ minutes, clear it
-        await clear_inactive_queue()
+# Ready check ids (ready checks only live in memory)
+ready_check_ids = itertools.count(1)
 
 
-async def clear_inactive_queue():
-    """Clear queue due to inactivity and notify players"""
-    global player_queue, queue_last_activity
+def guild_state(guild):
+    """In-memory state of a guild (queues, matches, drafts, ...)"""
+    schedule_guild_eviction()
+    return guild_states.get(str(guild.id))
 
-    if not player_queue:
-        return
 
-    # Store queue data before clearing
-    inactive_players = player_queue.copy()
-    queue_count = len(player_queue)
+def get_queue(guild, mode=DEFAULT_QUEUE_MODE):
+    """The guild's queue for a mode (ValueError for an invalid mode)"""
+    return guild_state(guild).get_queue(mode)
 
-    # Clear queue and reset activity
-    player_queue.clear()
-    queue_last_activity = None
 
-    # No need to clean up private match channels since we removed them
+def guild_queues(guild):
+    """The guild's queues, creating the default one if there are none"""
+    return guild_state(guild).queue_list() or [get_queue(guild)]
+
+
+def clear_guild_queues(guild):
+    """Empty every queue of a guild; returns the removed players"""
+    removed = []
+    for player_queue in guild_state(guild).queue_list():
+        removed.extend(player_queue.copy())
+        player_queue.clear()
+    return removed
+
+
+def queue_formats(guild):
+    """Formats currently running in a guild, e.g. 1v1, 2v2"""
+    if guild is None:
+        return DEFAULT_QUEUE_MODE
+    return ", ".join(queue.mode for queue in guild_queues(guild))
+
+
+async def restore_queues():
+    """Rebuild every guild's queues from the queue journal in one read
+
+    Queued players keep their place and wait time (so their MMR windows
+    stay wide); players who left the guild or are in a restored match are
+    dropped from the journal.
+    """
+    settings, entries = await queue_journal.load()
+
+    # get_queue picks the settings up from the journal
+    for guild_id, mode, _, _, _ in settings:
+        guild = bot.get_guild(int(guild_id))
+        if guild is not None:
+            get_queue(guild, mode)
+
+    restored_count = 0
+    dropped = {}  # PlayerQueue -> player ids no longer restorable
+    for row in entries:
+        (guild_id, mode, player_id, username, mmr, is_placement, joined_at,
+         last_seen) = row
+        guild = bot.get_guild(int(guild_id))
+        if guild is None:
+            continue
+        state = guild_state(guild)
+        player_queue = get_queue(guild, mode)
+        member = guild.get_member(int(player_id))
+        if member is None or state.active_matches.match_of(player_id):
+            dropped.setdefault(player_queue, []).append(player_id)
+            continue
+
+        # Carry the wall-clock wait over to the matchmaker's clock
+        waited = max(0, time.time() - joined_at) if joined_at else 0
+        if not player_queue.restore(
+            {
+                'id': player_id,
+                'username': username,
+                'mmr': mmr,
+                'is_placement': bool(is_placement),
+                'user': member
+            }, player_queue.matchmaker.clock() - waited):
+            continue
+        # AFK timers continue from the last Join click, with a minute of grace
+        idle = max(0, time.time() - last_seen) if last_seen else waited
+        arm_player_expiry(
+            player_queue, player_id,
+            max(RESTORE_GRACE_SECONDS,
+                player_queue.timeout_minutes * 60 - idle))
+        restored_count += 1
+
+    for player_queue, player_ids in dropped.items():
+        queue_journal.removed(player_queue, player_ids)
+
+    logger.info(
+        f"RESTORE: Restored {restored_count} queued players, dropped {sum(len(ids) for ids in dropped.values())}"
+    )
+
+
+# Incremental rank sync - only players whose rank tier changed
+def queue_rank_sync():
+    """Arm the rank sync timer unless it is already pending"""
+    if 'rank-sync' not in deadlines:
+        deadlines.schedule_in('rank-sync', RANK_SYNC_DELAY, sync_dirty_ranks)
+
+
+def mark_rank_dirty(player_id, mmr):
+    """Queue a rank role update if mmr moved the player to another rank"""
+    if rank_sync.mark(str(player_id), mmr):
+        queue_rank_sync()
 
-    # Find queue channel and send notification
+
+def mark_all_ranks_dirty():
+    """Queue a rank check of every player (bulk MMR edits)"""
+    rank_sync.mark_all()
+    queue_rank_sync()
+
+
+async def sync_dirty_ranks():
+    """Apply rank roles to the dirty players whose applied rank is stale"""
+    players = await rank_sync.take()
+    updated_count = 0
     for guild in bot.guilds:
-        queue_channel = discord.utils.get(guild.channels,
-                                          name=QUEUE_CHANNEL_NAME)
-        if queue_channel:
-            # Create timeout notification embed
-            embed = discord.Embed(
-                title="⏰ Queue Timeout - Automatic Cleanup",
-                description=
-                f"**Queue has been automatically cleared due to {QUEUE_TIMEOUT_MINUTES} minutes of inactivity!**",
-                color=discord.Color.orange())
-            embed.add_field(name="Players Removed",
-                            value=f"**{queue_count}** players",
-                            inline=True)
-            embed.add_field(
-                name="Reason",
-                value=f"No activity for {QUEUE_TIMEOUT_MINUTES} minutes",
-                inline=True)
-            embed.add_field(name="Queue Status",
-                            value="**CLEARED**",
-                            inline=True)
+        guild_id = str(guild.id)
+        stale = [(player_id, mmr) for player_id, mmr in players
+                 if rank_sync.needs_update(guild_id, player_id, mmr)]
+        if stale:
+            stats = await bulk_update_rank_roles(guild, stale)
+            updated_count += len(stats['applied'])
 
-            # List removed players
-            if inactive_players:
-                player_list = []
-                for player in inactive_players:
-                    player_list.append(
-                        f"• {player['username']} ({player['mmr']} MMR)")
+    logger.info(
+        f"RANK SYNC: Checked {len(players)} changed players, updated {updated_count} rank roles"
+    )
+    if rank_sync.pending:
+        queue_rank_sync()
 
-                if player_list:
-                    embed.add_field(
-                        name="Removed Players",
-                        value="\n".join(
-                            player_list[:10]),  # Limit to 10 players
-                        inline=False)
 
-            embed.add_field(
-                name="💡 Next Steps",
-                value=
-                "Players can rejoin the queue using the buttons below.\nQueue will reset its timer when new players join.",
-                inline=False)
-            embed.set_footer(
-                text=
-                f"Automatic cleanup after {QUEUE_TIMEOUT_MINUTES} minutes of inactivity"
-            )
+def schedule_queue_timers(player_queue, retry_after=0):
+    """Arm (or cancel) a queue's matchmaking retry
 
-            await queue_channel.send(embed=embed)
+    The retry fires when the widening MMR windows first admit a group; a
+    group that should already fit but was not matched is retried after
+    retry_after seconds instead.
+    """
+    key = (player_queue.guild_id, player_queue.mode)
+    now = deadlines.clock()
 
-            # Update queue display
-            await update_queue_display(queue_channel)
+    match_at = player_queue.matchmaker.next_match_time(player_queue.size)
+    if match_at is None:
+        deadlines.cancel(('matchmaking', ) + key)
+    else:
+        if match_at <= now:
+            match_at = now + retry_after
+        deadlines.schedule(('matchmaking', ) + key, match_at,
+                           lambda: matchmaking_due(*key))
 
-            print(
-                f"Queue automatically cleared due to inactivity: {queue_count} players removed"
-            )
-            break
 
+def arm_player_expiry(player_queue, player_id, delay=None):
+    """(Re)start a queued player's AFK timer
 
-def update_queue_activity():
-    """Update the last activity timestamp for queue timeout"""
-    global queue_last_activity
-    queue_last_activity = datetime.now()
+    The player is dropped from the queue timeout_minutes (or delay
+    seconds) from now unless they refresh their spot by clicking Join.
+    """
+    guild_id = player_queue.guild_id
+    if delay is None:
+        delay = player_queue.timeout_minutes * 60
+    deadlines.schedule_in(('afk', guild_id, player_id), delay,
+                          lambda: queued_player_expired(guild_id, player_id))
+
+
+def disarm_player_expiry(player_queue, player_id):
+    """Stop the AFK timer of a player who left the queue"""
+    deadlines.cancel(('afk', player_queue.guild_id, player_id))
+
+
+def player_expiry_timestamp(player_queue, player_id):
+    """Unix time a queued player's AFK timer runs out, or None"""
+    deadline = deadlines.deadline_of(
+        ('afk', player_queue.guild_id, player_id))
+    if deadline is None:
+        return None
+    return time.time() + deadline - deadlines.clock()
+
+
+def queue_for_timer(guild_id, mode):
+    """(guild, queue) a timer refers to, or (None, None) if gone"""
+    state = guild_states.peek(guild_id)
+    guild = bot.get_guild(int(guild_id))
+    if state is None or guild is None or mode not in state.queues:
+        return None, None
+    return guild, state.queues[mode]
+
+
+async def queued_player_expired(guild_id, player_id):
+    """Drop a player whose AFK timer ran out from their queue"""
+    state = guild_states.peek(guild_id)
+    guild = bot.get_guild(int(guild_id))
+    player_queue = state.queue_of(player_id) if state else None
+    if guild is None or player_queue is None:
+        return  # Left, matched or already removed
+
+    player = player_queue.remove(player_id)
+    logger.info(
+        f"QUEUE AFK: {player['username']} removed from the {player_queue.mode} queue after {player_queue.timeout_minutes} minutes"
+    )
+
+    queue_channel = discord.utils.get(guild.channels, name=QUEUE_CHANNEL_NAME)
+    if queue_channel:
+        await queue_channel.send(
+            f"⏰ **{player['username']}** was removed from the {player_queue.mode} queue after {player_queue.timeout_minutes} minutes (AFK). Click **🎮 Join Queue** to queue again.",
+            delete_after=60)
+        await update_queue_display(queue_channel, player_queue)
+
+
+async def matchmaking_due(guild_id, mode):
+    """Search windows widen while players wait, so retry matchmaking"""
+    guild, player_queue = queue_for_timer(guild_id, mode)
+    if not player_queue:
+        return
+    await run_matchmaking_pass(player_queue, guild)
+    schedule_queue_timers(player_queue, retry_after=MATCHMAKING_RETRY_SECONDS)
+
+
+def schedule_guild_eviction():
+    """Arm the idle-guild sweep unless it is already pending"""
+    if 'evict' not in deadlines:
+        deadlines.schedule_in('evict', guild_states.idle_seconds,
+                              evict_idle_guilds)
+
+
+async def evict_idle_guilds():
+    """Drop the state of guilds with nothing in flight"""
+    evicted = guild_states.evict_idle()
+    if evicted:
+        logger.info(f"GUILD STATE: Evicted {len(evicted)} idle guild(s)")
+    if len(guild_states):
+        schedule_guild_eviction()
+
+
+async def run_matchmaking_pass(player_queue, guild):
+    """Create every match the current (widened) MMR windows allow"""
+    if len(player_queue) < player_queue.size:
+        return
+
+    queue_channel = discord.utils.get(guild.channels, name=QUEUE_CHANNEL_NAME)
+    if queue_channel:
+        try:
+            while await create_match(player_queue, queue_channel, guild):
+                pass
+        except Exception as e:
+            logger.error(f"MATCHMAKING: Error creating match: {e}")
 
 
 def is_queue_channel(channel):
@@ -1516,23 +1735,42 @@ def is_queue_channel(channel):
 
 
 # Advanced match creation with voice channels and dedicated channels
-async def create_match(queue_channel, guild):
-    """Create match directly without showing team details in public"""
-    global match_id_counter, player_queue
+async def create_match(player_queue, queue_channel, guild, around=None):
+    """Create match directly without showing team details in public
 
+    Takes the tightest group of player_queue.size players whose MMR spread
+    fits the matchmaking window (see matchmaking.py). Returns True if a
+    match was made.
+    """
     # Get required players from queue
-    match_players = player_queue[:QUEUE_SIZE]
-    player_queue = player_queue[QUEUE_SIZE:]
+    match_players = player_queue.take_match(player_queue.size, around=around)
+    if not match_players:
+        return False
 
+    if player_queue.ready_check_seconds:
+        await start_ready_check(player_queue, queue_channel, guild,
+                                match_players)
+        await update_queue_display(queue_channel, player_queue)
+        return True
+
+    return await launch_match(player_queue, queue_channel, guild,
+                              match_players)
+
+
+async def launch_match(player_queue, queue_channel, guild, match_players):
+    """Balance teams and create the match for players taken from a queue"""
     # Generate HSM number for the match
     hsm_number = generate_match_hsm_number()
     if not hsm_number:
+        for player in match_players:
+            if player_queue.add(player):
+                arm_player_expiry(player_queue, player['id'])
         await queue_channel.send(
             "❌ No available HSM numbers for match creation!")
-        return
+        return False
 
     # Create teams randomly by default (no team selection in public)
-    teams = create_balanced_teams(match_players)
+    teams = await create_balanced_teams(match_players)
     team1, team2 = teams
 
     # Create the match directly
@@ -1540,27 +1778,153 @@ async def create_match(queue_channel, guild):
                              "🎲 Automatic Distribution")
 
     # Update queue display
-    await update_queue_display(queue_channel)
+    await update_queue_display(queue_channel, player_queue)
+    return True
 
 
-# Team selection handler functions
-async def handle_random_team_selection(interaction: discord.Interaction,
-                                       players, hsm_number):
-    """Handle random team selection"""
-    # Check if user is one of the queued players
+# Ready check - players confirm before the match is created
+def build_ready_check_embed(check):
+    """Ready check embed listing who has confirmed"""
+    lines = [
+        f"{'✅' if player['id'] in check['ready'] else '⏳'} **{player['username']}** ({player['mmr']} MMR)"
+        for player in check['players']
+    ]
+    embed = discord.Embed(
+        title=f"✅ {check['queue'].mode} Ready Check",
+        description=
+        f"A match was found! Click **✅ Ready** <t:{int(check['expires_at'])}:R>.\nPlayers who don't respond are replaced from the queue.",
+        color=discord.Color.green())
+    embed.add_field(
+        name=f"Players ({len(check['ready'])}/{len(check['players'])} ready)",
+        value="\n".join(lines),
+        inline=False)
+    return embed
+
+
+def arm_ready_check(guild_id, check):
+    """Start (or restart) a ready check's countdown"""
+    seconds = check['queue'].ready_check_seconds
+    check['expires_at'] = time.time() + seconds
+    deadlines.schedule_in(('ready', guild_id, check['id']), seconds,
+                          lambda: ready_check_expired(guild_id, check['id']))
+
+
+async def start_ready_check(player_queue, queue_channel, guild, players):
+    """Ask the matched players to confirm before the match is created"""
+    check = {
+        'id': next(ready_check_ids),
+        'queue': player_queue,
+        'channel': queue_channel,
+        'players': players,
+        'ready': set(),
+        'message': None
+    }
+    guild_state(guild).ready_checks[check['id']] = check
+    arm_ready_check(str(guild.id), check)
+    check['message'] = await queue_channel.send(
+        content=' '.join(p['user'].mention for p in players),
+        embed=build_ready_check_embed(check),
+        view=ReadyCheckView(check['id']))
+    logger.info(
+        f"READY CHECK: #{check['id']} started for {len(players)} {player_queue.mode} players"
+    )
+
+
+async def handle_ready_click(interaction: discord.Interaction, check_id):
+    """Handle a Ready button press; starts the match once all are ready"""
+    state = guild_state(interaction.guild)
+    check = state.ready_checks.get(check_id)
+    if check is None:
+        await interaction.response.send_message(
+            "❌ This ready check has ended!", ephemeral=True)
+        return
+
     user_id = str(interaction.user.id)
-    if not any(p['id'] == user_id for p in players):
+    if all(player['id'] != user_id for player in check['players']):
         await interaction.response.send_message(
-            "❌ Only queued players can select team distribution!",
-            ephemeral=True)
+            "❌ You are not part of this ready check!", ephemeral=True)
         return
 
-    # Create teams randomly
-    teams = create_balanced_teams(players)
-    team1, team2 = teams
+    check['ready'].add(user_id)
+    if len(check['ready']) < len(check['players']):
+        await interaction.response.edit_message(
+            embed=build_ready_check_embed(check))
+        return
 
-    await interaction.response.send_message(
-        "🎲 Random team distribution selected! Creating match...",
+    # Everyone confirmed: stop the countdown and create the match
+    del state.ready_checks[check_id]
+    deadlines.cancel(('ready', str(interaction.guild.id), check_id))
+    await interaction.response.edit_message(
+        embed=build_ready_check_embed(check), view=None)
+    await launch_match(check['queue'], check['channel'], interaction.guild,
+                       check['players'])
+
+
+async def ready_check_expired(guild_id, check_id):
+    """Replace the players who did not confirm in time
+
+    Non-responders are dropped; the waiting players closest in MMR to the
+    rest take their places and the countdown restarts. If the queue cannot
+    fill the gaps, the confirmed players go back into the queue.
+    """
+    state = guild_states.peek(guild_id)
+    guild = bot.get_guild(int(guild_id))
+    check = state.ready_checks.pop(check_id, None) if state else None
+    if check is None or guild is None:
+        return
+
+    player_queue = check['queue']
+    ready = [p for p in check['players'] if p['id'] in check['ready']]
+    missing = [p for p in check['players'] if p['id'] not in check['ready']]
+    anchor = ready or check['players']
+    replacements = player_queue.take_closest(
+        sum(p['mmr'] for p in anchor) / len(anchor), len(missing))
+    logger.info(
+        f"READY CHECK: #{check_id} - {len(missing)} missed, {len(replacements)} replacements"
+    )
+
+    if len(replacements) == len(missing):
+        check['players'] = ready + replacements
+        state.ready_checks[check_id] = check
+        arm_ready_check(guild_id, check)
+        await check['message'].edit(embed=build_ready_check_embed(check))
+        await check['channel'].send(
+            f"{' '.join(p['user'].mention for p in replacements)} you replaced "
+            f"{', '.join(p['username'] for p in missing)} - click **✅ Ready** above!",
+            delete_after=player_queue.ready_check_seconds)
+    else:
+        for player in ready + replacements:
+            if player_queue.add(player):
+                arm_player_expiry(player_queue, player['id'])
+        embed = build_ready_check_embed(check)
+        embed.title = f"❌ {player_queue.mode} Ready Check Failed"
+        embed.description = (
+            f"Not enough players to replace {', '.join(p['username'] for p in missing)}.\n"
+            "Confirmed players are back in the queue.")
+        embed.color = discord.Color.red()
+        await check['message'].edit(embed=embed, view=None)
+
+    await update_queue_display(check['channel'], player_queue)
+
+
+# Team selection handler functions
+async def handle_random_team_selection(interaction: discord.Interaction,
+                                       players, hsm_number):
+    """Handle random team selection"""
+    # Check if user is one of the queued players
+    user_id = str(interaction.user.id)
+    if not any(p['id'] == user_id for p in players):
+        await interaction.response.send_message(
+            "❌ Only queued players can select team distribution!",
+            ephemeral=True)
+        return
+
+    # Create teams randomly
+    teams = await create_balanced_teams(players)
+    team1, team2 = teams
+
+    await interaction.response.send_message(
+        "🎲 Random team distribution selected! Creating match...",
         ephemeral=True)
 
     # Create the match with the selected teams
@@ -1571,6 +1935,8 @@ async def handle_random_team_selection(interaction: discord.Interaction,
 async def handle_captain_draft_selection(interaction: discord.Interaction,
                                          players, hsm_number):
     """Handle captain draft selection"""
+    captain_draft_state = guild_state(interaction.guild).captain_draft_state
+
     print(
         f"[DEBUG] Captain draft selection - Players: {len(players)}, HSM: {hsm_number}"
     )
@@ -1601,15 +1967,16 @@ async def handle_captain_draft_selection(interaction: discord.Interaction,
     # For 1v1 (2 players total): no picks needed, just captains
     # For 2v2 (4 players total): 2 captains + 2 picks, each captain picks once
     # For 3v3 (6 players total): 2 captains + 4 picks, alternating picks
-    if TEAM_SIZE == 1:
+    team_size = len(players) // 2
+    if team_size == 1:
         pick_order = []  # No picks needed for 1v1
-    elif TEAM_SIZE == 2:
+    elif team_size == 2:
         pick_order = [0, 1]  # Each captain picks once
-    elif TEAM_SIZE == 3:
+    elif team_size == 3:
         pick_order = [0, 1, 1, 0]  # Alternating picks
     else:
         # Generate pick order for larger teams
-        picks_needed = QUEUE_SIZE - 2  # Total picks needed (excluding captains)
+        picks_needed = len(players) - 2  # Total picks needed (excluding captains)
         pick_order = []
         for i in range(picks_needed):
             pick_order.append(i % 2)  # Alternate between captains
@@ -1673,6 +2040,8 @@ async def handle_captain_draft_selection(interaction: discord.Interaction,
 async def handle_captain_pick(interaction: discord.Interaction, draft_id,
                               player_id):
     """Handle captain player pick"""
+    captain_draft_state = guild_state(interaction.guild).captain_draft_state
+
     print(
         f"[DEBUG] Captain pick - Draft ID: {draft_id}, Player ID: {player_id}")
 
@@ -1791,6 +2160,9 @@ async def create_final_match(guild, all_players, team1, team2, hsm_number,
                              distribution_method):
     """Create the final match with HSM number and private permissions"""
     global match_id_counter
+    state = guild_state(guild)
+    active_matches = state.active_matches
+    pending_team_selection = state.pending_team_selection
 
     # Create match record
     match_id = match_id_counter
@@ -1847,16 +2219,17 @@ async def create_final_match(guild, all_players, team1, team2, hsm_number,
             reason="Preventing duplicate voice channel")
 
     # Create voice channels for each team with same permissions
+    team_size = max(len(team1), len(team2))
     team1_voice = await guild.create_voice_channel(
         name=f"🔵 Team 1 - HSM{hsm_number}",
         category=category,
-        user_limit=TEAM_SIZE,
+        user_limit=team_size,
         overwrites=overwrites)
 
     team2_voice = await guild.create_voice_channel(
         name=f"🔴 Team 2 - HSM{hsm_number}",
         category=category,
-        user_limit=TEAM_SIZE,
+        user_limit=team_size,
         overwrites=overwrites)
 
     # Store match data with HSM number
@@ -1881,6 +2254,7 @@ async def create_final_match(guild, all_players, team1, team2, hsm_number,
                      VALUES (?, ?, ?, ?, ?, ?)""",
             (match_id, team1_ids, team2_ids, datetime.now().isoformat(),
              str(match_channel.id), hsm_number))
+        insert_match_participants(c, match_id, team1, team2)
         conn.commit()
         print(f"[DEBUG] Match {match_id} saved to database successfully")
     except Exception as e:
@@ -1901,6 +2275,7 @@ async def create_final_match(guild, all_players, team1, team2, hsm_number,
                     (match_id, team1_ids, team2_ids,
                      datetime.now().isoformat(), str(
                          match_channel.id), hsm_number))
+                insert_match_participants(c, match_id, team1, team2)
                 conn.commit()
                 print(
                     f"[DEBUG] Match {match_id} saved to database successfully (retry)"
@@ -1912,13 +2287,14 @@ async def create_final_match(guild, all_players, team1, team2, hsm_number,
             raise e
 
     # Find queue channel to update display
+    match_type = mode_for_size(len(all_players))
     queue_channel = discord.utils.get(guild.channels, name=QUEUE_CHANNEL_NAME)
     if queue_channel:
         # Update queue display
-        await update_queue_display(queue_channel)
+        await update_queue_display(queue_channel,
+                                   guild_state(guild).queues.get(match_type))
 
     # Send detailed welcome message to private match channel with all team info
-    match_type = f"{TEAM_SIZE}v{TEAM_SIZE}"
     welcome_embed = discord.Embed(
         title=f"🎮 Welcome to Match HSM{hsm_number}!",
         description=
@@ -2010,7 +2386,7 @@ async def post_match_to_results_channel_with_data(guild, match_id,
         embed.add_field(
             name="🎉 Winners",
             value=
-            f"**Players:** {', '.join(winner_names)}\n**Avg MMR:** {winner_avg_mmr:.0f}\n**MMR Change:** +{mmr_changes['winners']}",
+            f"**Players:** {', '.join(winner_names)}\n**Avg MMR:** {winner_avg_mmr:.0f}\n**MMR Change:**\n{format_mmr_deltas(winning_team, mmr_changes)}",
             inline=True)
 
         # Loser info
@@ -2019,7 +2395,7 @@ async def post_match_to_results_channel_with_data(guild, match_id,
         embed.add_field(
             name="💔 Losers",
             value=
-            f"**Players:** {', '.join(loser_names)}\n**Avg MMR:** {loser_avg_mmr:.0f}\n**MMR Change:** {mmr_changes['losers']}",
+            f"**Players:** {', '.join(loser_names)}\n**Avg MMR:** {loser_avg_mmr:.0f}\n**MMR Change:**\n{format_mmr_deltas(losing_team, mmr_changes)}",
             inline=True)
 
         # Match details
@@ -2111,67 +2487,48 @@ class CompletedMatchAdminView(discord.ui.View):
         """Modify the match result in database and update the embed"""
         try:
             # Get original match data from database
-            c.execute(
-                "SELECT team1_players, team2_players, winner FROM matches WHERE match_id = ?",
+            result = await db.fetchone(
+                "SELECT winner FROM matches WHERE match_id = ?",
                 (self.match_id, ))
-            result = c.fetchone()
 
             if not result:
                 await interaction.response.send_message(
                     "❌ Match not found in database!", ephemeral=True)
                 return
 
-            team1_ids, team2_ids, current_winner = result
-            team1_ids = team1_ids.split(',')
-            team2_ids = team2_ids.split(',')
-
-            # Revert previous changes first
-            if current_winner == 1:  # Team 1 won previously
-                for player_id in team1_ids:
-                    c.execute(
-                        "UPDATE players SET wins = wins - 1, mmr = mmr - 25 WHERE id = ?",
-                        (player_id, ))
-                for player_id in team2_ids:
-                    c.execute(
-                        "UPDATE players SET losses = losses - 1, mmr = mmr + 25 WHERE id = ?",
-                        (player_id, ))
-            elif current_winner == 2:  # Team 2 won previously
-                for player_id in team2_ids:
-                    c.execute(
-                        "UPDATE players SET wins = wins - 1, mmr = mmr - 25 WHERE id = ?",
-                        (player_id, ))
-                for player_id in team1_ids:
-                    c.execute(
-                        "UPDATE players SET losses = losses - 1, mmr = mmr + 25 WHERE id = ?",
-                        (player_id, ))
-
-            # Apply new changes
-            if winner_team == 1:  # Team 1 wins
-                for player_id in team1_ids:
-                    c.execute(
-                        "UPDATE players SET wins = wins + 1, mmr = mmr + 25 WHERE id = ?",
-                        (player_id, ))
-                for player_id in team2_ids:
-                    c.execute(
-                        "UPDATE players SET losses = losses + 1, mmr = mmr - 25 WHERE id = ?",
-                        (player_id, ))
-            elif winner_team == 2:  # Team 2 wins
-                for player_id in team2_ids:
-                    c.execute(
-                        "UPDATE players SET wins = wins + 1, mmr = mmr + 25 WHERE id = ?",
-                        (player_id, ))
-                for player_id in team1_ids:
-                    c.execute(
-                        "UPDATE players SET losses = losses + 1, mmr = mmr - 25 WHERE id = ?",
-                        (player_id, ))
-            # winner_team == 0 (tie) or -1 (cancelled) = no MMR changes
-
-            # Update match record
-            cancelled = 1 if winner_team == -1 else 0
-            c.execute(
-                "UPDATE matches SET winner = ?, admin_modified = 1, cancelled = ? WHERE match_id = ?",
-                (winner_team, cancelled, self.match_id))
-            conn.commit()
+            current_winner = result[0]
+            roster = (await db.match_rosters([self.match_id]))[self.match_id]
+
+            # Per-player deltas for the new result, from pre-match MMR
+            deltas = None  # tie (0) or cancelled (-1) = no MMR changes
+            if winner_team in (1, 2):
+                teams = {
+                    team: [{
+                        'id':
+                        p['id'],
+                        'mmr':
+                        p['mmr_before']
+                        if p['mmr_before'] is not None else p['mmr']
+                    } for p in roster[team]]
+                    for team in (1, 2)
+                }
+                mmr_changes = await calculate_mmr_changes(
+                    teams[winner_team], teams[3 - winner_team])
+                deltas = mmr_changes['deltas']
+
+            # Revert the old result and apply the new one in one transaction
+            if not await db.modify_match_result(self.match_id, current_winner,
+                                                winner_team, roster, deltas):
+                await interaction.response.send_message(
+                    "❌ The match result changed meanwhile, please try again!",
+                    ephemeral=True)
+                return
+            await rank_index.refresh(
+                [player['id'] for player in roster[1] + roster[2]])
+            for player in roster[1] + roster[2]:
+                row = rank_index.get(player['id'])
+                if row:
+                    mark_rank_dirty(player['id'], row[2])
 
             # Update the embed
             embed = discord.Embed(
@@ -2236,6 +2593,8 @@ async def cleanup_match_with_data(guild, match_id, match_data):
 
 async def cleanup_match(guild, match_id):
     """Clean up match channels and voice channels after match completion (legacy function)"""
+    active_matches = guild_state(guild).active_matches
+
     if match_id not in active_matches:
         return
 
@@ -2267,70 +2626,118 @@ async def cleanup_match(guild, match_id):
     del active_matches[match_id]
 
 
-async def update_queue_display(channel):
-    """Update the queue display with current players"""
-    # Find and delete ALL bot messages with queue info to prevent duplicates
-    messages_to_delete = []
-    async for message in channel.history(limit=50):
-        if message.author == bot.user and message.embeds:
-            embed = message.embeds[0]
-            if "Queue Status" in embed.title or "HeatSeeker Queue" in embed.title:
-                messages_to_delete.append(message)
+async def update_queue_display(channel, player_queue=None):
+    """Schedule a refresh of a queue's display with current players
 
-    # Delete all found queue messages
-    for message in messages_to_delete:
-        try:
-            await message.delete()
-        except:
-            pass
+    Without player_queue every queue of the channel's guild is refreshed.
+    Refreshes are debounced: each display is edited at most once per
+    QUEUE_DISPLAY_INTERVAL seconds and always shows the latest state.
+    """
+    if player_queue is None:
+        for guild_queue in guild_queues(channel.guild):
+            await update_queue_display(channel, guild_queue)
+        return
+
+    # Every queue change ends in a display refresh; re-arm its timers too
+    schedule_queue_timers(player_queue)
+
+    queue_display_updates.schedule(
+        (channel.id, player_queue.mode),
+        lambda: refresh_queue_display(channel, player_queue))
+
+
+def build_queue_embed(player_queue):
+    """The queue display embed for a queue's current state"""
+    title = f"🎮 HeatSeeker {player_queue.mode} Queue"
 
-    # Create updated queue display
     if not player_queue:
         embed = discord.Embed(
-            title="🎮 HeatSeeker Queue",
+            title=title,
             description=
             "**No players in queue**\nClick **🎮 Join Queue** to get started!",
             color=discord.Color.blue())
-        embed.add_field(name="⏰ Queue Timeout",
-                        value=f"{QUEUE_TIMEOUT_MINUTES} minutes of inactivity",
-                        inline=True)
+        embed.add_field(
+            name="⏰ Queue Timeout",
+            value=f"{player_queue.timeout_minutes} minutes per player",
+            inline=True)
     else:
         embed = discord.Embed(
-            title="🎮 HeatSeeker Queue",
-            description=f"**{len(player_queue)}/{QUEUE_SIZE}** players ready",
+            title=title,
+            description=
+            f"**{len(player_queue)}/{player_queue.size}** players ready",
             color=discord.Color.orange())
 
+        # Each player's AFK removal as a Discord relative timestamp, which
+        # counts down client-side without editing the message
         queue_text = ""
         for i, player in enumerate(player_queue, 1):
-            queue_text += f"{i}. **{player['username']}** ({player['mmr']} MMR)\n"
+            queue_text += f"{i}. **{player['username']}** ({player['mmr']} MMR)"
+            expires_at = player_expiry_timestamp(player_queue, player['id'])
+            if expires_at:
+                queue_text += f" · ⏳ <t:{int(expires_at)}:R>"
+            queue_text += "\n"
 
         embed.add_field(name="Players in Queue",
                         value=queue_text,
                         inline=False)
 
-        # Show time remaining if there's activity
-        if queue_last_activity:
-            time_elapsed = datetime.now() - queue_last_activity
-            time_remaining = timedelta(
-                minutes=QUEUE_TIMEOUT_MINUTES) - time_elapsed
-            if time_remaining.total_seconds() > 0:
-                minutes_remaining = int(time_remaining.total_seconds() // 60)
-                seconds_remaining = int(time_remaining.total_seconds() % 60)
-                embed.add_field(
-                    name="⏳ Time Remaining",
-                    value=f"{minutes_remaining}m {seconds_remaining}s",
-                    inline=True)
-            else:
-                embed.add_field(name="⏳ Time Remaining",
-                                value="Clearing soon...",
-                                inline=True)
+        embed.add_field(
+            name="⏰ Timeout",
+            value=
+            f"{player_queue.timeout_minutes} min per player (click Join to refresh)",
+            inline=True)
 
-        embed.add_field(name="⏰ Timeout",
-                        value=f"{QUEUE_TIMEOUT_MINUTES} min inactivity",
+    if player_queue.ready_check_seconds:
+        embed.add_field(name="✅ Ready Check",
+                        value=f"{player_queue.ready_check_seconds} seconds",
                         inline=True)
 
-    view = QueueView()
-    await channel.send(embed=embed, view=view)
+    return embed
+
+
+async def find_queue_message(channel, player_queue):
+    """Adopt an existing display of a queue with no recorded message id
+
+    Scans recent history once (first run, or a guild whose state was
+    evicted); duplicates left by older versions are deleted.
+    """
+    title = f"🎮 HeatSeeker {player_queue.mode} Queue"
+    found = None
+    async for message in channel.history(limit=50):
+        if (message.author == bot.user and message.embeds
+                and message.embeds[0].title == title):
+            if found is None:
+                found = message  # newest first
+            else:
+                try:
+                    await message.delete()
+                except discord.HTTPException:
+                    pass
+    return found
+
+
+async def refresh_queue_display(channel, player_queue):
+    """Edit the queue's display message in place, posting it if missing"""
+    embed = build_queue_embed(player_queue)
+    view = QueueView(player_queue.mode)
+
+    if player_queue.message_id:
+        message = channel.get_partial_message(player_queue.message_id)
+    else:
+        message = await find_queue_message(channel, player_queue)
+
+    if message is not None:
+        try:
+            await message.edit(embed=embed, view=view)
+            if message.id != player_queue.message_id:
+                player_queue.configure(message_id=message.id)
+            return
+        except discord.NotFound:
+            pass  # Display was deleted, post a new one
+
+    message = await channel.send(embed=embed, view=view)
+    player_queue.configure(message_id=message.id)
+
 
 
 @bot.event
@@ -2343,25 +2750,20 @@ async def on_ready():
     logger.info(
         f"Queue system will only work in channel: #{QUEUE_CHANNEL_NAME}")
 
-    # Add persistent views
-    bot.add_view(QueueView())
+    # Add persistent views (queue buttons are routed by custom_id)
+    bot.add_dynamic_items(QueueButton, ReadyButton)
     bot.add_view(MatchView(None))  # Add as persistent view
     bot.add_view(PrivateChatView())  # Add private chat view
     logger.info(
         "Persistent views added for queue, match, and private chat systems")
 
-    # Start the queue timeout check task
-    if not check_queue_timeout.is_running():
-        check_queue_timeout.start()
-        logger.info(
-            f"Started queue timeout system - {QUEUE_TIMEOUT_MINUTES} minute timeout"
-        )
-
-    # Start the automatic rank update task
-    if not auto_update_ranks.is_running():
-        auto_update_ranks.start()
-        logger.info(
-            "Started automatic rank update system - Updates every 10 minutes")
+    # Load the applied ranks, then check everyone once for MMR changes
+    # made while the bot was offline (only mismatches touch Discord)
+    indexed_count = await rank_index.load()
+    logger.info(f"RANK INDEX: Indexed {indexed_count} players")
+    applied_count = await rank_sync.load()
+    logger.info(f"RANK SYNC: Loaded {applied_count} applied ranks")
+    mark_all_ranks_dirty()
 
     # Sync slash commands
     try:
@@ -2370,23 +2772,24 @@ async def on_ready():
     except Exception as e:
         logger.error(f"Failed to sync commands: {e}")
 
+    # Bring back the queues as they were before the restart
+    await restore_queues()
+
     # Initialize queue displays in all guilds
     for guild in bot.guilds:
         channel = discord.utils.get(guild.channels, name=QUEUE_CHANNEL_NAME)
         if channel:
-            # Clear previous queue messages
-            async for message in channel.history(limit=100):
-                if message.author == bot.user:
-                    try:
-                        await message.delete()
-                    except:
-                        pass
+            # A restart only refreshes the recorded queue displays in
+            # place; the welcome message is sent once
+            if any(queue.message_id for queue in guild_queues(guild)):
+                await update_queue_display(channel)
+                continue
 
-            # Send professional startup message with buttons
-            match_type = f"{TEAM_SIZE}v{TEAM_SIZE}"
+            # Send professional startup message
+            match_types = queue_formats(guild)
             embed = discord.Embed(
                 title=
-                f"🔥 HeatSeeker Bot - Professional {match_type} Queue System",
+                f"🔥 HeatSeeker Bot - Professional {match_types} Queue System",
                 description=
                 "**Welcome to the ultimate competitive gaming experience!**\n\nUse the buttons below to interact with the queue system.",
                 color=discord.Color.gold())
@@ -2394,44 +2797,39 @@ async def on_ready():
             embed.add_field(
                 name="🎮 How It Works",
                 value=
-                f"• Click **🎮 Join Queue** to enter the {match_type} queue\n• When {QUEUE_SIZE} players join, a match will be created automatically\n• Each match gets dedicated text and voice channels\n• Teams are balanced based on MMR for fair gameplay",
+                f"• Click **🎮 Join Queue** under the format you want ({match_types})\n• When a queue is full, a match will be created automatically\n• Each match gets dedicated text and voice channels\n• Teams are balanced based on MMR for fair gameplay",
                 inline=False)
 
             embed.add_field(
                 name="🏆 Features",
                 value=
-                f"• **Dedicated match channels** for each game\n• **Team voice channels** ({TEAM_SIZE} players max each)\n• **Automatic team balancing** based on skill\n• **Professional MMR tracking** system\n• **Auto-cleanup** after matches complete",
+                "• **Dedicated match channels** for each game\n• **Team voice channels** for each team\n• **Automatic team balancing** based on skill\n• **Professional MMR tracking** system\n• **Auto-cleanup** after matches complete",
                 inline=False)
 
             embed.set_footer(
                 text="Ready to play? Click the buttons below to get started!")
 
-            # Send initial queue display with buttons
-            view = QueueView()
-            await channel.send(embed=embed, view=view)
+            await channel.send(embed=embed)
 
-            # Send queue status
+            # Send one queue display (with buttons) per format
             await update_queue_display(channel)
 
 
 # إضافة أو تحديث لاعب
-def add_or_update_player(user):
-    c.execute("SELECT * FROM players WHERE id = ?", (str(user.id), ))
-    result = c.fetchone()
-    if not result:
+async def add_or_update_player(user):
+    """Create the player on first contact or refresh their display name"""
+    row = rank_index.get(str(user.id))
+    if row and row[1] == user.display_name:
+        return  # Known player, name unchanged: nothing to write
+    created = await db.add_or_update_player(str(user.id), user.display_name)
+    if created:
         # New player starts with placement matches
-        c.execute(
-            "INSERT INTO players (id, username, mmr, placement_matches_remaining, is_placed) VALUES (?, ?, ?, ?, ?)",
-            (str(user.id), user.display_name, 1250, 5, 0))
-        conn.commit()
+        await rank_index.refresh([str(user.id)])
         logger.info(
             f"NEW PLAYER: {user.display_name} created with 5 placement matches"
         )
     else:
-        # Update display name if changed
-        c.execute("UPDATE players SET username = ? WHERE id = ?",
-                  (user.display_name, str(user.id)))
-        conn.commit()
+        rank_index.rename(str(user.id), user.display_name)
 
 @bot.tree.command(
     name="player_mmr",
@@ -2465,8 +2863,7 @@ async def player_mmr_command(interaction: discord.Interaction):
                 async def on_submit(self, modal_interaction: discord.Interaction):
                     pid = self.player_id.value.strip()
                     # Check if player exists
-                    c.execute("SELECT username FROM players WHERE id = ?", (pid,))
-                    result = c.fetchone()
+                    result = await db.fetchone("SELECT username FROM players WHERE id = ?", (pid,))
                     if not result:
                         await modal_interaction.response.send_message(
                             f"❌ No player found with ID `{pid}`.", ephemeral=True)
@@ -2503,8 +2900,9 @@ async def player_mmr_command(interaction: discord.Interaction):
                                             await mmr_modal_interaction.response.send_message(
                                                 "❌ Please enter a number between 0 and 5000.", ephemeral=True)
                                             return
-                                        c.execute("UPDATE players SET mmr = ? WHERE id = ?", (value, pid))
-                                        conn.commit()
+                                        await db.execute("UPDATE players SET mmr = ? WHERE id = ?", (value, pid))
+                                        await rank_index.refresh([pid])
+                                        mark_rank_dirty(pid, value)
                                         await mmr_modal_interaction.response.send_message(
                                             f"✅ Set **{username}**'s MMR to **{value}**.", ephemeral=True)
                                     except Exception as e:
@@ -2529,139 +2927,137 @@ async def player_mmr_command(interaction: discord.Interaction):
     )
     await interaction.response.send_message(embed=embed, view=InputPlayerIDView(), ephemeral=True)
 
-# أمر عرض الرانك
-@bot.tree.command(name='rank',
-                  description='Display your current rank and stats')
-async def rank(interaction: discord.Interaction):
-    """Display your current rank and stats"""
-    add_or_update_player(interaction.user)
-    c.execute(
-        "SELECT mmr, wins, losses, placement_matches_remaining, is_placed FROM players WHERE id = ?",
-        (str(interaction.user.id), ))
-    result = c.fetchone()
+def build_rank_embed(guild, user, row):
+    """The /rank embed of a player's rank index row"""
+    _, _, mmr, wins, losses, placement_remaining, is_placed = row
+    total_games = wins + losses
+    win_rate = (wins / total_games * 100) if total_games > 0 else 0
 
-    if result:
-        mmr, wins, losses, placement_remaining, is_placed = result
-        total_games = wins + losses
-        win_rate = (wins / total_games * 100) if total_games > 0 else 0
+    # Check if player is in placement matches
+    if placement_remaining > 0 and is_placed == 0:
+        # Player is in placement matches
+        embed = discord.Embed(
+            title=f"🔄 {user.display_name}'s Placement Matches",
+            description=
+            f"**Complete your placement matches to get ranked!**",
+            color=discord.Color.orange())
 
-        # Check if player is in placement matches
-        if placement_remaining > 0 and is_placed == 0:
-            # Player is in placement matches
-            embed = discord.Embed(
-                title=f"🔄 {interaction.user.display_name}'s Placement Matches",
-                description=
-                f"**Complete your placement matches to get ranked!**",
-                color=discord.Color.orange())
+        embed.add_field(
+            name="🔄 Placement Status",
+            value=
+            f"**{placement_remaining} matches remaining**\nComplete all 5 to unlock your rank!",
+            inline=False)
 
-            embed.add_field(
-                name="🔄 Placement Status",
-                value=
-                f"**{placement_remaining} matches remaining**\nComplete all 5 to unlock your rank!",
-                inline=False)
+        embed.add_field(name="🏆 Current MMR",
+                        value=f"**{mmr}**",
+                        inline=True)
+        embed.add_field(name="🎮 Wins", value=f"**{wins}**", inline=True)
+        embed.add_field(name="💔 Losses",
+                        value=f"**{losses}**",
+                        inline=True)
+        embed.add_field(name="📈 Win Rate",
+                        value=f"**{win_rate:.1f}%**",
+                        inline=True)
+        embed.add_field(name="🎯 Games Played",
+                        value=f"**{total_games}/5**",
+                        inline=True)
+        embed.add_field(name="🌍 Server", value="**MENA**", inline=True)
 
-            embed.add_field(name="🏆 Current MMR",
-                            value=f"**{mmr}**",
-                            inline=True)
-            embed.add_field(name="🎮 Wins", value=f"**{wins}**", inline=True)
-            embed.add_field(name="💔 Losses",
-                            value=f"**{losses}**",
-                            inline=True)
-            embed.add_field(name="📈 Win Rate",
-                            value=f"**{win_rate:.1f}%**",
-                            inline=True)
-            embed.add_field(name="🎯 Games Played",
-                            value=f"**{total_games}/5**",
-                            inline=True)
-            embed.add_field(name="🌍 Server", value="**MENA**", inline=True)
+        embed.add_field(
+            name="💡 Placement Matches Info",
+            value=
+            "• **Double MMR gains/losses** during placement\n• Your rank will be revealed after 5 matches\n• You won't appear in leaderboards until placed\n• Play strategically - these matches matter more!",
+            inline=False)
 
-            embed.add_field(
-                name="💡 Placement Matches Info",
-                value=
-                "• **Double MMR gains/losses** during placement\n• Your rank will be revealed after 5 matches\n• You won't appear in leaderboards until placed\n• Play strategically - these matches matter more!",
-                inline=False)
+        embed.add_field(
+            name="🎯 What happens next?",
+            value=
+            f"After **{placement_remaining} more matches**, you'll receive your official rank based on your final MMR!",
+            inline=False)
 
-            embed.add_field(
-                name="🎯 What happens next?",
-                value=
-                f"After **{placement_remaining} more matches**, you'll receive your official rank based on your final MMR!",
-                inline=False)
+        embed.set_footer(
+            text=
+            f"Placement matches give double MMR • Current queue: {queue_formats(guild)}"
+        )
 
-            embed.set_footer(
-                text=
-                f"Placement matches give double MMR • Current queue: {TEAM_SIZE}v{TEAM_SIZE}"
-            )
+    else:
+        # Player has completed placement matches
+        current_rank = get_rank_from_mmr(mmr, is_placed)
 
-        else:
-            # Player has completed placement matches
-            current_rank = get_rank_from_mmr(mmr, is_placed)
+        # Rank position and total among placed players
+        rank_position = rank_index.ranked_position(mmr)
+        _, total_placed_players, _ = rank_index.counts()
 
-            # Calculate rank position (only among placed players)
-            c.execute(
-                "SELECT COUNT(*) FROM players WHERE mmr > ? AND is_placed = 1",
-                (mmr, ))
-            rank_position = c.fetchone()[0] + 1
+        embed = discord.Embed(
+            title=f"🎖️ {user.display_name}'s Rank & Stats",
+            description=
+            f"**Rank #{rank_position}** out of {total_placed_players} ranked players",
+            color=discord.Color.gold())
 
-            # Get total placed players
-            c.execute("SELECT COUNT(*) FROM players WHERE is_placed = 1")
-            total_placed_players = c.fetchone()[0]
+        # Current Rank
+        embed.add_field(
+            name="🏅 Current Rank",
+            value=
+            f"{current_rank['emoji']} **{current_rank['name']}**\nMMR Range: {current_rank['min_mmr']} - {current_rank['max_mmr']}",
+            inline=False)
 
-            embed = discord.Embed(
-                title=f"🎖️ {interaction.user.display_name}'s Rank & Stats",
-                description=
-                f"**Rank #{rank_position}** out of {total_placed_players} ranked players",
-                color=discord.Color.gold())
+        embed.add_field(name="🏆 MMR", value=f"**{mmr}**", inline=True)
+        embed.add_field(name="🎮 Wins", value=f"**{wins}**", inline=True)
+        embed.add_field(name="💔 Losses",
+                        value=f"**{losses}**",
+                        inline=True)
+        embed.add_field(name="📈 Win Rate",
+                        value=f"**{win_rate:.1f}%**",
+                        inline=True)
+        embed.add_field(name="🎯 Total Games",
+                        value=f"**{total_games}**",
+                        inline=True)
+        embed.add_field(name="🌍 Server", value="**MENA**", inline=True)
+
+        # Progress to next rank
+        next_rank = rank_table.next_tier(mmr)
 
-            # Current Rank
+        if next_rank:
+            mmr_needed = next_rank['min_mmr'] - mmr
             embed.add_field(
-                name="🏅 Current Rank",
+                name="🎯 Next Rank",
+                value=
+                f"{next_rank['emoji']} **{next_rank['name']}**\nNeed **{mmr_needed}** more MMR",
+                inline=False)
+        else:
+            embed.add_field(
+                name="🏆 Achievement",
                 value=
-                f"{current_rank['emoji']} **{current_rank['name']}**\nMMR Range: {current_rank['min_mmr']} - {current_rank['max_mmr']}",
+                "**You've reached the highest rank!**\nCongratulations, Legendary Seeker!",
                 inline=False)
 
-            embed.add_field(name="🏆 MMR", value=f"**{mmr}**", inline=True)
-            embed.add_field(name="🎮 Wins", value=f"**{wins}**", inline=True)
-            embed.add_field(name="💔 Losses",
-                            value=f"**{losses}**",
-                            inline=True)
-            embed.add_field(name="📈 Win Rate",
-                            value=f"**{win_rate:.1f}%**",
-                            inline=True)
-            embed.add_field(name="🎯 Total Games",
-                            value=f"**{total_games}**",
-                            inline=True)
-            embed.add_field(name="🌍 Server", value="**MENA**", inline=True)
-
-            # Progress to next rank
-            next_rank = None
-            for rank_key, rank_data in RANK_ROLES.items():
-                if rank_data['min_mmr'] > mmr:
-                    if next_rank is None or rank_data['min_mmr'] < next_rank[
-                            'min_mmr']:
-                        next_rank = rank_data
-
-            if next_rank:
-                mmr_needed = next_rank['min_mmr'] - mmr
-                embed.add_field(
-                    name="🎯 Next Rank",
-                    value=
-                    f"{next_rank['emoji']} **{next_rank['name']}**\nNeed **{mmr_needed}** more MMR",
-                    inline=False)
-            else:
-                embed.add_field(
-                    name="🏆 Achievement",
-                    value=
-                    "**You've reached the highest rank!**\nCongratulations, Legendary Seeker!",
-                    inline=False)
+        embed.set_footer(
+            text=
+            f"Placement completed • Current queue: {queue_formats(guild)} • Keep playing to climb ranks!"
+        )
 
-            embed.set_footer(
-                text=
-                f"Placement completed • Current queue: {TEAM_SIZE}v{TEAM_SIZE} • Keep playing to climb ranks!"
-            )
+    return embed
+
+
+# أمر عرض الرانك
+@bot.tree.command(name='rank',
+                  description='Display your current rank and stats')
+async def rank(interaction: discord.Interaction):
+    """Display your current rank and stats"""
+    await add_or_update_player(interaction.user)
+    player_id = str(interaction.user.id)
+    row = rank_index.get(player_id)
 
-            # Auto-sync rank role
-            await update_player_rank_role(interaction.guild,
-                                          str(interaction.user.id), mmr)
+    if row:
+        embed = cached_embed(
+            ('rank', interaction.guild.id, player_id,
+             interaction.user.display_name, queue_formats(interaction.guild)),
+            lambda: build_rank_embed(interaction.guild, interaction.user, row))
+
+        # Auto-sync rank role once placement is complete
+        _, _, mmr, _, _, placement_remaining, is_placed = row
+        if not (placement_remaining > 0 and is_placed == 0):
+            await update_player_rank_role(interaction.guild, player_id, mmr)
 
         await interaction.response.send_message(embed=embed)
 
@@ -2670,20 +3066,76 @@ async def rank(interaction: discord.Interaction):
             "❌ Error retrieving your stats. Please try again.")
 
 
-# Combined leaderboard pagination view
-class CombinedLeaderboardView(discord.ui.View):
+class PagedLeaderboardView(discord.ui.View):
+    """Page state shared by the leaderboard views
 
-    def __init__(self, current_page=1):
+    Next/Previous seek from the sort key of the row at the edge of the page
+    on screen (keyset pagination), so players moving while someone pages
+    never make rows skip or repeat. Pages are served from leaderboard_pages
+    until rank_index changes.
+    """
+
+    cache_name = 'ranked'
+    ranked_only = True
+
+    def __init__(self, current_page=1, items_per_page=10):
         super().__init__(timeout=300)
         self.current_page = current_page
-        self.items_per_page = 15
+        self.items_per_page = items_per_page
+        self.page_players = []
+        self.version = None  # rank_index.version of the page on screen
+
+    def load_page(self, guild, step=0):
+        """Move step pages (-1, 0 or 1) and return the new page's rows"""
+        page = self.current_page + step
+        version = rank_index.version
+        key = (guild.id, self.cache_name, page)
+        rows = leaderboard_pages.get(key, version)
+        if rows is None:
+            if step and page > 1 and self.page_players:
+                if step > 0:
+                    rows = rank_index.page_after(
+                        rank_index.sort_key(self.page_players[-1],
+                                            self.ranked_only),
+                        self.items_per_page, self.ranked_only)
+                else:
+                    rows = rank_index.page_before(
+                        rank_index.sort_key(self.page_players[0],
+                                            self.ranked_only),
+                        self.items_per_page, self.ranked_only)
+            else:
+                rows = rank_index.page(page, self.items_per_page,
+                                       self.ranked_only)
+            # A seek from a page shown before the index changed is right for
+            # this view but not necessarily page N for everyone else
+            if not step or self.version == version:
+                leaderboard_pages.put(key, version, rows)
+        self.current_page, self.page_players, self.version = page, rows, version
+        return rows
+
+    def page_embed(self, guild):
+        """build_page_embed, served from rendered_embeds while the page's
+        players and rank_index are unchanged"""
+        return cached_embed(
+            (self.cache_name, guild.id, self.current_page,
+             tuple(row[0] for row in self.page_players), queue_formats(guild)),
+            lambda: self.build_page_embed(guild))
+
+
+# Combined leaderboard pagination view
+class CombinedLeaderboardView(PagedLeaderboardView):
+
+    cache_name = 'combined'
+    ranked_only = False
+
+    def __init__(self, current_page=1):
+        super().__init__(current_page, items_per_page=15)
 
     @discord.ui.button(label="◀️ السابق", style=discord.ButtonStyle.primary)
     async def previous_page(self, interaction: discord.Interaction,
                             button: discord.ui.Button):
         if self.current_page > 1:
-            self.current_page -= 1
-            await self.update_combined_leaderboard(interaction)
+            await self.update_combined_leaderboard(interaction, -1)
         else:
             await interaction.response.send_message(
                 "❌ أنت في الصفحة الأولى بالفعل!", ephemeral=True)
@@ -2692,148 +3144,126 @@ class CombinedLeaderboardView(discord.ui.View):
     async def next_page(self, interaction: discord.Interaction,
                         button: discord.ui.Button):
         # Check if there are more pages
-        c.execute(
-            "SELECT COUNT(*) FROM players WHERE wins > 0 OR losses > 0 OR placement_matches_remaining < 5"
-        )
-        total_active_players = c.fetchone()[0]
+        total_active_players, _, _ = rank_index.counts()
         total_pages = (total_active_players + self.items_per_page -
                        1) // self.items_per_page
 
         if self.current_page < total_pages:
-            self.current_page += 1
-            await self.update_combined_leaderboard(interaction)
+            await self.update_combined_leaderboard(interaction, 1)
         else:
             await interaction.response.send_message(
                 "❌ أنت في الصفحة الأخيرة بالفعل!", ephemeral=True)
 
-    async def update_combined_leaderboard(self,
-                                          interaction: discord.Interaction):
-        """Update the combined leaderboard display"""
-        offset = (self.current_page - 1) * self.items_per_page
-        c.execute(
-            """
-            SELECT id, username, mmr, wins, losses, placement_matches_remaining, is_placed
-            FROM players 
-            WHERE wins > 0 OR losses > 0 OR placement_matches_remaining < 5
-            ORDER BY 
-                CASE WHEN is_placed = 1 THEN 0 ELSE 1 END,
-                mmr DESC 
-            LIMIT ? OFFSET ?
-        """, (self.items_per_page, offset))
-
-        page_players = c.fetchall()
+    def build_page_embed(self, guild):
+        """Embed of the page on screen (self.page_players)"""
+        page_players = self.page_players
 
         # Get total counts
-        c.execute(
-            "SELECT COUNT(*) FROM players WHERE wins > 0 OR losses > 0 OR placement_matches_remaining < 5"
+        total_active_players, total_ranked, total_placement = rank_index.counts(
         )
-        total_active_players = c.fetchone()[0]
         total_pages = (total_active_players + self.items_per_page -
                        1) // self.items_per_page
 
-        c.execute("SELECT COUNT(*) FROM players WHERE is_placed = 1")
-        total_ranked = c.fetchone()[0]
+        embed = discord.Embed(
+            title="🏆 لوحة المتصدرين الشاملة",
+            description=
+            f"**جميع اللاعبين النشطين** (الصفحة {self.current_page}/{total_pages})",
+            color=discord.Color.gold())
 
-        c.execute(
-            "SELECT COUNT(*) FROM players WHERE placement_matches_remaining > 0 AND is_placed = 0"
-        )
-        total_placement = c.fetchone()[0]
+        # Separate players
+        ranked_players = []
+        placement_players = []
 
-        if page_players:
-            embed = discord.Embed(
-                title="🏆 لوحة المتصدرين الشاملة",
-                description=
-                f"**جميع اللاعبين النشطين** (الصفحة {self.current_page}/{total_pages})",
-                color=discord.Color.gold())
+        for player_data in page_players:
+            if player_data[6] == 1:  # is_placed
+                ranked_players.append(player_data)
+            else:
+                placement_players.append(player_data)
 
-            # Separate players
-            ranked_players = []
-            placement_players = []
+        leaderboard_text = ""
 
-            for player_data in page_players:
-                if player_data[6] == 1:  # is_placed
-                    ranked_players.append(player_data)
-                else:
-                    placement_players.append(player_data)
+        # Show ranked players first
+        if ranked_players:
+            leaderboard_text += "**🏅 اللاعبين المصنفين:**\n\n"
+            for i, (player_id, username, mmr, wins, losses, _,
+                    _) in enumerate(ranked_players):
+                # Calculate global rank for medals
+                global_rank = rank_index.ranked_position(mmr)
 
-            leaderboard_text = ""
+                medal = "🥇" if global_rank == 1 else "🥈" if global_rank == 2 else "🥉" if global_rank == 3 else f"**{global_rank}.**"
+                total_games = wins + losses
+                win_rate = (wins / total_games *
+                            100) if total_games > 0 else 0
 
-            # Show ranked players first
-            if ranked_players:
-                leaderboard_text += "**🏅 اللاعبين المصنفين:**\n\n"
-                for i, (player_id, username, mmr, wins, losses, _,
-                        _) in enumerate(ranked_players):
-                    # Calculate global rank for medals
-                    c.execute(
-                        "SELECT COUNT(*) FROM players WHERE mmr > ? AND is_placed = 1",
-                        (mmr, ))
-                    global_rank = c.fetchone()[0] + 1
-
-                    medal = "🥇" if global_rank == 1 else "🥈" if global_rank == 2 else "🥉" if global_rank == 3 else f"**{global_rank}.**"
-                    total_games = wins + losses
-                    win_rate = (wins / total_games *
-                                100) if total_games > 0 else 0
+                # Get rank info
+                rank_info = get_rank_from_mmr(mmr, True)
+                rank_emoji = rank_info['emoji']
 
-                    # Get rank info
-                    rank_info = get_rank_from_mmr(mmr, True)
-                    rank_emoji = rank_info['emoji']
+                # Get display name
+                try:
+                    member = guild.get_member(int(player_id))
+                    display_name = member.display_name if member else username
+                    if len(display_name) > 12:
+                        display_name = display_name[:9] + "..."
+                except:
+                    display_name = username
+                    if len(display_name) > 12:
+                        display_name = display_name[:9] + "..."
 
-                    # Get display name
-                    try:
-                        member = interaction.guild.get_member(int(player_id))
-                        display_name = member.display_name if member else username
-                        if len(display_name) > 12:
-                            display_name = display_name[:9] + "..."
-                    except:
-                        display_name = username
-                        if len(display_name) > 12:
-                            display_name = display_name[:9] + "..."
-
-                    leaderboard_text += f"{medal} {rank_emoji} **{display_name}** - {mmr} MMR\n"
-                    leaderboard_text += f"     W: {wins} | L: {losses} | WR: {win_rate:.1f}%\n\n"
-
-            # Show placement players
-            if placement_players:
-                leaderboard_text += "**🔄 لاعبين في مباريات التأهيل:**\n\n"
-                for player_data in placement_players:
-                    player_id, username, mmr, wins, losses, placement_remaining, _ = player_data
-                    total_games = wins + losses
-                    win_rate = (wins / total_games *
-                                100) if total_games > 0 else 0
+                leaderboard_text += f"{medal} {rank_emoji} **{display_name}** - {mmr} MMR\n"
+                leaderboard_text += f"     W: {wins} | L: {losses} | WR: {win_rate:.1f}%\n\n"
 
-                    # Get display name
-                    try:
-                        member = interaction.guild.get_member(int(player_id))
-                        display_name = member.display_name if member else username
-                        if len(display_name) > 12:
-                            display_name = display_name[:9] + "..."
-                    except:
-                        display_name = username
-                        if len(display_name) > 12:
-                            display_name = display_name[:9] + "..."
-
-                    leaderboard_text += f"🔄 **{display_name}** - {mmr} MMR\n"
-                    leaderboard_text += f"     W: {wins} | L: {losses} | WR: {win_rate:.1f}% | **{placement_remaining} متبقي**\n\n"
-
-            embed.add_field(name="📊 اللاعبين النشطين",
-                            value=leaderboard_text,
-                            inline=False)
+        # Show placement players
+        if placement_players:
+            leaderboard_text += "**🔄 لاعبين في مباريات التأهيل:**\n\n"
+            for player_data in placement_players:
+                player_id, username, mmr, wins, losses, placement_remaining, _ = player_data
+                total_games = wins + losses
+                win_rate = (wins / total_games *
+                            100) if total_games > 0 else 0
 
-            embed.add_field(
-                name="📈 الإحصائيات",
-                value=
-                f"**مصنفين:** {total_ranked}\n**في التأهيل:** {total_placement}",
-                inline=True)
+                # Get display name
+                try:
+                    member = guild.get_member(int(player_id))
+                    display_name = member.display_name if member else username
+                    if len(display_name) > 12:
+                        display_name = display_name[:9] + "..."
+                except:
+                    display_name = username
+                    if len(display_name) > 12:
+                        display_name = display_name[:9] + "..."
 
-            embed.add_field(name="🎮 الطابور",
-                            value=f"**{TEAM_SIZE}v{TEAM_SIZE}**",
-                            inline=True)
+                leaderboard_text += f"🔄 **{display_name}** - {mmr} MMR\n"
+                leaderboard_text += f"     W: {wins} | L: {losses} | WR: {win_rate:.1f}% | **{placement_remaining} متبقي**\n\n"
 
-            embed.set_footer(
-                text=
-                f"عرض {len(page_players)} لاعب • الصفحة {self.current_page}/{total_pages}"
-            )
+        embed.add_field(name="📊 اللاعبين النشطين",
+                        value=leaderboard_text,
+                        inline=False)
+
+        embed.add_field(
+            name="📈 الإحصائيات",
+            value=
+            f"**مصنفين:** {total_ranked}\n**في التأهيل:** {total_placement}",
+            inline=True)
+
+        embed.add_field(name="🎮 الطابور",
+                        value=f"**{queue_formats(guild)}**",
+                        inline=True)
+
+        embed.set_footer(
+            text=
+            f"عرض {len(page_players)} لاعب • الصفحة {self.current_page}/{total_pages}"
+        )
+        return embed
 
+    async def update_combined_leaderboard(self,
+                                          interaction: discord.Interaction,
+                                          step=0):
+        """Update the combined leaderboard display"""
+        page_players = self.load_page(interaction.guild, step)
+
+        if page_players:
+            embed = self.page_embed(interaction.guild)
             await interaction.response.edit_message(embed=embed, view=self)
         else:
             embed = discord.Embed(
@@ -2844,19 +3274,16 @@ class CombinedLeaderboardView(discord.ui.View):
 
 
 # Legacy leaderboard view for backward compatibility
-class LeaderboardView(discord.ui.View):
+class LeaderboardView(PagedLeaderboardView):
 
     def __init__(self, current_page=1):
-        super().__init__(timeout=300)
-        self.current_page = current_page
-        self.items_per_page = 10
+        super().__init__(current_page, items_per_page=10)
 
     @discord.ui.button(label="◀️ Previous", style=discord.ButtonStyle.primary)
     async def previous_page(self, interaction: discord.Interaction,
                             button: discord.ui.Button):
         if self.current_page > 1:
-            self.current_page -= 1
-            await self.update_leaderboard(interaction)
+            await self.update_leaderboard(interaction, -1)
         else:
             await interaction.response.send_message(
                 "❌ You're already on the first page!", ephemeral=True)
@@ -2865,84 +3292,80 @@ class LeaderboardView(discord.ui.View):
     async def next_page(self, interaction: discord.Interaction,
                         button: discord.ui.Button):
         # Check if there are more pages
-        c.execute("SELECT COUNT(*) FROM players WHERE wins > 0 OR losses > 0")
-        total_active_players = c.fetchone()[0]
-        total_pages = (total_active_players + self.items_per_page -
+        _, total_ranked_players, _ = rank_index.counts()
+        total_pages = (total_ranked_players + self.items_per_page -
                        1) // self.items_per_page
 
         if self.current_page < total_pages:
-            self.current_page += 1
-            await self.update_leaderboard(interaction)
+            await self.update_leaderboard(interaction, 1)
         else:
             await interaction.response.send_message(
                 "❌ You're already on the last page!", ephemeral=True)
 
-    async def update_leaderboard(self, interaction: discord.Interaction):
-        """Update the leaderboard display"""
-        # Get only players who have completed placement matches
-        offset = (self.current_page - 1) * self.items_per_page
-        c.execute(
-            """
-            SELECT id, username, mmr, wins, losses 
-            FROM players 
-            WHERE is_placed = 1
-            ORDER BY mmr DESC 
-            LIMIT ? OFFSET ?
-        """, (self.items_per_page, offset))
-
-        page_players = c.fetchall()
+    def build_page_embed(self, guild):
+        """Embed of the page on screen (self.page_players)"""
+        page_players = self.page_players
 
         # Get total count for pagination info
-        c.execute("SELECT COUNT(*) FROM players WHERE is_placed = 1")
-        total_ranked_players = c.fetchone()[0]
+        _, total_ranked_players, _ = rank_index.counts()
         total_pages = (total_ranked_players + self.items_per_page -
                        1) // self.items_per_page
 
-        if page_players:
-            embed = discord.Embed(
-                title="🏆 HeatSeeker Leaderboard",
-                description=
-                f"**Ranked Players Only** (Page {self.current_page}/{total_pages})",
-                color=discord.Color.gold())
+        embed = discord.Embed(
+            title="🏆 HeatSeeker Leaderboard",
+            description=
+            f"**Ranked Players Only** (Page {self.current_page}/{total_pages})",
+            color=discord.Color.gold())
 
-            leaderboard_text = ""
-            for i, (player_id, username, mmr, wins,
-                    losses) in enumerate(page_players):
-                rank = offset + i + 1
-
-                # Special medals for top 3 overall
-                if rank == 1:
-                    medal = "🥇"
-                elif rank == 2:
-                    medal = "🥈"
-                elif rank == 3:
-                    medal = "🥉"
-                else:
-                    medal = f"**{rank}.**"
+        leaderboard_text = ""
+        for player_id, username, mmr, wins, losses in page_players:
+            # Position among ranked players, the same number /rank shows
+            # (keyset pages need not start at (page - 1) * items_per_page)
+            rank = rank_index.ranked_position(mmr)
+
+            # Special medals for top 3 overall
+            if rank == 1:
+                medal = "🥇"
+            elif rank == 2:
+                medal = "🥈"
+            elif rank == 3:
+                medal = "🥉"
+            else:
+                medal = f"**{rank}.**"
 
-                total_games = wins + losses
-                win_rate = (wins / total_games * 100) if total_games > 0 else 0
+            total_games = wins + losses
+            win_rate = (wins / total_games * 100) if total_games > 0 else 0
 
-                # Get rank info
-                rank_info = get_rank_from_mmr(mmr, True)
-                rank_emoji = rank_info['emoji']
+            # Get rank info
+            rank_info = get_rank_from_mmr(mmr, True)
+            rank_emoji = rank_info['emoji']
 
-                # Get the actual Discord member to show display name
-                try:
-                    member = interaction.guild.get_member(int(player_id))
-                    display_name = member.display_name if member else username
-                except:
-                    display_name = username
+            # Get the actual Discord member to show display name
+            try:
+                member = guild.get_member(int(player_id))
+                display_name = member.display_name if member else username
+            except:
+                display_name = username
 
-                leaderboard_text += f"{medal} {rank_emoji} **{display_name}** - {mmr} MMR\n"
-                leaderboard_text += f"     W: {wins} | L: {losses} | WR: {win_rate:.1f}%\n\n"
+            leaderboard_text += f"{medal} {rank_emoji} **{display_name}** - {mmr} MMR\n"
+            leaderboard_text += f"     W: {wins} | L: {losses} | WR: {win_rate:.1f}%\n\n"
 
-            embed.description += f"\n\n{leaderboard_text}"
-            embed.set_footer(
-                text=
-                f"Showing {len(page_players)} ranked players • Only players who completed placement matches"
-            )
+        embed.description += f"\n\n{leaderboard_text}"
+        embed.set_footer(
+            text=
+            f"Showing {len(page_players)} ranked players • Only players who completed placement matches"
+        )
+        return embed
+
+    async def update_leaderboard(self,
+                                 interaction: discord.Interaction,
+                                 step=0):
+        """Update the leaderboard display"""
+        # Get only players who have completed placement matches
+        page_players = self.load_page(interaction.guild, step)
 
+        if page_players:
+            embed = self.page_embed(interaction.guild)
             await interaction.response.edit_message(embed=embed, view=self)
         else:
             embed = discord.Embed(
@@ -2955,8 +3378,11 @@ class LeaderboardView(discord.ui.View):
 
 # Traditional command versions for better compatibility
 @bot.command(name='queueplayer')
-async def queueplayer_cmd(ctx, players: int):
-    """Set the number of players for the queue (2=1v1, 4=2v2, 6=3v3, etc.)"""
+async def queueplayer_cmd(ctx,
+                          players: int,
+                          timeout: int = QUEUE_TIMEOUT_MINUTES,
+                          ready_check: int = 0):
+    """Open a queue for a format (2=1v1, 4=2v2, 6=3v3, etc.)"""
 
     # Check if user is admin
     if not ctx.author.guild_permissions.administrator:
@@ -2972,26 +3398,21 @@ async def queueplayer_cmd(ctx, players: int):
         await ctx.send("❌ Number of players must be even (2, 4, 6, 8, etc.)!")
         return
 
-    # Update global queue configuration
-    global QUEUE_SIZE, TEAM_SIZE
-    QUEUE_SIZE = players
-    TEAM_SIZE = players // 2
-
-    # Clear current queue if any
-    global player_queue
-    if player_queue:
-        player_queue.clear()
+    # Open (or reconfigure) this format's queue; other queues keep running
+    player_queue = get_queue(ctx.guild, mode_for_size(players))
+    player_queue.configure(timeout_minutes=max(1, timeout),
+                           ready_check_seconds=max(0, ready_check))
 
     # Create configuration embed
     embed = discord.Embed(
         title="⚙️ Queue Configuration Updated!",
-        description=f"Queue system has been reconfigured successfully",
+        description=f"The {player_queue.mode} queue is open",
         color=discord.Color.green())
 
     embed.add_field(
         name="🎯 New Configuration",
         value=
-        f"**Total Players:** {QUEUE_SIZE}\n**Team Size:** {TEAM_SIZE}v{TEAM_SIZE}\n**Teams:** 2 teams",
+        f"**Total Players:** {player_queue.size}\n**Team Size:** {player_queue.mode}\n**Timeout:** {player_queue.timeout_minutes} minutes\n**Ready Check:** {f'{player_queue.ready_check_seconds} seconds' if player_queue.ready_check_seconds else 'Off'}",
         inline=True)
 
     embed.add_field(name="🌍 Server Region",
@@ -3003,9 +3424,9 @@ async def queueplayer_cmd(ctx, players: int):
                     inline=True)
 
     embed.add_field(
-        name="🔄 Queue Reset",
+        name="🎮 Running Queues",
         value=
-        "Current queue has been cleared\nPlayers need to rejoin with new configuration",
+        f"{queue_formats(ctx.guild)}\nPlayers in other queues keep their place",
         inline=False)
 
     embed.set_footer(
@@ -3017,11 +3438,11 @@ async def queueplayer_cmd(ctx, players: int):
     queue_channel = discord.utils.get(ctx.guild.channels,
                                       name=QUEUE_CHANNEL_NAME)
     if queue_channel:
-        await update_queue_display(queue_channel)
+        await update_queue_display(queue_channel, player_queue)
 
     # Log the change
     logger.info(
-        f"Queue configuration changed to {TEAM_SIZE}v{TEAM_SIZE} ({QUEUE_SIZE} players) by {ctx.author.display_name}"
+        f"Queue {player_queue.mode} opened ({player_queue.size} players, {player_queue.timeout_minutes} min timeout) by {ctx.author.display_name}"
     )
 
 
@@ -3034,8 +3455,7 @@ async def setleaderboard_cmd(ctx):
         await ctx.send("❌ Only administrators can set leaderboard channel!")
         return
 
-    global leaderboard_channel
-    leaderboard_channel = ctx.channel
+    guild_state(ctx.guild).set_leaderboard_channel(ctx.channel)
 
     # Start the leaderboard update task
     if not update_leaderboard.is_running():
@@ -3057,7 +3477,7 @@ async def setleaderboard_cmd(ctx):
 
     embed.add_field(
         name="🎯 Current Queue",
-        value=f"**{TEAM_SIZE}v{TEAM_SIZE}** ({QUEUE_SIZE} players)",
+        value=f"**{queue_formats(ctx.guild)}**",
         inline=True)
 
     embed.add_field(
@@ -3072,7 +3492,7 @@ async def setleaderboard_cmd(ctx):
     await ctx.send(embed=embed)
 
     # Trigger immediate update
-    await update_leaderboard()
+    await post_leaderboard(ctx.channel)
 
     logger.info(
         f"Leaderboard channel set to {ctx.channel.name} by {ctx.author.display_name}"
@@ -3082,6 +3502,7 @@ async def setleaderboard_cmd(ctx):
 @bot.command(name='creatematch')
 async def creatematch_cmd(ctx, match_name: str):
     """Create a custom match with specific HSM name"""
+    active_matches = guild_state(ctx.guild).active_matches
 
     # Check if user is admin
     if not ctx.author.guild_permissions.administrator:
@@ -3166,7 +3587,7 @@ async def creatematch_cmd(ctx, match_name: str):
         voice_channel = await ctx.guild.create_voice_channel(
             name=f"🎮 HSM{hsm_number} - Game Room",
             category=category,
-            user_limit=QUEUE_SIZE)
+            user_limit=max(queue.size for queue in guild_queues(ctx.guild)))
 
         embed.add_field(
             name="📍 Match Channels",
@@ -3204,40 +3625,44 @@ async def creatematch_cmd(ctx, match_name: str):
         await ctx.send(f"❌ Error creating match channels: {e}")
 
 
+def build_stats_embed(row):
+    """The !stats embed of a player's rank index row"""
+    _, username, mmr, wins, losses, _, _ = row
+    total_games = wins + losses
+    win_rate = (wins / total_games * 100) if total_games > 0 else 0
+
+    embed = discord.Embed(title=f"📊 {username}'s Statistics",
+                          color=discord.Color.green())
+    embed.add_field(name="MMR", value=f"**{mmr}**", inline=True)
+    embed.add_field(name="Wins", value=f"**{wins}**", inline=True)
+    embed.add_field(name="Losses", value=f"**{losses}**", inline=True)
+    embed.add_field(name="Total Games",
+                    value=f"**{total_games}**",
+                    inline=True)
+    embed.add_field(name="Win Rate",
+                    value=f"**{win_rate:.1f}%**",
+                    inline=True)
+
+    # Calculate rank position
+    rank_position = rank_index.position(mmr)
+    embed.add_field(name="Rank",
+                    value=f"**#{rank_position}**",
+                    inline=True)
+
+    return embed
+
+
 # Stats command
 @bot.command(name='stats')
 async def stats(ctx, member: discord.Member = None):
     """Display stats for a specific player"""
     target_user = member or ctx.author
+    player_id = str(target_user.id)
+    row = rank_index.get(player_id)
 
-    c.execute("SELECT username, mmr, wins, losses FROM players WHERE id = ?",
-              (str(target_user.id), ))
-    result = c.fetchone()
-
-    if result:
-        username, mmr, wins, losses = result
-        total_games = wins + losses
-        win_rate = (wins / total_games * 100) if total_games > 0 else 0
-
-        embed = discord.Embed(title=f"📊 {username}'s Statistics",
-                              color=discord.Color.green())
-        embed.add_field(name="MMR", value=f"**{mmr}**", inline=True)
-        embed.add_field(name="Wins", value=f"**{wins}**", inline=True)
-        embed.add_field(name="Losses", value=f"**{losses}**", inline=True)
-        embed.add_field(name="Total Games",
-                        value=f"**{total_games}**",
-                        inline=True)
-        embed.add_field(name="Win Rate",
-                        value=f"**{win_rate:.1f}%**",
-                        inline=True)
-
-        # Calculate rank position
-        c.execute("SELECT COUNT(*) FROM players WHERE mmr > ?", (mmr, ))
-        rank_position = c.fetchone()[0] + 1
-        embed.add_field(name="Rank",
-                        value=f"**#{rank_position}**",
-                        inline=True)
-
+    if row:
+        embed = cached_embed(('stats', player_id),
+                             lambda: build_stats_embed(row))
         await ctx.send(embed=embed)
     else:
         await ctx.send(
@@ -3245,83 +3670,81 @@ async def stats(ctx, member: discord.Member = None):
         )
 
 
-# Additional traditional commands
-@bot.command(name='rank')
-async def rank_cmd(ctx):
-    """Display your current rank and stats"""
-    add_or_update_player(ctx.author)
-    user_id = str(ctx.author.id)
+def build_rank_cmd_embed(guild, row):
+    """The !rank embed of a player's rank index row"""
+    _, username, mmr, wins, losses, _, _ = row
+
+    # Get current rank information
+    current_rank = get_rank_from_mmr(mmr)
 
-    c.execute("SELECT username, mmr, wins, losses FROM players WHERE id = ?",
-              (user_id, ))
-    result = c.fetchone()
+    # Calculate rank position
+    rank_position = rank_index.position(mmr)
 
-    if result:
-        username, mmr, wins, losses = result
+    # Get total players
+    total_players = len(rank_index)
 
-        # Get current rank information
-        current_rank = get_rank_from_mmr(mmr)
+    total_games = wins + losses
+    win_rate = (wins / total_games * 100) if total_games > 0 else 0
 
-        # Calculate rank position
-        c.execute("SELECT COUNT(*) FROM players WHERE mmr > ?", (mmr, ))
-        rank_position = c.fetchone()[0] + 1
+    embed = discord.Embed(
+        title=f"🎖️ {username}'s Rank & Stats",
+        description=
+        f"**Rank #{rank_position}** out of {total_players} players",
+        color=discord.Color.gold())
 
-        # Get total players
-        c.execute("SELECT COUNT(*) FROM players")
-        total_players = c.fetchone()[0]
+    # Current Rank
+    embed.add_field(
+        name="🏅 Current Rank",
+        value=
+        f"{current_rank['emoji']} **{current_rank['name']}**\nMMR Range: {current_rank['min_mmr']} - {current_rank['max_mmr']}",
+        inline=False)
 
-        total_games = wins + losses
-        win_rate = (wins / total_games * 100) if total_games > 0 else 0
+    embed.add_field(name="🏆 MMR", value=f"**{mmr}**", inline=True)
+    embed.add_field(name="🎮 Wins", value=f"**{wins}**", inline=True)
+    embed.add_field(name="💔 Losses", value=f"**{losses}**", inline=True)
+    embed.add_field(name="📈 Win Rate",
+                    value=f"**{win_rate:.1f}%**",
+                    inline=True)
+    embed.add_field(name="🎯 Total Games",
+                    value=f"**{total_games}**",
+                    inline=True)
+    embed.add_field(name="🌍 Server", value="**MENA**", inline=True)
 
-        embed = discord.Embed(
-            title=f"🎖️ {username}'s Rank & Stats",
-            description=
-            f"**Rank #{rank_position}** out of {total_players} players",
-            color=discord.Color.gold())
+    # Progress to next rank
+    next_rank = rank_table.next_tier(mmr)
 
-        # Current Rank
+    if next_rank:
+        mmr_needed = next_rank['min_mmr'] - mmr
         embed.add_field(
-            name="🏅 Current Rank",
+            name="🎯 Next Rank",
             value=
-            f"{current_rank['emoji']} **{current_rank['name']}**\nMMR Range: {current_rank['min_mmr']} - {current_rank['max_mmr']}",
+            f"{next_rank['emoji']} **{next_rank['name']}**\nNeed **{mmr_needed}** more MMR",
             inline=False)
 
-        embed.add_field(name="🏆 MMR", value=f"**{mmr}**", inline=True)
-        embed.add_field(name="🎮 Wins", value=f"**{wins}**", inline=True)
-        embed.add_field(name="💔 Losses", value=f"**{losses}**", inline=True)
-        embed.add_field(name="📈 Win Rate",
-                        value=f"**{win_rate:.1f}%**",
-                        inline=True)
-        embed.add_field(name="🎯 Total Games",
-                        value=f"**{total_games}**",
-                        inline=True)
-        embed.add_field(name="🌍 Server", value="**MENA**", inline=True)
+    embed.set_footer(
+        text=
+        f"Use !top to see the leaderboard • Current queue: {queue_formats(guild)}"
+    )
 
-        # Progress to next rank
-        next_rank = None
-        for rank_key, rank_data in RANK_ROLES.items():
-            if rank_data['min_mmr'] > mmr:
-                if next_rank is None or rank_data['min_mmr'] < next_rank[
-                        'min_mmr']:
-                    next_rank = rank_data
+    return embed
 
-        if next_rank:
-            mmr_needed = next_rank['min_mmr'] - mmr
-            embed.add_field(
-                name="🎯 Next Rank",
-                value=
-                f"{next_rank['emoji']} **{next_rank['name']}**\nNeed **{mmr_needed}** more MMR",
-                inline=False)
 
-        embed.set_footer(
-            text=
-            f"Use !top to see the leaderboard • Current queue: {TEAM_SIZE}v{TEAM_SIZE}"
-        )
+# Additional traditional commands
+@bot.command(name='rank')
+async def rank_cmd(ctx):
+    """Display your current rank and stats"""
+    await add_or_update_player(ctx.author)
+    user_id = str(ctx.author.id)
+    row = rank_index.get(user_id)
 
+    if row:
+        embed = cached_embed(
+            ('rank_cmd', ctx.guild.id, user_id, queue_formats(ctx.guild)),
+            lambda: build_rank_cmd_embed(ctx.guild, row))
         await ctx.send(embed=embed)
 
         # Auto-sync rank role
-        await update_player_rank_role(ctx.guild, user_id, mmr)
+        await update_player_rank_role(ctx.guild, user_id, row[2])
 
 
 @bot.command(name='commands')
@@ -3350,7 +3773,7 @@ async def help_cmd(ctx):
     embed.add_field(
         name="⚙️ Admin Commands",
         value=
-        "**Traditional:**\n`!queueplayer 2` - Set to 1v1\n`!queueplayer 4` - Set to 2v2\n`!queueplayer 6` - Set to 3v3\n`!setleaderboard` - Set leaderboard channel\n`!creatematch HSM1` - Create custom match\n\n**Slash:**\n`/queueplayer players:2` - Set queue size\n`/set_leaderboard` - Set leaderboard channel\n`/create_match match_name:HSM1` - Create custom match\n`/setup` - Create queue system\n`/cancel_queue` - Cancel queue\n`/reset_queue` - Reset queue\n`/admin_match` - Admin panel\n`/game_log` - Game history",
+        "**Traditional:**\n`!queueplayer 2` - Open a 1v1 queue\n`!queueplayer 4` - Open a 2v2 queue\n`!queueplayer 6` - Open a 3v3 queue\n`!setleaderboard` - Set leaderboard channel\n`!creatematch HSM1` - Create custom match\n\n**Slash:**\n`/queueplayer players:2` - Open a queue\n`/set_leaderboard` - Set leaderboard channel\n`/create_match match_name:HSM1` - Create custom match\n`/setup` - Create queue system\n`/cancel_queue` - Cancel queue\n`/reset_queue` - Reset queue\n`/admin_match` - Admin panel\n`/game_log` - Game history",
         inline=False)
 
     # Private chat
@@ -3362,7 +3785,7 @@ async def help_cmd(ctx):
     embed.add_field(
         name="🎮 Current Configuration",
         value=
-        f"**Queue Size:** {QUEUE_SIZE} players\n**Team Size:** {TEAM_SIZE}v{TEAM_SIZE}\n**Server:** MENA (Middle East & North Africa)",
+        f"**Queue Formats:** {queue_formats(ctx.guild)}\n**Server:** MENA (Middle East & North Africa)",
         inline=False)
 
     embed.set_footer(
@@ -3373,8 +3796,12 @@ async def help_cmd(ctx):
 
 # Queue system commands - PUBLIC COMMANDS
 @bot.tree.command(name='queue', description='Join the queue')
-async def queue(interaction: discord.Interaction):
+@app_commands.describe(mode="Queue format, e.g. 1v1 or 2v2")
+async def queue(interaction: discord.Interaction,
+                mode: str = DEFAULT_QUEUE_MODE):
     """Join the queue"""
+    active_matches = guild_state(interaction.guild).active_matches
+
     # Check if command is used in correct channel
     if not is_queue_channel(interaction.channel):
         await interaction.response.send_message(
@@ -3382,47 +3809,64 @@ async def queue(interaction: discord.Interaction):
             ephemeral=True)
         return
 
-    add_or_update_player(interaction.user)
+    player_queue = get_queue(
+        interaction.guild) if mode == DEFAULT_QUEUE_MODE else guild_state(
+            interaction.guild).queues.get(mode)
+    if player_queue is None:
+        await interaction.response.send_message(
+            f"❌ No {mode} queue is running! Open queues: {queue_formats(interaction.guild)}",
+            ephemeral=True)
+        return
+
+    await add_or_update_player(interaction.user)
     user_id = str(interaction.user.id)
 
-    # Check if player is already in queue
-    if any(player['id'] == user_id for player in player_queue):
+    # Check if player is already in a queue (one queue at a time)
+    current_queue = guild_state(interaction.guild).queue_of(user_id)
+    if current_queue:
         await interaction.response.send_message(
-            "❌ You are already in the queue!", ephemeral=True)
+            f"❌ You are already in the {current_queue.mode} queue!",
+            ephemeral=True)
         return
 
-    # Check if player is in an active match
-    if any(user_id in match['players'] for match in active_matches.values()):
+    # Check if player is in an active match or a ready check
+    if active_matches.match_of(user_id) is not None:
         await interaction.response.send_message(
             "❌ You are currently in an active match!", ephemeral=True)
         return
+    if guild_state(interaction.guild).ready_check_of(user_id):
+        await interaction.response.send_message(
+            "❌ You are in a ready check! Click **✅ Ready** on it first.",
+            ephemeral=True)
+        return
 
     # Add player to queue
-    c.execute("SELECT username, mmr FROM players WHERE id = ?", (user_id, ))
-    result = c.fetchone()
-    if result:
-        username, mmr = result
-        player_queue.append({
+    player = await db.get_player(user_id)
+    if player:
+        mmr = player['mmr']
+        player_queue.add({
             'id': user_id,
-            'username': username,
+            'username': player['username'],
             'mmr': mmr,
+            'is_placement': mmr_engine.is_in_placement(player),
             'user': interaction.user
         })
+        arm_player_expiry(player_queue, user_id)
 
         embed = discord.Embed(
             title="🎮 Joined Queue",
             description=f"{interaction.user.mention} joined the queue!",
             color=discord.Color.green())
-        embed.add_field(name="Players in Queue",
-                        value=f"{len(player_queue)}/{QUEUE_SIZE}",
+        embed.add_field(name=f"Players in {player_queue.mode} Queue",
+                        value=f"{len(player_queue)}/{player_queue.size}",
                         inline=True)
         embed.add_field(name="Your MMR", value=f"{mmr}", inline=True)
 
         await interaction.response.send_message(embed=embed)
 
-        # Check if we have enough players to start a match
-        if len(player_queue) >= QUEUE_SIZE:
-            await start_match_slash(interaction)
+        # Start a match if the new player completes one within MMR range
+        if len(player_queue) >= player_queue.size:
+            await start_match_slash(interaction, player_queue, around=user_id)
 
 
 @bot.tree.command(name='leave', description='Leave the queue')
@@ -3437,16 +3881,22 @@ async def leave_queue(interaction: discord.Interaction):
 
     user_id = str(interaction.user.id)
 
-    # Remove player from queue
-    global player_queue
-    player_queue = [p for p in player_queue if p['id'] != user_id]
+    # Remove player from whichever queue they are in
+    player_queue = guild_state(interaction.guild).queue_of(user_id)
+    if player_queue is None:
+        await interaction.response.send_message("❌ You are not in the queue!",
+                                                ephemeral=True)
+        return
+    player_queue.remove(user_id)
+    disarm_player_expiry(player_queue, user_id)
 
     embed = discord.Embed(
         title="🚪 Left Queue",
-        description=f"{interaction.user.mention} left the queue.",
+        description=
+        f"{interaction.user.mention} left the {player_queue.mode} queue.",
         color=discord.Color.orange())
     embed.add_field(name="Players in Queue",
-                    value=f"{len(player_queue)}/{QUEUE_SIZE}",
+                    value=f"{len(player_queue)}/{player_queue.size}",
                     inline=True)
 
     await interaction.response.send_message(embed=embed)
@@ -3464,36 +3914,36 @@ async def queue_status(interaction: discord.Interaction):
             ephemeral=True)
         return
 
-    if not player_queue:
-        embed = discord.Embed(
-            title="📋 Queue Status",
-            description="Queue is empty. Use `/queue` to join!",
-            color=discord.Color.blue())
-    else:
-        embed = discord.Embed(
-            title="📋 Queue Status",
-            description=f"Players in queue: {len(player_queue)}/4",
-            color=discord.Color.blue())
-
-        queue_text = ""
-        for i, player in enumerate(player_queue, 1):
-            queue_text += f"{i}. {player['username']} ({player['mmr']} MMR)\n"
+    embed = discord.Embed(title="📋 Queue Status", color=discord.Color.blue())
+    for player_queue in guild_queues(interaction.guild):
+        if not player_queue:
+            queue_text = "Queue is empty. Use `/queue` to join!"
+        else:
+            queue_text = "\n".join(
+                f"{i}. {player['username']} ({player['mmr']} MMR)"
+                for i, player in enumerate(player_queue, 1))
 
-        embed.add_field(name="Players", value=queue_text, inline=False)
+        embed.add_field(
+            name=
+            f"{player_queue.mode} - {len(player_queue)}/{player_queue.size} players",
+            value=queue_text,
+            inline=False)
 
     await interaction.response.send_message(embed=embed)
 
 
 async def start_match(ctx):
     """Start a 2v2 match with balanced teams"""
-    global match_id_counter, player_queue
+    global match_id_counter
+    active_matches = guild_state(ctx.guild).active_matches
 
-    # Get 4 players from queue
-    match_players = player_queue[:4]
-    player_queue = player_queue[4:]
+    # Get 4 players from the 2v2 queue
+    match_players = get_queue(ctx.guild, "2v2").take_match(4)
+    if not match_players:
+        return
 
     # Create balanced teams based on MMR
-    teams = create_balanced_teams(match_players)
+    teams = await create_balanced_teams(match_players)
     team1, team2 = teams
 
     # Create match record
@@ -3517,6 +3967,7 @@ async def start_match(ctx):
                  VALUES (?, ?, ?, ?, ?)""",
         (match_id, team1_ids, team2_ids, datetime.now().isoformat(),
          str(ctx.channel.id)))
+    insert_match_participants(c, match_id, team1, team2)
     conn.commit()
 
     # Create match announcement
@@ -3553,16 +4004,20 @@ async def start_match(ctx):
     await ctx.send(embed=embed)
 
 
-async def start_match_slash(interaction: discord.Interaction):
-    """Start a 2v2 match with balanced teams (for slash commands)"""
-    global match_id_counter, player_queue
+async def start_match_slash(interaction: discord.Interaction,
+                            player_queue,
+                            around=None):
+    """Start a match with balanced teams (for slash commands)"""
+    global match_id_counter
+    active_matches = guild_state(interaction.guild).active_matches
 
-    # Get 4 players from queue
-    match_players = player_queue[:4]
-    player_queue = player_queue[4:]
+    # Get the matched players from the queue
+    match_players = player_queue.take_match(player_queue.size, around=around)
+    if not match_players:
+        return
 
     # Create balanced teams based on MMR
-    teams = create_balanced_teams(match_players)
+    teams = await create_balanced_teams(match_players)
     team1, team2 = teams
 
     # Create match record
@@ -3586,6 +4041,7 @@ async def start_match_slash(interaction: discord.Interaction):
                  VALUES (?, ?, ?, ?, ?)""",
         (match_id, team1_ids, team2_ids, datetime.now().isoformat(),
          str(interaction.channel.id)))
+    insert_match_participants(c, match_id, team1, team2)
     conn.commit()
 
     # Create match announcement
@@ -3622,35 +4078,29 @@ async def start_match_slash(interaction: discord.Interaction):
     await interaction.followup.send(embed=embed)
 
 
-def create_balanced_teams(players):
-    """Create balanced teams based on MMR"""
-    # Sort players by MMR
-    sorted_players = sorted(players, key=lambda x: x['mmr'], reverse=True)
-
-    # Calculate team size based on queue configuration
-    team_size = TEAM_SIZE
+async def create_balanced_teams(players):
+    """Create balanced teams based on MMR
 
+    The teammate history is read on the database worker and the search runs
+    in the default executor, so neither blocks the event loop.
+    """
     logger.info(
-        f"TEAM CREATION: Creating balanced teams with {team_size} players per team from {len(players)} total players"
+        f"TEAM CREATION: Creating balanced teams with {len(players) // 2} players per team from {len(players)} total players"
     )
 
-    # Generate all possible team combinations
-    best_diff = float('inf')
-    best_teams = None
-
-    for team1_combo in combinations(sorted_players, team_size):
-        team1 = list(team1_combo)
-        team2 = [p for p in sorted_players if p not in team1]
-
-        team1_mmr = sum(p['mmr'] for p in team1)
-        team2_mmr = sum(p['mmr'] for p in team2)
-        diff = abs(team1_mmr - team2_mmr)
-
-        if diff < best_diff:
-            best_diff = diff
-            best_teams = (team1, team2)
+    # Balance MMR totals and spread, placement players and recent premades
+    context = {
+        'recent_teammates':
+        await db.recent_teammates([p['id'] for p in players])
+    }
+    best_teams = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: team_balancer.optimize_teams(
+            players, context=context, time_budget=TEAM_BALANCE_TIME_BUDGET))
+    team1_mmr, team2_mmr = team_balancer.team_sums(*best_teams)
 
-    logger.info(f"TEAM CREATION: Best MMR difference: {best_diff}")
+    logger.info(
+        f"TEAM CREATION: Best MMR difference: {abs(team1_mmr - team2_mmr)}, cost: {team_balancer.evaluate_teams(*best_teams, context=context):.1f}"
+    )
     logger.info(
         f"TEAM CREATION: Team1 players: {[p['username'] for p in best_teams[0]]}"
     )
@@ -3669,8 +4119,8 @@ async def send_match_completion_dms(winning_team, losing_team, match_id,
     performance_note = mmr_changes.get('performance_note', 'Standard Match')
     expected_probability = mmr_changes.get('expected_probability', 0.5)
     mmr_difference = mmr_changes.get('mmr_difference', 0)
-    winner_k_factor = mmr_changes.get('winner_k_factor', 25)
-    loser_k_factor = mmr_changes.get('loser_k_factor', 25)
+    deltas = mmr_changes['deltas']
+    k_factors = mmr_changes.get('k_factors', {})
 
     # Send to winners
     for player in winning_team:
@@ -3701,7 +4151,7 @@ async def send_match_completion_dms(winning_team, losing_team, match_id,
                                 value=f"**{title_text}**",
                                 inline=True)
                 embed.add_field(name="📈 MMR Change",
-                                value=f"**+{mmr_changes['winners']} MMR**",
+                                value=f"**+{deltas[player['id']]} MMR**",
                                 inline=True)
                 embed.add_field(name="🎮 Match ID",
                                 value=f"#{match_id}",
@@ -3711,7 +4161,7 @@ async def send_match_completion_dms(winning_team, losing_team, match_id,
                 embed.add_field(
                     name="🔍 Match Analysis",
                     value=
-                    f"**Performance:** {performance_note}\n**Win Probability:** {expected_probability:.1%}\n**MMR Difference:** {mmr_difference:+.0f}\n**K-Factor:** {winner_k_factor:.1f}",
+                    f"**Performance:** {performance_note}\n**Win Probability:** {expected_probability:.1%}\n**MMR Difference:** {mmr_difference:+.0f}\n**K-Factor:** {k_factors.get(player['id'], 25)}",
                     inline=False)
 
                 # Get updated player stats
@@ -3782,7 +4232,7 @@ async def send_match_completion_dms(winning_team, losing_team, match_id,
                                 value="**DEFEAT**",
                                 inline=True)
                 embed.add_field(name="📉 MMR Change",
-                                value=f"**{mmr_changes['losers']} MMR**",
+                                value=f"**{deltas[player['id']]} MMR**",
                                 inline=True)
                 embed.add_field(name="🎮 Match ID",
                                 value=f"#{match_id}",
@@ -3792,7 +4242,7 @@ async def send_match_completion_dms(winning_team, losing_team, match_id,
                 embed.add_field(
                     name="🔍 Match Analysis",
                     value=
-                    f"**Performance:** {performance_note}\n**Enemy Win Probability:** {expected_probability:.1%}\n**MMR Difference:** {mmr_difference:+.0f}\n**K-Factor:** {loser_k_factor:.1f}",
+                    f"**Performance:** {performance_note}\n**Enemy Win Probability:** {expected_probability:.1%}\n**MMR Difference:** {mmr_difference:+.0f}\n**K-Factor:** {k_factors.get(player['id'], 25)}",
                     inline=False)
 
                 # Get updated player stats
@@ -3829,9 +4279,9 @@ async def send_match_completion_dms(winning_team, losing_team, match_id,
                                 inline=False)
 
                 # Strategic advice for improvement
-                if abs(mmr_changes['losers']) > 30:
+                if abs(deltas[player['id']]) > 30:
                     advice = "🎯 **Focus:** High MMR loss indicates room for improvement. Practice your fundamentals!"
-                elif abs(mmr_changes['losers']) < 15:
+                elif abs(deltas[player['id']]) < 15:
                     advice = "✅ **Good:** Low MMR loss shows you're playing at your level. Small adjustments needed!"
                 else:
                     advice = "📊 **Standard:** Normal MMR loss. Keep practicing and you'll win the next one!"
@@ -3887,6 +4337,8 @@ class AdminMatchControlView(discord.ui.View):
     async def admin_set_winner(self, interaction: discord.Interaction,
                                team_number: int):
         """Admin sets match winner"""
+        active_matches = guild_state(interaction.guild).active_matches
+
         if self.match_id not in active_matches:
             await interaction.response.send_message(
                 "❌ Match not found or already completed!", ephemeral=True)
@@ -3901,24 +4353,27 @@ class AdminMatchControlView(discord.ui.View):
             'team1']
 
         # Calculate MMR changes
-        mmr_changes = calculate_mmr_changes(winning_team, losing_team)
-
-        # Update player stats
-        for player in winning_team:
-            c.execute(
-                "UPDATE players SET wins = wins + 1, mmr = mmr + ? WHERE id = ?",
-                (mmr_changes['winners'], player['id']))
-
-        for player in losing_team:
-            c.execute(
-                "UPDATE players SET losses = losses + 1, mmr = mmr + ? WHERE id = ?",
-                (mmr_changes['losers'], player['id']))
-
-        # Update match record
-        c.execute(
-            "UPDATE matches SET winner = ?, ended_at = ?, admin_modified = 1 WHERE match_id = ?",
-            (team_number, datetime.now().isoformat(), self.match_id))
-        conn.commit()
+        mmr_changes = await calculate_mmr_changes(winning_team, losing_team)
+
+        # Update player stats, placement progress and match record once; a
+        # player report or another admin click may have decided it already
+        placement_before = await db.apply_match_result(
+            self.match_id,
+            team_number,
+            winning_team,
+            losing_team,
+            mmr_changes,
+            datetime.now().isoformat(),
+            admin_modified=True)
+        if placement_before is None:
+            await interaction.response.send_message(
+                "❌ Match not found or already completed!", ephemeral=True)
+            return
+        await rank_index.refresh(
+            [player['id'] for player in winning_team + losing_team])
+        for player in winning_team + losing_team:
+            mark_rank_dirty(player['id'],
+                            player['mmr'] + mmr_changes['deltas'][player['id']])
 
         # Send DM notifications
         await send_match_completion_dms(winning_team, losing_team,
@@ -3930,17 +4385,12 @@ class AdminMatchControlView(discord.ui.View):
             description=f"**Match #{self.match_id}** completed by admin",
             color=discord.Color.green())
 
-        winner_names = [p['username'] for p in winning_team]
-        loser_names = [p['username'] for p in losing_team]
-
-        embed.add_field(
-            name="🎉 Winners",
-            value=f"{', '.join(winner_names)}\n+{mmr_changes['winners']} MMR",
-            inline=True)
-        embed.add_field(
-            name="💔 Losers",
-            value=f"{', '.join(loser_names)}\n{mmr_changes['losers']} MMR",
-            inline=True)
+        embed.add_field(name="🎉 Winners",
+                        value=format_mmr_deltas(winning_team, mmr_changes),
+                        inline=True)
+        embed.add_field(name="💔 Losers",
+                        value=format_mmr_deltas(losing_team, mmr_changes),
+                        inline=True)
         embed.add_field(name="Admin",
                         value=interaction.user.mention,
                         inline=True)
@@ -3952,6 +4402,8 @@ class AdminMatchControlView(discord.ui.View):
 
     async def admin_set_tie(self, interaction: discord.Interaction):
         """Admin sets match as tie"""
+        active_matches = guild_state(interaction.guild).active_matches
+
         if self.match_id not in active_matches:
             await interaction.response.send_message(
                 "❌ Match not found or already completed!", ephemeral=True)
@@ -3960,10 +4412,9 @@ class AdminMatchControlView(discord.ui.View):
         match_data = active_matches[self.match_id]
 
         # No MMR changes for tie
-        c.execute(
+        await db.execute(
             "UPDATE matches SET winner = 0, ended_at = ?, admin_modified = 1 WHERE match_id = ?",
             (datetime.now().isoformat(), self.match_id))
-        conn.commit()
 
         # Send DM notifications for tie
         all_players = match_data['team1'] + match_data['team2']
@@ -4010,6 +4461,8 @@ class AdminMatchControlView(discord.ui.View):
 
     async def admin_cancel_match(self, interaction: discord.Interaction):
         """Admin cancels match"""
+        active_matches = guild_state(interaction.guild).active_matches
+
         if self.match_id not in active_matches:
             await interaction.response.send_message(
                 "❌ Match not found or already completed!", ephemeral=True)
@@ -4018,10 +4471,9 @@ class AdminMatchControlView(discord.ui.View):
         match_data = active_matches[self.match_id]
 
         # Mark match as cancelled
-        c.execute(
+        await db.execute(
             "UPDATE matches SET cancelled = 1, ended_at = ?, admin_modified = 1 WHERE match_id = ?",
             (datetime.now().isoformat(), self.match_id))
-        conn.commit()
 
         # Send DM notifications for cancellation
         all_players = match_data['team1'] + match_data['team2']
@@ -4076,186 +4528,26 @@ async def report_win(interaction: discord.Interaction, team: int):
         ephemeral=True)
 
 
-def calculate_mmr_changes(winning_team, losing_team):
-    """Calculate MMR changes using professional ELO-based system with placement matches support"""
-    logger.info(
-        f"MMR CALCULATION: Winning team size={len(winning_team)}, Losing team size={len(losing_team)}"
-    )
-
-    # Safety check for empty teams
-    if len(winning_team) == 0 or len(losing_team) == 0:
-        logger.error(
-            f"MMR CALCULATION: Empty team detected! Winning={len(winning_team)}, Losing={len(losing_team)}"
-        )
-        return {'winners': 25, 'losers': -25}  # Default MMR change
-
-    try:
-        # Calculate team averages
-        avg_winner_mmr = sum(p['mmr']
-                             for p in winning_team) / len(winning_team)
-        avg_loser_mmr = sum(p['mmr'] for p in losing_team) / len(losing_team)
-        mmr_difference = avg_winner_mmr - avg_loser_mmr
-
-        logger.info(
-            f"MMR CALCULATION: Winner avg={avg_winner_mmr:.1f}, Loser avg={avg_loser_mmr:.1f}, Diff={mmr_difference:.1f}"
-        )
-
-        # Check for placement matches
-        winner_placement_players = []
-        loser_placement_players = []
-
-        for player in winning_team:
-            c.execute(
-                "SELECT placement_matches_remaining, is_placed FROM players WHERE id = ?",
-                (player['id'], ))
-            result = c.fetchone()
-            if result and result[0] > 0 and result[1] == 0:
-                winner_placement_players.append(player['id'])
-
-        for player in losing_team:
-            c.execute(
-                "SELECT placement_matches_remaining, is_placed FROM players WHERE id = ?",
-                (player['id'], ))
-            result = c.fetchone()
-            if result and result[0] > 0 and result[1] == 0:
-                loser_placement_players.append(player['id'])
-
-        # Calculate K-factor based on player experience and MMR
-        def get_k_factor(player_mmr, total_games, is_placement=False):
-            """Get K-factor based on player level and experience"""
-            if is_placement:
-                return 80  # Double MMR for placement matches
-            elif total_games < 10:
-                return 40  # New players - fast progression
-            elif player_mmr < 800:
-                return 30  # Lower skill - moderate progression
-            elif player_mmr < 1050:
-                return 25  # Average skill - normal progression
-            elif player_mmr < 1300:
-                return 20  # High skill - slower progression
-            else:
-                return 15  # Elite players - very stable
-
-        # Calculate average K-factor for each team
-        winner_k_factors = []
-        loser_k_factors = []
-
-        for player in winning_team:
-            c.execute(
-                "SELECT wins, losses, placement_matches_remaining, is_placed FROM players WHERE id = ?",
-                (player['id'], ))
-            result = c.fetchone()
-            total_games = (result[0] + result[1]) if result else 0
-            is_placement = result[2] > 0 and result[3] == 0 if result else False
-            k_factor = get_k_factor(player['mmr'], total_games, is_placement)
-            winner_k_factors.append(k_factor)
-
-        for player in losing_team:
-            c.execute(
-                "SELECT wins, losses, placement_matches_remaining, is_placed FROM players WHERE id = ?",
-                (player['id'], ))
-            result = c.fetchone()
-            total_games = (result[0] + result[1]) if result else 0
-            is_placement = result[2] > 0 and result[3] == 0 if result else False
-            k_factor = get_k_factor(player['mmr'], total_games, is_placement)
-            loser_k_factors.append(k_factor)
-
-        avg_winner_k = sum(winner_k_factors) / len(winner_k_factors)
-        avg_loser_k = sum(loser_k_factors) / len(loser_k_factors)
-
-        # Calculate expected probability using ELO formula
-        # P(A wins) = 1 / (1 + 10^((RB - RA) / 400))
-        expected_winner_probability = 1 / (
-            1 + pow(10, (avg_loser_mmr - avg_winner_mmr) / 400))
-        expected_loser_probability = 1 - expected_winner_probability
-
-        logger.info(
-            f"MMR CALCULATION: Expected win probability - Winner: {expected_winner_probability:.3f}, Loser: {expected_loser_probability:.3f}"
-        )
-
-        # Calculate base MMR changes using ELO formula
-        # Change = K * (Actual_Score - Expected_Score)
-        # Actual_Score: 1 for winner, 0 for loser
-        winner_change = avg_winner_k * (1 - expected_winner_probability)
-        loser_change = avg_loser_k * (0 - expected_loser_probability)
-
-        # Apply bonus/penalty multipliers based on MMR difference
-        if mmr_difference > 100:  # Strong favorite won
-            # Reduce gains for beating weaker opponents
-            winner_change *= 0.7
-            loser_change *= 0.8  # Reduce loss against stronger opponent
-            performance_note = "Expected Victory"
-        elif mmr_difference < -100:  # Major upset
-            # Increase gains for beating stronger opponents
-            winner_change *= 1.5
-            loser_change *= 1.3  # Increase loss for losing to weaker opponent
-            performance_note = "UPSET VICTORY!"
-        else:
-            performance_note = "Balanced Match"
-
-        # Add placement match indicator
-        if winner_placement_players or loser_placement_players:
-            placement_count = len(winner_placement_players) + len(
-                loser_placement_players)
-            performance_note += f" (Placement: {placement_count} players)"
-
-        # Apply skill-based modifiers
-        if avg_winner_mmr < 1000 and mmr_difference > 50:
-            # Lower skill player beating higher skill - extra reward
-            winner_change *= 1.2
-            performance_note += " (Skill Growth)"
-
-        if avg_loser_mmr > 1400 and mmr_difference < -50:
-            # High skill player losing to lower skill - extra penalty
-            loser_change *= 1.2
-            performance_note += " (Underperformance)"
-
-        # Ensure minimum and maximum changes
-        winner_change = max(15, min(
-            100, round(winner_change)))  # Higher max for placement
-        loser_change = min(-15, max(
-            -100, round(loser_change)))  # Higher max for placement
-
-        # Ensure minimum changes are applied
-        if abs(winner_change) < 15:
-            winner_change = 20  # Minimum win reward
-        if abs(loser_change) < 15:
-            loser_change = -20  # Minimum loss penalty
-
-        # Mathematical balance: ensure loser_change is negative
-        if loser_change > 0:
-            loser_change = -loser_change
-
-        logger.info(
-            f"MMR CALCULATION: Final - Winner: +{winner_change}, Loser: {loser_change}, Performance: {performance_note}"
-        )
-        logger.info(
-            f"MMR CALCULATION: K-factors - Winner avg: {avg_winner_k:.1f}, Loser avg: {avg_loser_k:.1f}"
-        )
-        logger.info(
-            f"MMR CALCULATION: Placement players - Winners: {len(winner_placement_players)}, Losers: {len(loser_placement_players)}"
-        )
+async def calculate_mmr_changes(winning_team, losing_team):
+    """Calculate MMR changes from one bulk prefetch of every participant"""
+    player_states = await db.get_players(
+        [p['id'] for p in winning_team + losing_team])
+    return mmr_engine.calculate_mmr_changes(winning_team, losing_team,
+                                            player_states)
 
-        return {
-            'winners': int(winner_change),
-            'losers': int(loser_change),
-            'performance_note': performance_note,
-            'expected_probability': expected_winner_probability,
-            'mmr_difference': mmr_difference,
-            'winner_k_factor': avg_winner_k,
-            'loser_k_factor': avg_loser_k,
-            'winner_placement_players': winner_placement_players,
-            'loser_placement_players': loser_placement_players
-        }
 
-    except Exception as e:
-        logger.error(f"MMR CALCULATION ERROR: {e}")
-        return {'winners': 25, 'losers': -25}  # Default MMR change
+def format_mmr_deltas(team, mmr_changes):
+    """One 'name: +N MMR' line per player from the per-player delta map"""
+    return '\n'.join(
+        f"{p['username']}: {mmr_changes['deltas'][p['id']]:+d} MMR"
+        for p in team)
 
 
 @bot.command(name='cancel')
 async def cancel_match(ctx):
     """Cancel an active match"""
+    active_matches = guild_state(ctx.guild).active_matches
+
     # Check if command is used in correct channel
     if not is_queue_channel(ctx):
         await ctx.send(
@@ -4284,12 +4576,16 @@ async def cancel_match(ctx):
     match_data = active_matches[match_id]
     all_players = match_data['team1'] + match_data['team2']
 
-    # Add players back to queue
+    # Add players back to the queue of the match's format
+    player_queue = get_queue(ctx.guild, mode_for_size(len(all_players)))
     for player in all_players:
-        player_queue.append(player)
+        player_queue.add(player)
+        arm_player_expiry(player_queue, player['id'])
 
     # Delete from database
     c.execute("DELETE FROM matches WHERE match_id = ?", (match_id, ))
+    c.execute("DELETE FROM match_participants WHERE match_id = ?",
+              (match_id, ))
     conn.commit()
 
     # Remove from active matches
@@ -4304,18 +4600,14 @@ async def cancel_match(ctx):
     await ctx.send(embed=embed)
 
 
-def reset_queue():
-    """Reset the queue system by clearing all players"""
-    global player_queue, queue_last_activity, captain_draft_state, pending_team_selection
-
-    # Store current queue size for logging
-    queue_size = len(player_queue)
+def reset_queue(guild):
+    """Reset the queue system by clearing all players from the guild's queues"""
+    state = guild_state(guild)
+    captain_draft_state = state.captain_draft_state
+    pending_team_selection = state.pending_team_selection
 
-    # Clear the queue
-    player_queue.clear()
-
-    # Reset queue activity timestamp
-    queue_last_activity = None
+    # Clear the queues and their activity timestamps
+    queue_size = len(clear_guild_queues(guild))
 
     # Clear any active drafts and pending team selections
     captain_draft_state.clear()
@@ -4342,7 +4634,7 @@ async def reset_queue_command(interaction: discord.Interaction):
         return
 
     # Reset the queue
-    queue_size = reset_queue()
+    queue_size = reset_queue(interaction.guild)
 
     # Create confirmation embed
     embed = discord.Embed(
@@ -4395,20 +4687,16 @@ async def cancel_queue(interaction: discord.Interaction):
         return
 
     # Count players in queue
-    queue_count = len(player_queue)
+    queue_count = sum(
+        len(player_queue) for player_queue in guild_queues(interaction.guild))
 
     if queue_count == 0:
         await interaction.response.send_message(
             "❌ The queue is already empty!", ephemeral=True)
         return
 
-    # Clear the queue
-    queue_players = player_queue.copy()
-    player_queue.clear()
-
-    # Reset queue activity timer
-    global queue_last_activity
-    queue_last_activity = None
+    # Clear every queue and its activity timer
+    queue_players = clear_guild_queues(interaction.guild)
 
     # Create cancellation embed
     embed = discord.Embed(
@@ -4635,11 +4923,17 @@ async def private_chat_command(interaction: discord.Interaction):
 # Set Queue Players Command - ADMIN ONLY
 @bot.tree.command(
     name='queueplayer',
-    description=
-    'Set the number of players for the queue (2=1v1, 4=2v2, 6=3v3, etc.)')
+    description='Open a queue for a format (2=1v1, 4=2v2, 6=3v3, etc.)')
+@app_commands.describe(
+    players="Players per match (even, 2-20)",
+    timeout="Minutes before an inactive player leaves the queue",
+    ready_check="Seconds players get to confirm a match (0 = no ready check)")
 @app_commands.default_permissions(administrator=True)
-async def set_queue_players(interaction: discord.Interaction, players: int):
-    """Set the number of players for the queue system"""
+async def set_queue_players(interaction: discord.Interaction,
+                            players: int,
+                            timeout: int = QUEUE_TIMEOUT_MINUTES,
+                            ready_check: int = 0):
+    """Open a queue for a format alongside the existing ones"""
 
     # Validate player count
     if players < 2 or players > 20:
@@ -4653,26 +4947,21 @@ async def set_queue_players(interaction: discord.Interaction, players: int):
             ephemeral=True)
         return
 
-    # Update global queue configuration
-    global QUEUE_SIZE, TEAM_SIZE
-    QUEUE_SIZE = players
-    TEAM_SIZE = players // 2
-
-    # Clear current queue if any
-    global player_queue
-    if player_queue:
-        player_queue.clear()
+    # Open (or reconfigure) this format's queue; other queues keep running
+    player_queue = get_queue(interaction.guild, mode_for_size(players))
+    player_queue.configure(timeout_minutes=max(1, timeout),
+                           ready_check_seconds=max(0, ready_check))
 
     # Create configuration embed
     embed = discord.Embed(
         title="⚙️ Queue Configuration Updated!",
-        description=f"Queue system has been reconfigured successfully",
+        description=f"The {player_queue.mode} queue is open",
         color=discord.Color.green())
 
     embed.add_field(
         name="🎯 New Configuration",
         value=
-        f"**Total Players:** {QUEUE_SIZE}\n**Team Size:** {TEAM_SIZE}v{TEAM_SIZE}\n**Teams:** 2 teams",
+        f"**Total Players:** {player_queue.size}\n**Team Size:** {player_queue.mode}\n**Timeout:** {player_queue.timeout_minutes} minutes\n**Ready Check:** {f'{player_queue.ready_check_seconds} seconds' if player_queue.ready_check_seconds else 'Off'}",
         inline=True)
 
     embed.add_field(name="🌍 Server Region",
@@ -4684,9 +4973,9 @@ async def set_queue_players(interaction: discord.Interaction, players: int):
                     inline=True)
 
     embed.add_field(
-        name="🔄 Queue Reset",
+        name="🎮 Running Queues",
         value=
-        "Current queue has been cleared\nPlayers need to rejoin with new configuration",
+        f"{queue_formats(interaction.guild)}\nPlayers in other queues keep their place",
         inline=False)
 
     embed.set_footer(
@@ -4698,11 +4987,11 @@ async def set_queue_players(interaction: discord.Interaction, players: int):
     queue_channel = discord.utils.get(interaction.guild.channels,
                                       name=QUEUE_CHANNEL_NAME)
     if queue_channel:
-        await update_queue_display(queue_channel)
+        await update_queue_display(queue_channel, player_queue)
 
     # Log the change
     logger.info(
-        f"Queue configuration changed to {TEAM_SIZE}v{TEAM_SIZE} ({QUEUE_SIZE} players) by {interaction.user.display_name}"
+        f"Queue {player_queue.mode} opened ({player_queue.size} players, {player_queue.timeout_minutes} min timeout) by {interaction.user.display_name}"
     )
 
 
@@ -4812,20 +5101,35 @@ async def create_match_command(interaction: discord.Interaction,
 
 
 # Auto-Leaderboard System
+# Players shown in the leaderboard channel
+LEADERBOARD_CHANNEL_SIZE = 8
+
+
 @tasks.loop(minutes=10)  # Updates every 10 minutes
 async def update_leaderboard():
-    """Automatically update leaderboard in designated channel"""
-    global leaderboard_channel
+    """Automatically update the leaderboard in every guild's designated channel"""
+    for state in guild_states:
+        if state.leaderboard_channel:
+            await post_leaderboard(state.leaderboard_channel)
 
-    if not leaderboard_channel:
-        return
 
+async def post_leaderboard(leaderboard_channel):
+    """Refresh the leaderboard message in one channel
+
+    Nothing is done while rank_index is unchanged since the last refresh or
+    the top rows are the same; otherwise the one leaderboard message is
+    edited in place.
+    """
+    state = guild_state(leaderboard_channel.guild)
+    if state.leaderboard_version == rank_index.version:
+        return
     try:
-        # Get all ranked players (players who have completed placement matches)
-        c.execute(
-            "SELECT id, username, mmr, wins, losses FROM players WHERE is_placed = 1 ORDER BY mmr DESC LIMIT 20"
-        )
-        players = c.fetchall()
+        # Top ranked players (players who have completed placement matches)
+        version = rank_index.version
+        players = rank_index.page(1, LEADERBOARD_CHANNEL_SIZE)
+        if players == state.leaderboard_rows:
+            state.leaderboard_version = version
+            return
 
         if not players:
             embed = discord.Embed(
@@ -4838,7 +5142,7 @@ async def update_leaderboard():
                             inline=True)
             embed.add_field(
                 name="🎯 الطابور الحالي",
-                value=f"**{TEAM_SIZE}v{TEAM_SIZE}** ({QUEUE_SIZE} لاعبين)",
+                value=f"**{queue_formats(leaderboard_channel.guild)}**",
                 inline=True)
             embed.set_footer(
                 text=
@@ -4850,8 +5154,7 @@ async def update_leaderboard():
 
             leaderboard_text = ""
             for i, (player_id, username, mmr, wins,
-                    losses) in enumerate(players[:8],
-                                         1):  # Reduced to 8 players
+                    losses) in enumerate(players, 1):
                 # Get rank info for each player
                 rank_info = get_rank_from_mmr(mmr)
                 rank_emoji = rank_info['emoji']
@@ -4897,7 +5200,7 @@ async def update_leaderboard():
 
             embed.add_field(
                 name="🎮 الطابور الحالي",
-                value=f"**{TEAM_SIZE}v{TEAM_SIZE}** ({QUEUE_SIZE} لاعبين)",
+                value=f"**{queue_formats(leaderboard_channel.guild)}**",
                 inline=True)
 
             embed.set_footer(
@@ -4905,18 +5208,54 @@ async def update_leaderboard():
                 f"آخر تحديث: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | يتم التحديث كل 10 دقئاق"
             )
 
-        # Clear previous messages and send new leaderboard
-        async for message in leaderboard_channel.history(limit=100):
-            if message.author == bot.user:
-                await message.delete()
-
-        await leaderboard_channel.send(embed=embed)
+        await publish_leaderboard(leaderboard_channel, state, embed)
+        state.leaderboard_version, state.leaderboard_rows = version, players
         logger.info("Leaderboard updated successfully")
 
     except Exception as e:
         logger.error(f"Error updating leaderboard: {e}")
 
 
+async def find_leaderboard_message(channel):
+    """Adopt an existing leaderboard message when none is recorded
+
+    Scans recent history once (first refresh after the channel was set);
+    older copies are deleted.
+    """
+    found = None
+    async for message in channel.history(limit=100):
+        if (message.author == bot.user and message.embeds
+                and (message.embeds[0].title or '').startswith(
+                    "🏆 لوحة المتصدرين")):
+            if found is None:
+                found = message  # newest first
+            else:
+                try:
+                    await message.delete()
+                except discord.HTTPException:
+                    pass
+    return found
+
+
+async def publish_leaderboard(channel, state, embed):
+    """Edit the leaderboard message in place, posting it if missing"""
+    if state.leaderboard_message_id:
+        message = channel.get_partial_message(state.leaderboard_message_id)
+    else:
+        message = await find_leaderboard_message(channel)
+
+    if message is not None:
+        try:
+            await message.edit(embed=embed)
+            state.leaderboard_message_id = message.id
+            return
+        except discord.NotFound:
+            pass  # Message was deleted, post a new one
+
+    message = await channel.send(embed=embed)
+    state.leaderboard_message_id = message.id
+
+
 # Set Leaderboard Channel Command - ADMIN ONLY
 @bot.tree.command(
     name='set_leaderboard',
@@ -4925,8 +5264,7 @@ async def update_leaderboard():
 async def set_leaderboard_channel(interaction: discord.Interaction):
     """Set the current channel as leaderboard channel"""
 
-    global leaderboard_channel
-    leaderboard_channel = interaction.channel
+    guild_state(interaction.guild).set_leaderboard_channel(interaction.channel)
 
     # Start the leaderboard update task
     if not update_leaderboard.is_running():
@@ -4948,7 +5286,7 @@ async def set_leaderboard_channel(interaction: discord.Interaction):
 
     embed.add_field(
         name="🎯 Current Queue",
-        value=f"**{TEAM_SIZE}v{TEAM_SIZE}** ({QUEUE_SIZE} players)",
+        value=f"**{queue_formats(interaction.guild)}**",
         inline=True)
 
     embed.add_field(
@@ -4963,7 +5301,7 @@ async def set_leaderboard_channel(interaction: discord.Interaction):
     await interaction.response.send_message(embed=embed)
 
     # Trigger immediate update
-    await update_leaderboard()
+    await post_leaderboard(interaction.channel)
 
     logger.info(
         f"Leaderboard channel set to {interaction.channel.name} by {interaction.user.display_name}"
@@ -5042,6 +5380,8 @@ async def reset_season(interaction: discord.Interaction):
                 self.add_item(self.starting_mmr)
 
             async def on_submit(self, modal_interaction: discord.Interaction):
+                active_matches = guild_state(modal_interaction.guild).active_matches
+
                 try:
                     starting_mmr = int(self.starting_mmr.value)
 
@@ -5060,139 +5400,42 @@ async def reset_season(interaction: discord.Interaction):
                             embed=discord.Embed(
                                 title="🔄 جاري إعادة التعيين...",
                                 description=
-                                "**المرحلة 1/5:** إعادة تعيين قاعدة البيانات...",
-                                color=discord.Color.orange()))
-
-                        # إعادة تعيين اللاعبين مع النقطة المحددة
-                        c.execute(
-                            "UPDATE players SET mmr = ?, wins = 0, losses = 0, placement_matches_remaining = 5, is_placed = 0",
-                            (starting_mmr, ))
-
-                        # حذف المباريات
-                        c.execute("DELETE FROM matches")
-                        c.execute(
-                            "DELETE FROM sqlite_sequence WHERE name = 'matches'"
-                        )
-
-                        # تنظيف الدردشات
-                        c.execute("UPDATE private_chats SET is_active = 0")
-                        c.execute("UPDATE private_matches SET is_active = 0")
-
-                        conn.commit()
-
-                        # المرحلة 2: إزالة جميع رتب الرانكات من جميع الأعضاء
-                        await modal_interaction.edit_original_response(
-                            embed=discord.Embed(
-                                title="🔄 جاري إعادة التعيين...",
-                                description=
-                                "**المرحلة 2/5:** إزالة رتب الرانكات من جميع الأعضاء...",
-                                color=discord.Color.orange()))
-
-                        removed_roles_count = 0
-                        for member in interaction.guild.members:
-                            if member.bot:
-                                continue
-
-                            rank_roles_to_remove = []
-                            for rank_data in RANK_ROLES.values():
-                                role = discord.utils.get(
-                                    interaction.guild.roles,
-                                    name=rank_data['role_name'])
-                                if role and role in member.roles:
-                                    rank_roles_to_remove.append(role)
-
-                            if rank_roles_to_remove:
-                                try:
-                                    await member.remove_roles(
-                                        *rank_roles_to_remove,
-                                        reason=
-                                        "Season reset - removing all rank roles"
-                                    )
-                                    removed_roles_count += len(
-                                        rank_roles_to_remove)
-                                    logger.info(
-                                        f"SEASON RESET: Removed {len(rank_roles_to_remove)} rank roles from {member.display_name}"
-                                    )
-                                except Exception as e:
-                                    logger.error(
-                                        f"SEASON RESET: Error removing roles from {member.display_name}: {e}"
-                                    )
-
-                        # المرحلة 3: إضافة رتبة UNRANKED لجميع الأعضاء
-                        await modal_interaction.edit_original_response(
-                            embed=discord.Embed(
-                                title="🔄 جاري إعادة التعيين...",
-                                description=
-                                "**المرحلة 3/5:** إضافة رتبة UNRANKED لجميع الأعضاء...",
+                                "**المرحلة 1/4:** إعادة تعيين قاعدة البيانات...",
                                 color=discord.Color.orange()))
 
-                        unranked_role_name = UNRANK_RANK['UNRANKED'][
-                            'role_name']
-                        unranked_role = discord.utils.get(
-                            interaction.guild.roles, name=unranked_role_name)
-
-                        if not unranked_role:
-                            try:
-                                unranked_role = await interaction.guild.create_role(
-                                    name=unranked_role_name,
-                                    color=discord.Color(
-                                        UNRANK_RANK['UNRANKED']['color']),
-                                    reason=
-                                    "Season reset - creating UNRANKED role")
-                                logger.info(
-                                    f"SEASON RESET: Created UNRANKED role: {unranked_role_name}"
-                                )
-                            except Exception as e:
-                                logger.error(
-                                    f"SEASON RESET: Error creating UNRANKED role: {e}"
-                                )
-
-                        unranked_members_count = 0
+                        # إعادة تعيين اللاعبين مع النقطة المحددة، حذف المباريات وتنظيف الدردشات
+                        await db.reset_season(starting_mmr)
+                        await rank_index.load()
 
-                        if unranked_role:
-                            for member in interaction.guild.members:
-                                if member.bot:
-                                    continue
+                        # المرحلة 2: استبدال رتب الرانكات برتبة UNRANKED لجميع الأعضاء
+                        removed_roles_count, unranked_members_count = await reset_member_rank_roles(
+                            interaction.guild,
+                            role_progress_reporter(
+                                modal_interaction,
+                                "🔄 جاري إعادة التعيين...",
+                                "**المرحلة 2/4:** استبدال رتب الرانكات برتبة UNRANKED..."
+                            ))
 
-                                if unranked_role not in member.roles:
-                                    try:
-                                        await member.add_roles(
-                                            unranked_role,
-                                            reason=
-                                            "Season reset - adding UNRANKED role"
-                                        )
-                                        unranked_members_count += 1
-                                        logger.info(
-                                            f"SEASON RESET: Added UNRANKED role to {member.display_name}"
-                                        )
-                                    except Exception as e:
-                                        logger.error(
-                                            f"SEASON RESET: Error adding UNRANKED role to {member.display_name}: {e}"
-                                        )
-                        else:
-                            logger.error(
-                                "SEASON RESET: Failed to find or create UNRANKED role"
-                            )
-
-                        # المرحلة 4: تنظيف الذاكرة
+                        # المرحلة 3: تنظيف الذاكرة
                         await modal_interaction.edit_original_response(
                             embed=discord.Embed(
                                 title="🔄 جاري إعادة التعيين...",
                                 description=
-                                "**المرحلة 4/5:** تنظيف الطابور والمباريات النشطة...",
+                                "**المرحلة 3/4:** تنظيف الطابور والمباريات النشطة...",
                                 color=discord.Color.orange()))
 
-                        global active_matches, player_queue, match_id_counter
+                        global match_id_counter
                         active_matches.clear()
-                        player_queue.clear()
+                        clear_guild_queues(modal_interaction.guild)
+                        rank_sync.forget_guild(str(modal_interaction.guild.id))
                         match_id_counter = 1
 
-                        # المرحلة 5: الانتهاء
+                        # المرحلة 4: الانتهاء
                         await modal_interaction.edit_original_response(
                             embed=discord.Embed(
                                 title="🔄 جاري إعادة التعيين...",
                                 description=
-                                "**المرحلة 5/5:** الانتهاء من إعادة التعيين...",
+                                "**المرحلة 4/4:** الانتهاء من إعادة التعيين...",
                                 color=discord.Color.orange()))
 
                         rank_info = get_rank_from_mmr(starting_mmr, True)
@@ -5283,6 +5526,8 @@ async def reset_season(interaction: discord.Interaction):
             async def default_reset(self,
                                     button_interaction: discord.Interaction,
                                     button: discord.ui.Button):
+                active_matches = guild_state(button_interaction.guild).active_matches
+
                 if button_interaction.user != interaction.user:
                     await button_interaction.response.send_message(
                         "❌ فقط من طلب الأمر يمكنه التأكيد!", ephemeral=True)
@@ -5292,145 +5537,48 @@ async def reset_season(interaction: discord.Interaction):
 
                 # تنفيذ إعادة التعيين بالنقطة الافتراضية
                 try:
-                    # المرحلة 1: إزالة جميع رتب الرانكات من جميع الأعضاء
-                    await button_interaction.edit_original_response(
-                        embed=discord.Embed(
-                            title="🔄 جاري إعادة التعيين...",
-                            description=
-                            "**المرحلة 1/5:** إزالة رتب الرانكات من جميع الأعضاء...",
-                            color=discord.Color.orange()))
-
-                    removed_roles_count = 0
-                    for member in interaction.guild.members:
-                        if member.bot:
-                            continue
-
-                        # العثور على رتب الرانكات التي يملكها العضو
-                        rank_roles_to_remove = []
-                        for rank_data in RANK_ROLES.values():
-                            role = discord.utils.get(
-                                interaction.guild.roles,
-                                name=rank_data['role_name'])
-                            if role and role in member.roles:
-                                rank_roles_to_remove.append(role)
-
-                        # إزالة رتب الرانكات
-                        if rank_roles_to_remove:
-                            try:
-                                await member.remove_roles(
-                                    *rank_roles_to_remove,
-                                    reason=
-                                    "Season reset - removing all rank roles")
-                                removed_roles_count += len(
-                                    rank_roles_to_remove)
-                                logger.info(
-                                    f"SEASON RESET: Removed {len(rank_roles_to_remove)} rank roles from {member.display_name}"
-                                )
-                            except Exception as e:
-                                logger.error(
-                                    f"SEASON RESET: Error removing roles from {member.display_name}: {e}"
-                                )
-
-                    # المرحلة 2: إضافة رتبة UNRANKED لجميع الأعضاء
-                    await button_interaction.edit_original_response(
-                        embed=discord.Embed(
-                            title="🔄 جاري إعادة التعيين...",
-                            description=
-                            "**المرحلة 2/5:** إضافة رتبة UNRANKED لجميع الأعضاء...",
-                            color=discord.Color.orange()))
-
-                    # البحث عن رتبة UNRANKED الموجودة أو إنشاؤها
-                    unranked_role_name = UNRANK_RANK['UNRANKED']['role_name']
-                    unranked_role = discord.utils.get(interaction.guild.roles,
-                                                      name=unranked_role_name)
-
-                    # إنشاء رتبة UNRANKED إذا لم تكن موجودة
-                    if not unranked_role:
-                        try:
-                            unranked_role = await interaction.guild.create_role(
-                                name=unranked_role_name,
-                                color=discord.Color(
-                                    UNRANK_RANK['UNRANKED']['color']),
-                                reason="Season reset - creating UNRANKED role")
-                            logger.info(
-                                f"SEASON RESET: Created UNRANKED role: {unranked_role_name}"
-                            )
-                        except Exception as e:
-                            logger.error(
-                                f"SEASON RESET: Error creating UNRANKED role: {e}"
-                            )
-
-                    unranked_members_count = 0
-
-                    if unranked_role:
-                        for member in interaction.guild.members:
-                            if member.bot:
-                                continue
-
-                            # إضافة رتبة UNRANKED إذا لم يكن يملكها
-                            if unranked_role not in member.roles:
-                                try:
-                                    await member.add_roles(
-                                        unranked_role,
-                                        reason=
-                                        "Season reset - adding UNRANKED role")
-                                    unranked_members_count += 1
-                                    logger.info(
-                                        f"SEASON RESET: Added UNRANKED role to {member.display_name}"
-                                    )
-                                except Exception as e:
-                                    logger.error(
-                                        f"SEASON RESET: Error adding UNRANKED role to {member.display_name}: {e}"
-                                    )
-                    else:
-                        logger.error(
-                            "SEASON RESET: Failed to find or create UNRANKED role"
-                        )
-
-                    # المرحلة 3: إعادة تعيين قاعدة البيانات
+                    # المرحلة 1: استبدال رتب الرانكات برتبة UNRANKED لجميع الأعضاء
+                    removed_roles_count, unranked_members_count = await reset_member_rank_roles(
+                        interaction.guild,
+                        role_progress_reporter(
+                            button_interaction,
+                            "🔄 جاري إعادة التعيين...",
+                            "**المرحلة 1/4:** استبدال رتب الرانكات برتبة UNRANKED..."
+                        ))
+
+                    # المرحلة 2: إعادة تعيين قاعدة البيانات
                     await button_interaction.edit_original_response(
                         embed=discord.Embed(
                             title="🔄 جاري إعادة التعيين...",
                             description=
-                            "**المرحلة 3/5:** إعادة تعيين قاعدة البيانات...",
+                            "**المرحلة 2/4:** إعادة تعيين قاعدة البيانات...",
                             color=discord.Color.orange()))
 
-                    # إعادة تعيين اللاعبين
-                    c.execute(
-                        "UPDATE players SET mmr = 1000, wins = 0, losses = 0, placement_matches_remaining = 5, is_placed = 0"
-                    )
-
-                    # حذف المباريات
-                    c.execute("DELETE FROM matches")
-                    c.execute(
-                        "DELETE FROM sqlite_sequence WHERE name = 'matches'")
+                    # إعادة تعيين اللاعبين، حذف المباريات وتنظيف الدردشات
+                    await db.reset_season(1000)
+                    await rank_index.load()
 
-                    # تنظيف الدردشات
-                    c.execute("UPDATE private_chats SET is_active = 0")
-                    c.execute("UPDATE private_matches SET is_active = 0")
-
-                    conn.commit()
-
-                    # المرحلة 4: تنظيف الذاكرة
+                    # المرحلة 3: تنظيف الذاكرة
                     await button_interaction.edit_original_response(
                         embed=discord.Embed(
                             title="🔄 جاري إعادة التعيين...",
                             description=
-                            "**المرحلة 4/5:** تنظيف الطابور والمباريات النشطة...",
+                            "**المرحلة 3/4:** تنظيف الطابور والمباريات النشطة...",
                             color=discord.Color.orange()))
 
                     # تنظيف المباريات النشطة في الذاكرة
-                    global active_matches, player_queue, match_id_counter
+                    global match_id_counter
                     active_matches.clear()
-                    player_queue.clear()
+                    clear_guild_queues(button_interaction.guild)
+                    rank_sync.forget_guild(str(button_interaction.guild.id))
                     match_id_counter = 1
 
-                    # المرحلة 5: الانتهاء
+                    # المرحلة 4: الانتهاء
                     await button_interaction.edit_original_response(
                         embed=discord.Embed(
                             title="🔄 جاري إعادة التعيين...",
                             description=
-                            "**المرحلة 5/5:** الانتهاء من إعادة التعيين...",
+                            "**المرحلة 4/4:** الانتهاء من إعادة التعيين...",
                             color=discord.Color.orange()))
 
                     # إنشاء embed النجاح
@@ -5544,8 +5692,9 @@ async def set_mmr_command(interaction: discord.Interaction):
                             return
 
                         # Update all players in the database
-                        c.execute("UPDATE players SET mmr = ?", (value,))
-                        conn.commit()
+                        await db.execute("UPDATE players SET mmr = ?", (value,))
+                        await rank_index.load()
+                        mark_all_ranks_dirty()
 
                         await modal_interaction.response.send_message(
                             f"✅ Set MMR for all members to **{value}**.", ephemeral=True)
@@ -5635,6 +5784,8 @@ async def help_command(interaction: discord.Interaction):
 @app_commands.default_permissions(administrator=True)
 async def admin_match_control(interaction: discord.Interaction):
     """Admin control panel for managing active matches"""
+    active_matches = guild_state(interaction.guild).active_matches
+
     print(
         f"[DEBUG] Admin match command called by {interaction.user.display_name}"
     )
@@ -5713,6 +5864,8 @@ async def admin_match_control(interaction: discord.Interaction):
                            options=options)
         async def match_select(self, select_interaction: discord.Interaction,
                                select: discord.ui.Select):
+            active_matches = guild_state(select_interaction.guild).active_matches
+
             try:
                 match_id = int(select.values[0])
                 print(f"[DEBUG] Admin selected match {match_id}")
@@ -5796,8 +5949,7 @@ async def game_log(interaction: discord.Interaction):
 
     # Get all matches from database
     c.execute("""
-        SELECT match_id, team1_players, team2_players, winner, created_at, ended_at, 
-               admin_modified, cancelled
+        SELECT match_id, winner, created_at, ended_at, admin_modified, cancelled
         FROM matches 
         ORDER BY match_id DESC
     """)
@@ -5818,7 +5970,7 @@ async def game_log(interaction: discord.Interaction):
         color=discord.Color.blue())
 
     # Add summary statistics
-    completed_matches = [m for m in all_matches if m[3] is not None]
+    completed_matches = [m for m in all_matches if m[1] is not None]
     active_matches_count = len(all_matches) - len(completed_matches)
 
     embed.add_field(
@@ -5827,30 +5979,17 @@ async def game_log(interaction: discord.Interaction):
         f"**Total:** {len(all_matches)}\n**Completed:** {len(completed_matches)}\n**Active:** {active_matches_count}",
         inline=True)
 
+    # Team names for the listed matches in one JOIN
+    rosters = await db.match_rosters([m[0] for m in all_matches[:25]])
+
     # Create dropdown for match selection
     options = []
     for match in all_matches[:25]:  # Discord limit
-        match_id, team1_ids, team2_ids, winner, created_at, ended_at, admin_modified, cancelled = match
+        match_id, winner, created_at, ended_at, admin_modified, cancelled = match
 
         # Get team names
-        team1_names = []
-        team2_names = []
-
-        if team1_ids:
-            for player_id in team1_ids.split(','):
-                c.execute("SELECT username FROM players WHERE id = ?",
-                          (player_id, ))
-                result = c.fetchone()
-                if result:
-                    team1_names.append(result[0])
-
-        if team2_ids:
-            for player_id in team2_ids.split(','):
-                c.execute("SELECT username FROM players WHERE id = ?",
-                          (player_id, ))
-                result = c.fetchone()
-                if result:
-                    team2_names.append(result[0])
+        team1_names = [p['username'] for p in rosters[match_id][1]]
+        team2_names = [p['username'] for p in rosters[match_id][2]]
 
         # Status indicators
         status = "🔴 Active"
@@ -5888,8 +6027,8 @@ async def game_log(interaction: discord.Interaction):
             # Get detailed match data
             c.execute(
                 """
-                SELECT match_id, team1_players, team2_players, winner, created_at, ended_at,
-                       admin_modified, cancelled, channel_id
+                SELECT match_id, winner, created_at, ended_at, admin_modified,
+                       cancelled, channel_id
                 FROM matches WHERE match_id = ?
             """, (match_id, ))
             match_data = c.fetchone()
@@ -5905,43 +6044,12 @@ async def game_log(interaction: discord.Interaction):
         async def show_match_details(self, interaction: discord.Interaction,
                                      match_data):
             """Show detailed match information"""
-            match_id, team1_ids, team2_ids, winner, created_at, ended_at, admin_modified, cancelled, channel_id = match_data
+            match_id, winner, created_at, ended_at, admin_modified, cancelled, channel_id = match_data
 
             # Get team player details
-            team1_details = []
-            team2_details = []
-
-            if team1_ids:
-                for player_id in team1_ids.split(','):
-                    c.execute(
-                        "SELECT username, mmr, wins, losses FROM players WHERE id = ?",
-                        (player_id, ))
-                    result = c.fetchone()
-                    if result:
-                        username, mmr, wins, losses = result
-                        team1_details.append({
-                            'id': player_id,
-                            'username': username,
-                            'mmr': mmr,
-                            'wins': wins,
-                            'losses': losses
-                        })
-
-            if team2_ids:
-                for player_id in team2_ids.split(','):
-                    c.execute(
-                        "SELECT username, mmr, wins, losses FROM players WHERE id = ?",
-                        (player_id, ))
-                    result = c.fetchone()
-                    if result:
-                        username, mmr, wins, losses = result
-                        team2_details.append({
-                            'id': player_id,
-                            'username': username,
-                            'mmr': mmr,
-                            'wins': wins,
-                            'losses': losses
-                        })
+            roster = (await db.match_rosters([match_id]))[match_id]
+            team1_details = roster[1]
+            team2_details = roster[2]
 
             # Create detailed embed
             embed = discord.Embed(title=f"🔍 Match #{match_id} Details",
@@ -6059,9 +6167,11 @@ class MatchModifyView(discord.ui.View):
                                   winner,
                                   cancelled=False):
         """Modify match winner"""
+        active_matches = guild_state(interaction.guild).active_matches
+
         try:
             if cancelled:
-                c.execute(
+                await db.execute(
                     """
                     UPDATE matches 
                     SET cancelled = 1, ended_at = ?, admin_modified = 1
@@ -6069,7 +6179,7 @@ class MatchModifyView(discord.ui.View):
                 """, (datetime.now().isoformat(), self.match_id))
                 status = "🚫 Match cancelled"
             else:
-                c.execute(
+                await db.execute(
                     """
                     UPDATE matches 
                     SET winner = ?, ended_at = ?, admin_modified = 1
@@ -6083,8 +6193,6 @@ class MatchModifyView(discord.ui.View):
                 else:
                     status = "🤝 Match set as tie"
 
-            conn.commit()
-
             # Remove from active matches if it exists
             if self.match_id in active_matches:
                 del active_matches[self.match_id]
@@ -6203,8 +6311,7 @@ async def create_ranks(interaction: discord.Interaction):
             role_name = rank_data['role_name']
 
             # Check if role already exists
-            existing_role = discord.utils.get(interaction.guild.roles,
-                                              name=role_name)
+            existing_role = rank_role_cache.get(interaction.guild, role_name)
             if existing_role:
                 existing_roles.append(role_name)
                 continue
@@ -6260,7 +6367,8 @@ async def sync_ranks(interaction: discord.Interaction):
 
     try:
         updated_count, total_count = await sync_all_player_ranks(
-            interaction.guild)
+            interaction.guild,
+            role_progress_reporter(interaction, "🔄 Syncing Ranks..."))
 
         embed = discord.Embed(
             title="🎖️ Rank Sync Complete",
@@ -6316,13 +6424,13 @@ async def rank_info(interaction: discord.Interaction):
     embed.add_field(
         name="🔄 How It Works",
         value=
-        "• Ranks are assigned automatically based on your MMR\n• Win matches to gain MMR and climb ranks\n• Roles are updated after each match AND every 10 minutes\n• Use `/rank` to see your current rank",
+        "• Ranks are assigned automatically based on your MMR\n• Win matches to gain MMR and climb ranks\n• Roles are updated after each match and whenever your MMR changes rank\n• Use `/rank` to see your current rank",
         inline=False)
 
     embed.add_field(
         name="⚡ Auto-Update System",
         value=
-        "• Ranks update automatically every 10 minutes\n• Instant updates after matches\n• No manual rank requests needed",
+        "• Ranks update automatically when your MMR changes rank\n• Instant updates after matches\n• No manual rank requests needed",
         inline=False)
 
     embed.set_footer(text="Play matches to climb the ranks!")
@@ -6354,19 +6462,15 @@ async def force_rank_update(interaction: discord.Interaction):
             await interaction.followup.send(embed=embed)
             return
 
-        updated_count = 0
-        errors = []
-
-        for player_id, username, mmr in active_players:
-            try:
-                success = await update_player_rank_role(
-                    interaction.guild, player_id, mmr)
-                if success:
-                    updated_count += 1
-                else:
-                    errors.append(f"{username}: Update failed")
-            except Exception as e:
-                errors.append(f"{username}: {str(e)[:50]}")
+        stats = await bulk_update_rank_roles(
+            interaction.guild,
+            [(player_id, mmr) for player_id, _, mmr in active_players],
+            role_progress_reporter(interaction, "🔄 Updating Ranks..."))
+        updated_count = len(stats['applied'])
+        errors = [
+            f"{member.display_name}: {str(e)[:50]}"
+            for member, e in stats['failed']
+        ]
 
         embed = discord.Embed(
             title="🎖️ Force Rank Update Complete",
@@ -6383,6 +6487,11 @@ async def force_rank_update(interaction: discord.Interaction):
             name="Success Rate",
             value=f"**{(updated_count/len(active_players)*100):.1f}%**",
             inline=True)
+        embed.add_field(
+            name="⏱️ Role Edits",
+            value=
+            f"{stats['changed']} changed, {stats['skipped']} already correct in {stats['elapsed']:.1f}s ({stats['rate']:.1f}/s)",
+            inline=False)
 
         if errors and len(errors) <= 5:
             embed.add_field(name="⚠️ Errors",
@@ -6397,7 +6506,7 @@ async def force_rank_update(interaction: discord.Interaction):
                 inline=False)
 
         embed.add_field(name="🔄 Next Auto-Update",
-                        value="Automatic updates continue every 10 minutes",
+                        value="Automatic updates follow every MMR change",
                         inline=False)
 
         embed.set_footer(
@@ -6457,10 +6566,11 @@ class PlayerModifyView(discord.ui.View):
     async def reset_player_stats(self, interaction: discord.Interaction):
         """Reset player stats to default"""
         try:
-            c.execute(
+            await db.execute(
                 "UPDATE players SET mmr = 800, wins = 0, losses = 0 WHERE id = ?",
                 (self.player_id, ))
-            conn.commit()
+            await rank_index.refresh([self.player_id])
+            mark_rank_dirty(self.player_id, 800)
 
             embed = discord.Embed(
                 title="✅ Player Stats Reset",
@@ -6504,9 +6614,10 @@ class PlayerMMRModal(discord.ui.Modal):
                     "❌ MMR must be between 0 and 5000", ephemeral=True)
                 return
 
-            c.execute("UPDATE players SET mmr = ? WHERE id = ?",
-                      (new_mmr, self.player_id))
-            conn.commit()
+            await db.execute("UPDATE players SET mmr = ? WHERE id = ?",
+                             (new_mmr, self.player_id))
+            await rank_index.refresh([self.player_id])
+            mark_rank_dirty(self.player_id, new_mmr)
 
             embed = discord.Embed(
                 title="✅ MMR Updated",
@@ -6549,9 +6660,9 @@ class PlayerWinsModal(discord.ui.Modal):
                     "❌ Wins cannot be negative", ephemeral=True)
                 return
 
-            c.execute("UPDATE players SET wins = ? WHERE id = ?",
-                      (new_wins, self.player_id))
-            conn.commit()
+            await db.execute("UPDATE players SET wins = ? WHERE id = ?",
+                             (new_wins, self.player_id))
+            await rank_index.refresh([self.player_id])
 
             embed = discord.Embed(
                 title="✅ Wins Updated",
@@ -6594,9 +6705,9 @@ class PlayerLossesModal(discord.ui.Modal):
                     "❌ Losses cannot be negative", ephemeral=True)
                 return
 
-            c.execute("UPDATE players SET losses = ? WHERE id = ?",
-                      (new_losses, self.player_id))
-            conn.commit()
+            await db.execute("UPDATE players SET losses = ? WHERE id = ?",
+                             (new_losses, self.player_id))
+            await rank_index.refresh([self.player_id])
 
             embed = discord.Embed(
                 title="✅ Losses Updated",
@@ -6617,6 +6728,23 @@ class PlayerLossesModal(discord.ui.Modal):
                 f"❌ Error updating losses: {e}", ephemeral=True)
 
 
+# Rank role cache invalidation
+@bot.event
+async def on_guild_role_create(role):
+    rank_role_cache.invalidate(role.guild.id)
+
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.name != after.name:
+        rank_role_cache.invalidate(after.guild.id)
+
+
+@bot.event
+async def on_guild_role_delete(role):
+    rank_role_cache.invalidate(role.guild.id)
+
+
 # Error handling
 @bot.event
 async def on_command_error(ctx, error):
@@ -0,0 +1,359 @@
+"""
+HeatSeeker matchmaking - MMR-window match finding for the queue
+
+Waiting players are kept in a list sorted by MMR (maintained with bisect), so
+a join or leave is a binary search. A match is the tightest run of adjacent
+players whose MMR spread fits the search window, and the window widens the
+longer the players in it have been waiting.
+
+PlayerQueue and ActiveMatches keep the queue and the running matches indexed
+by player id, so "is this player queued / in a match" is a dict lookup. A
+guild runs one PlayerQueue per mode, a format such as "1v1" or "5v5" (see
+guild_state.py).
+"""
+
+import re
+import time
+from bisect import bisect_left, insort
+
+# Default search window: BASE_WINDOW MMR, plus WINDOW_GROWTH per minute waited
+BASE_WINDOW = 150
+WINDOW_GROWTH = 150
+
+# Queue inactivity timeout used when none is given
+DEFAULT_TIMEOUT_MINUTES = 5
+
+# Queue modes are "<team size>v<team size>"
+MODE_PATTERN = re.compile(r'([1-9]\d*)v\1')
+
+
+def mode_for_size(size):
+    """Queue mode for a total player count (4 -> "2v2")"""
+    return f"{size // 2}v{size // 2}"
+
+
+def size_for_mode(mode):
+    """Total player count of a mode ("2v2" -> 4), or None if invalid"""
+    match = MODE_PATTERN.fullmatch(mode or '')
+    if not match:
+        return None
+    return int(match.group(1)) * 2
+
+
+class MatchMaker:
+    """MMR-sorted pool of waiting players"""
+
+    def __init__(self,
+                 base_window=BASE_WINDOW,
+                 window_growth=WINDOW_GROWTH,
+                 clock=time.monotonic):
+        self.base_window = base_window
+        self.window_growth = window_growth
+        self.clock = clock
+        self._sorted = []  # (mmr, join sequence, player id)
+        self._entries = {}  # player id -> (sort key, player dict, joined at)
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def __contains__(self, player_id):
+        return player_id in self._entries
+
+    def add(self, player, joined_at=None):
+        """Add a player dict (needs 'id' and 'mmr'); no-op if already waiting"""
+        if player['id'] in self._entries:
+            return
+        self._sequence += 1
+        key = (player['mmr'], self._sequence, player['id'])
+        insort(self._sorted, key)
+        self._entries[player['id']] = (key, player, joined_at if joined_at
+                                       is not None else self.clock())
+
+    def remove(self, player_id):
+        """Remove a waiting player; returns their player dict or None"""
+        entry = self._entries.pop(player_id, None)
+        if entry is None:
+            return None
+        key = entry[0]
+        del self._sorted[bisect_left(self._sorted, key)]
+        return entry[1]
+
+    def clear(self):
+        self._sorted.clear()
+        self._entries.clear()
+
+    def window_for(self, player_id, now=None):
+        """Current MMR window of a waiting player"""
+        now = self.clock() if now is None else now
+        waited_minutes = max(0, now - self._entries[player_id][2]) / 60
+        return self.base_window + self.window_growth * waited_minutes
+
+    def find_match(self, size, now=None, around=None):
+        """Return the size players forming the tightest acceptable match
+
+        A group is acceptable when its MMR spread fits the window of its
+        longest-waiting member. With around=player_id only the groups
+        containing that player are checked (O(size), used on join);
+        otherwise the whole pool is scanned. Returns None if nothing fits.
+        """
+        if size <= 0 or len(self._sorted) < size:
+            return None
+        now = self.clock() if now is None else now
+
+        if around is not None:
+            if around not in self._entries:
+                return None
+            index = bisect_left(self._sorted, self._entries[around][0])
+            starts = range(max(0, index - size + 1),
+                           min(index, len(self._sorted) - size) + 1)
+        else:
+            starts = range(len(self._sorted) - size + 1)
+
+        best = None
+        for start in starts:
+            group = self._sorted[start:start + size]
+            spread = group[-1][0] - group[0][0]
+            oldest = min(self._entries[key[2]][2] for key in group)
+            if spread > self.base_window + self.window_growth * max(
+                    0, now - oldest) / 60:
+                continue
+            # Tightest spread first, then whoever has waited longest
+            rank = (spread, oldest)
+            if best is None or rank < best[0]:
+                best = (rank, group)
+
+        if best is None:
+            return None
+        return [self._entries[key[2]][1] for key in best[1]]
+
+    def next_match_time(self, size):
+        """Clock time at which find_match(size) first finds a group
+
+        Windows only widen, so this is exact until the pool changes; it is
+        in the past when a match is already possible. None when fewer than
+        size players wait or no group can ever fit.
+        """
+        if size <= 0 or len(self._sorted) < size:
+            return None
+        best = None
+        for start in range(len(self._sorted) - size + 1):
+            group = self._sorted[start:start + size]
+            excess = group[-1][0] - group[0][0] - self.base_window
+            oldest = min(self._entries[key[2]][2] for key in group)
+            if excess <= 0:
+                at = oldest
+            elif self.window_growth > 0:
+                at = oldest + 60 * excess / self.window_growth
+            else:
+                continue
+            if best is None or at < best:
+                best = at
+        return best
+
+    def closest(self, mmr, count):
+        """Up to count waiting players nearest to mmr, nearest first"""
+        index = bisect_left(self._sorted, (mmr, ))
+        below, above = index - 1, index
+        picked = []
+        while len(picked) < count and (below >= 0
+                                       or above < len(self._sorted)):
+            if above >= len(self._sorted) or (
+                    below >= 0 and mmr - self._sorted[below][0] <=
+                    self._sorted[above][0] - mmr):
+                picked.append(self._sorted[below])
+                below -= 1
+            else:
+                picked.append(self._sorted[above])
+                above += 1
+        return [self._entries[key[2]][1] for key in picked]
+
+    def pop_match(self, size, now=None, around=None):
+        """find_match, removing the matched players from the pool"""
+        players = self.find_match(size, now, around)
+        if players:
+            for player in players:
+                self.remove(player['id'])
+        return players
+
+
+class PlayerQueue:
+    """Join-ordered queue of player dicts with O(1) membership
+
+    Iterating yields the players in join order; every change is mirrored
+    into a MatchMaker so matches can be taken by MMR window. Each queue has
+    its own size (players per match) and inactivity timeout. With a journal
+    set, every change is also persisted so the queue survives a restart.
+    """
+
+    def __init__(self,
+                 size=2,
+                 timeout_minutes=DEFAULT_TIMEOUT_MINUTES,
+                 matchmaker=None):
+        self.size = size
+        self.mode = mode_for_size(size)
+        self.timeout_minutes = timeout_minutes
+        self.matchmaker = matchmaker or MatchMaker()
+        self._players = {}  # player id -> player dict, in join order
+        self.guild_id = None
+        self.message_id = None  # id of the queue display message
+        self.ready_check_seconds = 0  # 0 = matches start without a check
+        self.journal = None  # optional QueueJournal (see database.py)
+
+    @property
+    def team_size(self):
+        return self.size // 2
+
+    def __len__(self):
+        return len(self._players)
+
+    def __iter__(self):
+        return iter(list(self._players.values()))
+
+    def __contains__(self, player_id):
+        return player_id in self._players
+
+    def get(self, player_id):
+        return self._players.get(player_id)
+
+    def copy(self):
+        """Snapshot of the waiting players as a list"""
+        return list(self._players.values())
+
+    def add(self, player, joined_at=None):
+        """Queue a player dict; returns False if they were already queued"""
+        if not self.restore(player, joined_at):
+            return False
+        if self.journal:
+            self.journal.added(self, player)
+        return True
+
+    def restore(self, player, joined_at=None):
+        """add without journaling, for replaying a persisted queue"""
+        if player['id'] in self._players:
+            return False
+        self._players[player['id']] = player
+        self.matchmaker.add(player, joined_at)
+        return True
+
+    def refresh(self, player_id):
+        """Record that a queued player renewed their spot (clicked Join)"""
+        if player_id in self._players and self.journal:
+            self.journal.refreshed(self, player_id)
+
+    def remove(self, player_id):
+        """Remove a player; returns their player dict or None"""
+        player = self._players.pop(player_id, None)
+        if player is not None:
+            self.matchmaker.remove(player_id)
+            if self.journal:
+                self.journal.removed(self, [player_id])
+        return player
+
+    def clear(self):
+        self._players.clear()
+        self.matchmaker.clear()
+        if self.journal:
+            self.journal.cleared(self)
+
+    def configure(self,
+                  timeout_minutes=None,
+                  message_id=None,
+                  ready_check_seconds=None):
+        """Change the timeout, display message id and/or ready-check time
+        and persist them"""
+        if timeout_minutes is not None:
+            self.timeout_minutes = timeout_minutes
+        if message_id is not None:
+            self.message_id = message_id
+        if ready_check_seconds is not None:
+            self.ready_check_seconds = ready_check_seconds
+        if self.journal:
+            self.journal.configured(self)
+
+    def take_match(self, size, around=None):
+        """Remove and return the best MMR-window match of size players
+
+        With around=player_id only matches containing that player are
+        considered. Returns None if no group fits.
+        """
+        players = self.matchmaker.pop_match(size, around=around)
+        if players:
+            for player in players:
+                self._players.pop(player['id'], None)
+            if self.journal:
+                self.journal.removed(self,
+                                     [player['id'] for player in players])
+        return players
+
+    def take_closest(self, mmr, count):
+        """Remove and return up to count players nearest to mmr"""
+        players = self.matchmaker.closest(mmr, count)
+        for player in players:
+            self._players.pop(player['id'], None)
+            self.matchmaker.remove(player['id'])
+        if players and self.journal:
+            self.journal.removed(self, [player['id'] for player in players])
+        return players
+
+
+class ActiveMatches(dict):
+    """match_id -> match data dict, with a player id -> match_id index
+
+    Every dict method that adds or removes matches (item assignment,
+    update, |=, setdefault, del, pop, popitem, clear) keeps the index in
+    step.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._player_matches = {}
+
+    def __setitem__(self, match_id, match_data):
+        if match_id in self:
+            self._unindex(match_id)
+        super().__setitem__(match_id, match_data)
+        for player_id in match_data.get('players', ()):
+            self._player_matches[player_id] = match_id
+
+    def __delitem__(self, match_id):
+        self._unindex(match_id)
+        super().__delitem__(match_id)
+
+    def pop(self, match_id, *default):
+        if match_id in self:
+            self._unindex(match_id)
+        return super().pop(match_id, *default)
+
+    def update(self, *args, **kwargs):
+        for match_id, match_data in dict(*args, **kwargs).items():
+            self[match_id] = match_data
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, match_id, default=None):
+        if match_id not in self:
+            self[match_id] = default
+        return self[match_id]
+
+    def popitem(self):
+        if not self:
+            raise KeyError('popitem(): dictionary is empty')
+        match_id = next(reversed(self))  # last inserted, like dict.popitem
+        return match_id, self.pop(match_id)
+
+    def clear(self):
+        self._player_matches.clear()
+        super().clear()
+
+    def _unindex(self, match_id):
+        for player_id in self[match_id].get('players', ()):
+            if self._player_matches.get(player_id) == match_id:
+                del self._player_matches[player_id]
+
+    def match_of(self, player_id):
+        """match_id of the player's active match, or None"""
+        return self._player_matches.get(player_id)
+
@@ -0,0 +1,214 @@
+"""
+HeatSeeker schema migrations - Versioned, run-once schema for players.db
+
+Every script that opens players.db calls run_migrations(conn). Pending
+migrations are applied in order inside one transaction and recorded in the
+schema_version table; when the schema is already current nothing is written.
+"""
+
+import logging
+from datetime import datetime
+
+from database import INDEXES
+
+logger = logging.getLogger('HeatSeeker')
+
+
+def _create_base_tables(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS players (
+        id TEXT PRIMARY KEY,
+        username TEXT,
+        mmr INTEGER DEFAULT 1000,
+        wins INTEGER DEFAULT 0,
+        losses INTEGER DEFAULT 0,
+        placement_matches_remaining INTEGER DEFAULT 5,
+        is_placed INTEGER DEFAULT 0
+    )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS matches (
+        match_id INTEGER PRIMARY KEY,
+        team1_players TEXT,
+        team2_players TEXT,
+        winner INTEGER,
+        created_at TEXT,
+        ended_at TEXT,
+        channel_id TEXT,
+        admin_modified INTEGER DEFAULT 0,
+        cancelled INTEGER DEFAULT 0,
+        hsm_number INTEGER
+    )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS private_chats (
+        hsm_number INTEGER PRIMARY KEY,
+        creator_id TEXT,
+        channel_id TEXT,
+        voice_channel_id TEXT,
+        created_at TEXT,
+        is_active INTEGER DEFAULT 1
+    )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS private_matches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        channel_id TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        is_active INTEGER DEFAULT 1
+    )''')
+
+
+def _add_column(cursor, table, column, definition):
+    """Add a column unless an older script already created it"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"MIGRATION: Added {table}.{column}")
+
+
+def _upgrade_legacy_columns(cursor):
+    # Databases created by discord_bot.py / test_bot.py predate these columns
+    _add_column(cursor, 'players', 'placement_matches_remaining',
+                'INTEGER DEFAULT 5')
+    _add_column(cursor, 'players', 'is_placed', 'INTEGER DEFAULT 0')
+    _add_column(cursor, 'matches', 'admin_modified', 'INTEGER DEFAULT 0')
+    _add_column(cursor, 'matches', 'cancelled', 'INTEGER DEFAULT 0')
+    _add_column(cursor, 'matches', 'hsm_number', 'INTEGER')
+
+
+def _create_indexes(cursor):
+    for statement in INDEXES:
+        cursor.execute(statement)
+
+
+def _create_match_participants(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS match_participants (
+        match_id INTEGER NOT NULL,
+        player_id TEXT NOT NULL,
+        team INTEGER NOT NULL,
+        mmr_before INTEGER,
+        mmr_after INTEGER,
+        PRIMARY KEY (match_id, player_id)
+    )''')
+    # Per-player match history
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_match_participants_player ON match_participants (player_id, match_id)"
+    )
+
+    # Backfill from the comma-joined team columns (MMR history is unknown)
+    cursor.execute("SELECT match_id, team1_players, team2_players FROM matches")
+    rows = []
+    for match_id, team1_ids, team2_ids in cursor.fetchall():
+        for team, player_ids in ((1, team1_ids), (2, team2_ids)):
+            for player_id in (player_ids or '').split(','):
+                if player_id.strip():
+                    rows.append((match_id, player_id.strip(), team))
+    cursor.executemany(
+        "INSERT OR IGNORE INTO match_participants (match_id, player_id, team) VALUES (?, ?, ?)",
+        rows)
+    logger.info(f"MIGRATION: Backfilled {len(rows)} match participants")
+
+
+def _create_queue_journal(cursor):
+    # One row per waiting player; joined_at is a Unix timestamp
+    cursor.execute('''CREATE TABLE IF NOT EXISTS queue_entries (
+        guild_id TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        player_id TEXT NOT NULL,
+        username TEXT,
+        mmr INTEGER,
+        is_placement INTEGER DEFAULT 0,
+        joined_at REAL,
+        PRIMARY KEY (guild_id, player_id)
+    )''')
+    # Per-queue timeout and the id of its queue display message
+    cursor.execute('''CREATE TABLE IF NOT EXISTS queue_settings (
+        guild_id TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        timeout_minutes INTEGER,
+        message_id TEXT,
+        PRIMARY KEY (guild_id, mode)
+    )''')
+
+
+def _add_ready_check_setting(cursor):
+    cursor.execute(
+        "ALTER TABLE queue_settings ADD COLUMN ready_check_seconds INTEGER DEFAULT 0"
+    )
+
+
+def _create_rank_assignments(cursor):
+    # Rank role last applied to each player in each guild
+    cursor.execute('''CREATE TABLE IF NOT EXISTS rank_assignments (
+        guild_id TEXT NOT NULL,
+        player_id TEXT NOT NULL,
+        role_name TEXT NOT NULL,
+        PRIMARY KEY (guild_id, player_id)
+    )''')
+
+
+def _add_queue_last_seen(cursor):
+    # Unix time of the player's last Join click (their AFK timer's start)
+    cursor.execute("ALTER TABLE queue_entries ADD COLUMN last_seen REAL")
+    cursor.execute(
+        "UPDATE queue_entries SET last_seen = joined_at WHERE last_seen IS NULL")
+
+
+# (version, description, function) - append only, never renumber
+MIGRATIONS = (
+    (1, "players, matches, private_chats and private_matches tables",
+     _create_base_tables),
+    (2, "placement, admin and HSM columns on legacy tables",
+     _upgrade_legacy_columns),
+    (3, "secondary index pack", _create_indexes),
+    (4, "match_participants table backfilled from matches",
+     _create_match_participants),
+    (5, "queue_entries and queue_settings journal tables",
+     _create_queue_journal),
+    (6, "ready_check_seconds queue setting", _add_ready_check_setting),
+    (7, "rank_assignments table", _create_rank_assignments),
+    (8, "last_seen queue entry column", _add_queue_last_seen),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Return the applied schema version (0 for an unversioned database)"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    )
+    if not cursor.fetchone():
+        return 0
+    cursor.execute("SELECT MAX(version) FROM schema_version")
+    return cursor.fetchone()[0] or 0
+
+
+def run_migrations(conn, target=LATEST_VERSION):
+    """Apply every pending migration up to target in a single transaction
+
+    Returns the list of versions applied (empty when already current).
+    """
+    current = get_schema_version(conn)
+    pending = [m for m in MIGRATIONS if current < m[0] <= target]
+    if not pending:
+        return []
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT
+        )''')
+        for version, description, migrate in pending:
+            migrate(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now().isoformat()))
+            logger.info(f"MIGRATION: Applied v{version} - {description}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        logger.error(f"MIGRATION: Failed, schema left at v{current}")
+        raise
+
+    conn.execute("PRAGMA optimize")
+    return [m[0] for m in pending]
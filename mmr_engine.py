@@ -0,0 +1,210 @@
+"""
+HeatSeeker MMR engine - ELO-based rating changes with placement support
+
+Pure functions with no database or Discord access. Callers prefetch every
+participant's player row (see Database.get_players) and pass it in, so a
+match result costs one query and the engine can be reused for offline replays.
+"""
+
+import logging
+
+logger = logging.getLogger('HeatSeeker')
+
+# Used when the calculation cannot run (empty team, bad data)
+DEFAULT_WIN = 25
+DEFAULT_LOSS = -25
+
+# Bounds on a single player's change (wide enough for placement K=80)
+MIN_CHANGE = 15
+MAX_CHANGE = 100
+
+
+def default_changes(winning_team, losing_team):
+    """Flat fallback changes for every participant"""
+    deltas = {p['id']: DEFAULT_WIN for p in winning_team}
+    deltas.update({p['id']: DEFAULT_LOSS for p in losing_team})
+    return {'deltas': deltas, 'winners': DEFAULT_WIN, 'losers': DEFAULT_LOSS}
+
+
+def clamp_gain(change):
+    """Round a winner's change into [MIN_CHANGE, MAX_CHANGE]"""
+    return int(max(MIN_CHANGE, min(MAX_CHANGE, round(change))))
+
+
+def clamp_loss(change):
+    """Round a loser's change into [-MAX_CHANGE, -MIN_CHANGE]"""
+    return int(min(-MIN_CHANGE, max(-MAX_CHANGE, round(change))))
+
+
+def is_in_placement(state):
+    """True when a prefetched player row is still playing placement matches"""
+    return bool(state) and state['placement_matches_remaining'] > 0 and state[
+        'is_placed'] == 0
+
+
+def get_k_factor(player_mmr, total_games, is_placement=False):
+    """Get K-factor based on player level and experience"""
+    if is_placement:
+        return 80  # Double MMR for placement matches
+    elif total_games < 10:
+        return 40  # New players - fast progression
+    elif player_mmr < 800:
+        return 30  # Lower skill - moderate progression
+    elif player_mmr < 1050:
+        return 25  # Average skill - normal progression
+    elif player_mmr < 1300:
+        return 20  # High skill - slower progression
+    else:
+        return 15  # Elite players - very stable
+
+
+def team_k_factors(team, player_states):
+    """K-factor of every player in a team, in one pass over the states"""
+    k_factors = []
+    for player in team:
+        state = player_states.get(player['id'])
+        total_games = (state['wins'] + state['losses']) if state else 0
+        k_factors.append(
+            get_k_factor(player['mmr'], total_games, is_in_placement(state)))
+    return k_factors
+
+
+def expected_score(rating, opponent_rating):
+    """ELO expectation: P(A wins) = 1 / (1 + 10^((RB - RA) / 400))"""
+    return 1 / (1 + pow(10, (opponent_rating - rating) / 400))
+
+
+def calculate_mmr_changes(winning_team, losing_team, player_states):
+    """Calculate per-player MMR changes for a finished match
+
+    winning_team/losing_team are lists of player dicts with 'id' and 'mmr';
+    player_states maps player id -> prefetched player row (or None). The
+    result's 'deltas' maps every player id to their own change, scaled by
+    their own K-factor; 'winners'/'losers' are the team averages.
+    """
+    logger.info(
+        f"MMR CALCULATION: Winning team size={len(winning_team)}, Losing team size={len(losing_team)}"
+    )
+
+    # Safety check for empty teams
+    if len(winning_team) == 0 or len(losing_team) == 0:
+        logger.error(
+            f"MMR CALCULATION: Empty team detected! Winning={len(winning_team)}, Losing={len(losing_team)}"
+        )
+        return default_changes(winning_team, losing_team)
+
+    try:
+        # Calculate team averages
+        avg_winner_mmr = sum(p['mmr']
+                             for p in winning_team) / len(winning_team)
+        avg_loser_mmr = sum(p['mmr'] for p in losing_team) / len(losing_team)
+        mmr_difference = avg_winner_mmr - avg_loser_mmr
+
+        logger.info(
+            f"MMR CALCULATION: Winner avg={avg_winner_mmr:.1f}, Loser avg={avg_loser_mmr:.1f}, Diff={mmr_difference:.1f}"
+        )
+
+        # Check for placement matches
+        winner_placement_players = [
+            p['id'] for p in winning_team
+            if is_in_placement(player_states.get(p['id']))
+        ]
+        loser_placement_players = [
+            p['id'] for p in losing_team
+            if is_in_placement(player_states.get(p['id']))
+        ]
+
+        # Calculate average K-factor for each team
+        winner_k_factors = team_k_factors(winning_team, player_states)
+        loser_k_factors = team_k_factors(losing_team, player_states)
+        avg_winner_k = sum(winner_k_factors) / len(winner_k_factors)
+        avg_loser_k = sum(loser_k_factors) / len(loser_k_factors)
+
+        # Calculate expected probability using ELO formula
+        expected_winner_probability = expected_score(avg_winner_mmr,
+                                                     avg_loser_mmr)
+        expected_loser_probability = 1 - expected_winner_probability
+
+        logger.info(
+            f"MMR CALCULATION: Expected win probability - Winner: {expected_winner_probability:.3f}, Loser: {expected_loser_probability:.3f}"
+        )
+
+        # Bonus/penalty multipliers based on MMR difference
+        winner_multiplier = 1.0
+        loser_multiplier = 1.0
+        if mmr_difference > 100:  # Strong favorite won
+            # Reduce gains for beating weaker opponents
+            winner_multiplier *= 0.7
+            loser_multiplier *= 0.8  # Reduce loss against stronger opponent
+            performance_note = "Expected Victory"
+        elif mmr_difference < -100:  # Major upset
+            # Increase gains for beating stronger opponents
+            winner_multiplier *= 1.5
+            loser_multiplier *= 1.3  # Increase loss for losing to weaker opponent
+            performance_note = "UPSET VICTORY!"
+        else:
+            performance_note = "Balanced Match"
+
+        # Add placement match indicator
+        if winner_placement_players or loser_placement_players:
+            placement_count = len(winner_placement_players) + len(
+                loser_placement_players)
+            performance_note += f" (Placement: {placement_count} players)"
+
+        # Apply skill-based modifiers
+        if avg_winner_mmr < 1000 and mmr_difference > 50:
+            # Lower skill player beating higher skill - extra reward
+            winner_multiplier *= 1.2
+            performance_note += " (Skill Growth)"
+
+        if avg_loser_mmr > 1400 and mmr_difference < -50:
+            # High skill player losing to lower skill - extra penalty
+            loser_multiplier *= 1.2
+            performance_note += " (Underperformance)"
+
+        # Per-player ELO change: K_i * (Actual_Score - Expected_Score)
+        # Actual_Score: 1 for winner, 0 for loser
+        winner_base = (1 - expected_winner_probability) * winner_multiplier
+        loser_base = (0 - expected_loser_probability) * loser_multiplier
+        deltas = {}
+        k_factors = {}
+        for player, k_factor in zip(winning_team, winner_k_factors):
+            deltas[player['id']] = clamp_gain(k_factor * winner_base)
+            k_factors[player['id']] = k_factor
+        for player, k_factor in zip(losing_team, loser_k_factors):
+            deltas[player['id']] = clamp_loss(k_factor * loser_base)
+            k_factors[player['id']] = k_factor
+
+        # Team summaries (average of the individual changes)
+        winner_change = round(
+            sum(deltas[p['id']] for p in winning_team) / len(winning_team))
+        loser_change = round(
+            sum(deltas[p['id']] for p in losing_team) / len(losing_team))
+
+        logger.info(
+            f"MMR CALCULATION: Final - Winner avg: +{winner_change}, Loser avg: {loser_change}, Per player: {deltas}, Performance: {performance_note}"
+        )
+        logger.info(
+            f"MMR CALCULATION: K-factors - Winner avg: {avg_winner_k:.1f}, Loser avg: {avg_loser_k:.1f}"
+        )
+        logger.info(
+            f"MMR CALCULATION: Placement players - Winners: {len(winner_placement_players)}, Losers: {len(loser_placement_players)}"
+        )
+
+        return {
+            'deltas': deltas,
+            'k_factors': k_factors,
+            'winners': int(winner_change),
+            'losers': int(loser_change),
+            'performance_note': performance_note,
+            'expected_probability': expected_winner_probability,
+            'mmr_difference': mmr_difference,
+            'winner_k_factor': avg_winner_k,
+            'loser_k_factor': avg_loser_k,
+            'winner_placement_players': winner_placement_players,
+            'loser_placement_players': loser_placement_players
+        }
+
+    except Exception as e:
+        logger.error(f"MMR CALCULATION ERROR: {e}")
+        return default_changes(winning_team, losing_team)
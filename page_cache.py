@@ -0,0 +1,62 @@
+"""
+HeatSeeker page cache - Short-lived results tied to a data version
+
+Leaderboard pages are requested again and again (every Next/Previous click)
+while the data behind them only changes when a match finishes. A
+VersionedCache keeps each result with the data version it was built from
+and answers from memory until the version moves on or ttl seconds pass.
+"""
+
+import time
+
+# Default seconds an entry is served even if its version still matches
+DEFAULT_TTL = 60
+
+# Entries kept before expired and then oldest ones are dropped
+DEFAULT_MAX_ENTRIES = 512
+
+
+class VersionedCache:
+    """key -> value, valid for one data version and at most ttl seconds"""
+
+    def __init__(self,
+                 ttl=DEFAULT_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = {}  # key -> (version, expires at, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """The cached value, or None if missing, stale or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != version or entry[1] <= self.clock():
+            del self._entries[key]
+            return None
+        return entry[2]
+
+    def put(self, key, version, value):
+        self._entries.pop(key, None)  # re-insert as the newest entry
+        self._entries[key] = (version, self.clock() + self.ttl, value)
+        if len(self._entries) > self.max_entries:
+            self._prune()
+
+    def clear(self):
+        self._entries.clear()
+
+    def _prune(self):
+        """Drop expired entries, then the oldest until under max_entries"""
+        now = self.clock()
+        for key in [
+                key for key, entry in self._entries.items()
+                if entry[1] <= now
+        ]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
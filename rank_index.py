@@ -0,0 +1,175 @@
+"""
+HeatSeeker rank index - In-memory leaderboard ordering
+
+Leaderboard pages, rank positions and player counts used to be OFFSET and
+COUNT(*) queries, with one COUNT per leaderboard row for the medals.
+RankIndex keeps every player row in memory next to sorted keys for each
+leaderboard, so a position is a bisect, a page is a slice and a count is a
+len(). It is loaded once at startup and refreshed for just the players a
+match result or admin edit touched.
+
+version changes with every change to the index, so anything derived from
+it (cached leaderboard pages, for one) stays valid while version is equal.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+
+# Columns of an index row (the combined leaderboard's page rows)
+INDEX_COLUMNS = ('id', 'username', 'mmr', 'wins', 'losses',
+                 'placement_matches_remaining', 'is_placed')
+
+# Rows per "id IN (...)" query (stays under SQLite's variable limit)
+ID_CHUNK = 500
+
+
+def is_active(row):
+    """Python twin of database.ACTIVE_PLAYER_FILTER"""
+    return row[3] > 0 or row[4] > 0 or row[5] < 5
+
+
+class RankIndex:
+    """Player rows plus sorted leaderboard keys
+
+    Ties on MMR are ordered by player id, so every ordering is total.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._rows = {}  # player id -> row tuple (INDEX_COLUMNS)
+        self._all = []  # (-mmr, id) of every player
+        self._ranked = []  # (-mmr, id) of placed players
+        self._active = []  # (unplaced, -mmr, id) of active players
+        self._placement = 0  # players with placement matches left
+        self.version = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, player_id):
+        return player_id in self._rows
+
+    def get(self, player_id):
+        return self._rows.get(player_id)
+
+    def _keys(self, row):
+        """(sorted list, key) pairs the row belongs to"""
+        player_id, mmr, is_placed = row[0], row[2], row[6]
+        keys = [(self._all, (-mmr, player_id))]
+        if is_placed == 1:
+            keys.append((self._ranked, (-mmr, player_id)))
+        if is_active(row):
+            keys.append((self._active, (0 if is_placed == 1 else 1, -mmr,
+                                        player_id)))
+        return keys
+
+    def _is_placement(self, row):
+        return row[5] > 0 and row[6] == 0
+
+    def _insert(self, row):
+        self.version += 1
+        self._rows[row[0]] = row
+        for keys, key in self._keys(row):
+            insort(keys, key)
+        self._placement += self._is_placement(row)
+
+    def discard(self, player_id):
+        """Drop a player; returns their row or None"""
+        row = self._rows.pop(player_id, None)
+        if row is not None:
+            self.version += 1
+            for keys, key in self._keys(row):
+                del keys[bisect_left(keys, key)]
+            self._placement -= self._is_placement(row)
+        return row
+
+    def put(self, row):
+        """Insert or replace a player row"""
+        row = tuple(row)
+        self.discard(row[0])
+        self._insert(row)
+
+    def rename(self, player_id, username):
+        """Change a player's username (no reordering needed)"""
+        row = self._rows.get(player_id)
+        if row is not None and row[1] != username:
+            self.version += 1
+            self._rows[player_id] = (row[0], username) + row[2:]
+
+    async def load(self):
+        """Rebuild the whole index with one query"""
+        rows = await self.db.fetchall(
+            f"SELECT {', '.join(INDEX_COLUMNS)} FROM players")
+        self._rows = {}
+        self._all, self._ranked, self._active = [], [], []
+        self._placement = 0
+        self.version += 1
+        for row in rows:
+            row = tuple(row)
+            self._rows[row[0]] = row
+            for keys, key in self._keys(row):
+                keys.append(key)
+            self._placement += self._is_placement(row)
+        self._all.sort()
+        self._ranked.sort()
+        self._active.sort()
+        return len(rows)
+
+    async def refresh(self, player_ids):
+        """Re-read the given players after their rows were written"""
+        player_ids = list(dict.fromkeys(str(player_id)
+                                        for player_id in player_ids))
+        rows = []
+        for start in range(0, len(player_ids), ID_CHUNK):
+            chunk = player_ids[start:start + ID_CHUNK]
+            rows += await self.db.fetchall(
+                f"SELECT {', '.join(INDEX_COLUMNS)} FROM players WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk)
+        found = set()
+        for row in rows:
+            self.put(row)
+            found.add(row[0])
+        for player_id in player_ids:
+            if player_id not in found:
+                self.discard(player_id)
+
+    def counts(self):
+        """(active players, ranked players, players in placement)"""
+        return len(self._active), len(self._ranked), self._placement
+
+    def ranked_position(self, mmr):
+        """1-based position of an MMR among placed players"""
+        return bisect_left(self._ranked, (-mmr, )) + 1
+
+    def position(self, mmr):
+        """1-based position of an MMR among all players"""
+        return bisect_left(self._all, (-mmr, )) + 1
+
+    def page(self, page, per_page, ranked_only=True):
+        """One leaderboard page, shaped like Database.page_leaderboard"""
+        offset = (page - 1) * per_page
+        return self._page_rows(offset, offset + per_page, ranked_only)
+
+    def sort_key(self, row, ranked_only=True):
+        """Leaderboard sort key of a page row"""
+        if ranked_only:
+            return (-row[2], row[0])
+        return (0 if row[6] == 1 else 1, -row[2], row[0])
+
+    def page_after(self, key, per_page, ranked_only=True):
+        """The per_page rows following sort key (keyset pagination)"""
+        keys = self._ranked if ranked_only else self._active
+        start = bisect_right(keys, key)
+        return self._page_rows(start, start + per_page, ranked_only)
+
+    def page_before(self, key, per_page, ranked_only=True):
+        """The per_page rows preceding sort key (keyset pagination)"""
+        keys = self._ranked if ranked_only else self._active
+        end = bisect_left(keys, key)
+        return self._page_rows(max(0, end - per_page), end, ranked_only)
+
+    def _page_rows(self, start, end, ranked_only):
+        if ranked_only:
+            return [
+                self._rows[key[-1]][:5] for key in self._ranked[start:end]
+            ]
+        return [self._rows[key[-1]] for key in self._active[start:end]]
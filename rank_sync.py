@@ -0,0 +1,113 @@
+"""
+HeatSeeker rank sync - Incremental rank role updates
+
+Remembers which rank role was last applied to each player in each guild
+(the rank_assignments table). A player whose MMR changes is marked dirty
+only when their rank moved away from the applied one, and the background
+sync drains just those players, so its cost follows the number of changes
+instead of the number of players.
+"""
+
+# Rows per "id IN (...)" query (stays under SQLite's variable limit)
+ID_CHUNK = 500
+
+
+class RankSync:
+    """Applied rank role per (guild, player) plus the dirty players
+
+    rank_for_mmr(mmr) returns the rank role name a player should hold.
+    Guild and player ids are strings.
+    """
+
+    def __init__(self, db, rank_for_mmr):
+        self.db = db
+        self.rank_for_mmr = rank_for_mmr
+        self._applied = {}  # player id -> {guild id: role name}
+        self._dirty = set()
+        self._full = False  # re-check every player on the next drain
+
+    def __len__(self):
+        return len(self._dirty)
+
+    @property
+    def pending(self):
+        return self._full or bool(self._dirty)
+
+    async def load(self):
+        """Read every applied rank in one query"""
+        rows = await self.db.fetchall(
+            "SELECT guild_id, player_id, role_name FROM rank_assignments")
+        self._applied = {}
+        for guild_id, player_id, role_name in rows:
+            self._applied.setdefault(player_id, {})[guild_id] = role_name
+        return len(rows)
+
+    def applied(self, guild_id, player_id):
+        """Rank role name last applied to a player in a guild, or None"""
+        return self._applied.get(player_id, {}).get(guild_id)
+
+    def record(self, guild_id, player_id, role_name):
+        """Remember (and persist) the rank role a player now holds"""
+        guild_roles = self._applied.setdefault(player_id, {})
+        if guild_roles.get(guild_id) == role_name:
+            return
+        guild_roles[guild_id] = role_name
+
+        def _record(conn, cursor):
+            cursor.execute(
+                "INSERT OR REPLACE INTO rank_assignments (guild_id, player_id, role_name) VALUES (?, ?, ?)",
+                (guild_id, player_id, role_name))
+            conn.commit()
+
+        self.db.submit(_record)
+
+    def forget_guild(self, guild_id):
+        """Drop a guild's applied ranks (after its rank roles were wiped)"""
+        for guild_roles in self._applied.values():
+            guild_roles.pop(guild_id, None)
+
+        def _forget(conn, cursor):
+            cursor.execute("DELETE FROM rank_assignments WHERE guild_id = ?",
+                           (guild_id, ))
+            conn.commit()
+
+        self.db.submit(_forget)
+
+    def needs_update(self, guild_id, player_id, mmr):
+        return self.applied(guild_id, player_id) != self.rank_for_mmr(mmr)
+
+    def mark(self, player_id, mmr):
+        """Mark a player dirty if mmr puts them outside an applied rank;
+        returns True when they were marked"""
+        target = self.rank_for_mmr(mmr)
+        guild_roles = self._applied.get(player_id)
+        if guild_roles and all(role == target
+                               for role in guild_roles.values()):
+            return False
+        self._dirty.add(player_id)
+        return True
+
+    def mark_all(self):
+        """Re-check every placed player on the next drain (bulk edits)"""
+        self._full = True
+
+    async def take(self):
+        """Return [(player_id, mmr)] to re-check and clear the dirty set
+
+        Only placed players are returned; players still in placement hold
+        no rank role.
+        """
+        full, dirty = self._full, self._dirty
+        self._full, self._dirty = False, set()
+        if full:
+            return await self.db.fetchall(
+                "SELECT id, mmr FROM players WHERE (wins > 0 OR losses > 0) AND is_placed = 1")
+
+        player_ids = list(dirty)
+        rows = []
+        for start in range(0, len(player_ids), ID_CHUNK):
+            chunk = player_ids[start:start + ID_CHUNK]
+            rows += await self.db.fetchall(
+                f"SELECT id, mmr FROM players WHERE id IN ({', '.join('?' * len(chunk))}) AND is_placed = 1",
+                chunk)
+        return rows
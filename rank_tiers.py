@@ -0,0 +1,84 @@
+"""
+HeatSeeker rank tiers - Compiled MMR -> rank lookup
+
+get_rank_from_mmr used to walk every rank with range checks, and it runs
+for every row of a leaderboard, every player of a rank sync and every DM.
+RankTable compiles the tiers once into a sorted array of lower bounds, so a
+lookup is one bisect. The tiers can also come from a JSON file (same shape
+as RANK_ROLES in main.py), so ranks can be added without code changes.
+"""
+
+import json
+import os
+from bisect import bisect_right
+
+# Keys every tier needs
+TIER_FIELDS = ('role_name', 'min_mmr', 'max_mmr', 'name', 'emoji', 'color')
+
+
+def load_rank_tiers(path, default):
+    """The tiers in the JSON file at path, or default if there is none
+
+    The file maps a tier key to a dict with TIER_FIELDS; colors may be
+    given as "0xRRGGBB" strings. Raises ValueError for a malformed file.
+    """
+    if not path or not os.path.exists(path):
+        return default
+    with open(path, encoding='utf-8') as tier_file:
+        tiers = json.load(tier_file)
+    if not isinstance(tiers, dict) or not tiers:
+        raise ValueError(f"{path}: expected a non-empty object of tiers")
+    for key, tier in tiers.items():
+        missing = [field for field in TIER_FIELDS if field not in tier]
+        if missing:
+            raise ValueError(f"{path}: tier {key} is missing {missing}")
+        if isinstance(tier['color'], str):
+            tier['color'] = int(tier['color'], 16)
+    RankTable(tiers.values())  # validates the ranges
+    return tiers
+
+
+class RankTable:
+    """Tiers sorted by min_mmr, looked up with bisect
+
+    MMRs outside every tier (below the lowest, or in a gap) get fallback.
+    Overlapping tiers are rejected, since a lookup could not pick one.
+    """
+
+    def __init__(self, tiers, fallback=None):
+        self.tiers = sorted(tiers, key=lambda tier: tier['min_mmr'])
+        self.fallback = fallback
+        self._mins = [tier['min_mmr'] for tier in self.tiers]
+        self._maxes = [tier['max_mmr'] for tier in self.tiers]
+        for lower, upper in zip(self.tiers, self.tiers[1:]):
+            if upper['min_mmr'] <= lower['max_mmr']:
+                raise ValueError(
+                    f"Rank tiers {lower['role_name']} and {upper['role_name']} overlap"
+                )
+
+    def __len__(self):
+        return len(self.tiers)
+
+    def lookup(self, mmr):
+        """The tier containing mmr, or fallback"""
+        index = bisect_right(self._mins, mmr) - 1
+        if index >= 0 and mmr <= self._maxes[index]:
+            return self.tiers[index]
+        return self.fallback
+
+    def lookup_many(self, mmrs):
+        """lookup() for a sequence of MMRs, as a list in the same order"""
+        mins, maxes, tiers = self._mins, self._maxes, self.tiers
+        fallback = self.fallback
+        results = []
+        append = results.append
+        for mmr in mmrs:
+            index = bisect_right(mins, mmr) - 1
+            append(tiers[index] if index >= 0 and mmr <= maxes[index] else
+                   fallback)
+        return results
+
+    def next_tier(self, mmr):
+        """The lowest tier starting above mmr, or None at the top"""
+        index = bisect_right(self._mins, mmr)
+        return self.tiers[index] if index < len(self.tiers) else None
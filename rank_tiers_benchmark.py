@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Rank Tiers Benchmark - Linear tier scan vs the compiled bisect table
+
+Times the previous get_rank_from_mmr loop against RankTable.lookup and
+RankTable.lookup_many over the MMR counts a rank sync or leaderboard sweep
+goes through (checking all three agree), for the bot's six tiers and for a
+larger tier table.
+
+Usage: python rank_tiers_benchmark.py [mmrs] [tiers file]
+"""
+
+import random
+import sys
+import time
+
+from rank_tiers import RankTable, load_rank_tiers
+
+# Bounds of the bot's default tiers (RANK_ROLES in main.py)
+DEFAULT_BOUNDS = ((800, 949), (950, 1099), (1100, 1249), (1250, 1449),
+                  (1450, 1699), (1700, 9999))
+
+FALLBACK = {'role_name': 'UNRANKED', 'min_mmr': 0, 'max_mmr': 799}
+
+
+def make_tiers(bounds):
+    return {
+        f"TIER{index}": {
+            'role_name': f"TIER {index}",
+            'min_mmr': low,
+            'max_mmr': high
+        }
+        for index, (low, high) in enumerate(bounds)
+    }
+
+
+def linear_rank(tiers, mmr):
+    """The previous get_rank_from_mmr scan, kept for comparison"""
+    for rank_key, rank_data in tiers.items():
+        if rank_data['min_mmr'] <= mmr <= rank_data['max_mmr']:
+            return rank_data
+    return FALLBACK
+
+
+def time_call(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(label, tiers, mmrs):
+    table = RankTable(tiers.values(), FALLBACK)
+    linear_ms, linear = time_call(
+        lambda: [linear_rank(tiers, mmr) for mmr in mmrs])
+    lookup_ms, looked_up = time_call(
+        lambda: [table.lookup(mmr) for mmr in mmrs])
+    batch_ms, batch = time_call(lambda: table.lookup_many(mmrs))
+    same = linear == looked_up == batch
+    print(f"{label:<22} {linear_ms:>10.2f} {lookup_ms:>10.2f} "
+          f"{batch_ms:>10.2f} {linear_ms / batch_ms:>8.1f}x "
+          f"{'✅' if same else '❌':>5}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(7)
+    mmrs = [rng.randint(500, 2500) for _ in range(count)]
+
+    print(f"🎖️ RANK TIER LOOKUP ({count:,} MMRs, best of 3, ms)")
+    print("=" * 70)
+    print(f"{'Tiers':<22} {'Linear':>10} {'Bisect':>10} {'Batch':>10} "
+          f"{'Speedup':>9} {'Same':>5}")
+
+    run("default (6)", make_tiers(DEFAULT_BOUNDS), mmrs)
+    run("fine-grained (40)",
+        make_tiers([(800 + 50 * i, 849 + 50 * i) for i in range(40)]), mmrs)
+    if len(sys.argv) > 2:
+        run(sys.argv[2][:22], load_rank_tiers(sys.argv[2], None), mmrs)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ Reset Players Script - Resets all player MMR, wins, and losses to starting value
 import sqlite3
 import logging
 
+from migrations import run_migrations
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,6 +28,7 @@ def reset_all_players():
     try:
         # Connect to database
         conn = sqlite3.connect('players.db')
+        run_migrations(conn)
         c = conn.cursor()
         
         # Get current player count
@@ -95,6 +98,7 @@ def reset_matches():
     try:
         # Connect to database
         conn = sqlite3.connect('players.db')
+        run_migrations(conn)
         c = conn.cursor()
         
         # Get current match count
@@ -107,6 +111,7 @@ def reset_matches():
         if match_count > 0:
             print("🗑️ CLEARING ALL MATCHES...")
             c.execute("DELETE FROM matches")
+            c.execute("DELETE FROM match_participants")
             conn.commit()
             
             # Reset match counter
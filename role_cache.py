@@ -0,0 +1,48 @@
+"""
+HeatSeeker role cache - O(1) rank role lookups per guild
+
+Resolving a rank role with discord.utils.get(guild.roles, name=...) scans
+every role of the guild, and rank updates did that several times per rank
+per player. RoleCache maps each tracked role name to its role id once per
+guild; role create/update/delete events invalidate the guild's entry so the
+next lookup rebuilds it.
+"""
+
+
+class RoleCache:
+    """role name -> role id per guild, for a fixed set of role names"""
+
+    def __init__(self, names):
+        self.names = frozenset(names)
+        self._guilds = {}  # guild id -> {role name: role id}
+
+    def __len__(self):
+        return len(self._guilds)
+
+    def role_ids(self, guild):
+        """The guild's {role name: role id}, built with one pass over its
+        roles (the lowest role wins on duplicate names, like utils.get)"""
+        role_ids = self._guilds.get(guild.id)
+        if role_ids is None:
+            role_ids = {}
+            for role in guild.roles:
+                if role.name in self.names:
+                    role_ids.setdefault(role.name, role.id)
+            self._guilds[guild.id] = role_ids
+        return role_ids
+
+    def get(self, guild, name):
+        """The guild's role called name, or None"""
+        role_id = self.role_ids(guild).get(name)
+        return guild.get_role(role_id) if role_id else None
+
+    def member_roles(self, guild, member):
+        """The tracked roles a member has"""
+        return [
+            role for role in map(member.get_role,
+                                 self.role_ids(guild).values()) if role
+        ]
+
+    def invalidate(self, guild_id):
+        """Forget a guild's roles; the next lookup rebuilds them"""
+        self._guilds.pop(guild_id, None)
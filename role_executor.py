@@ -0,0 +1,158 @@
+"""
+HeatSeeker role executor - Bulk role changes with bounded concurrency
+
+Rank syncs and season resets touch every member of a guild. Each member's
+change (roles to add and roles to remove) is applied with one
+member.edit(roles=...) instead of separate remove_roles/add_roles calls,
+members that already hold the right roles cost no call at all, and a small
+pool of workers keeps a few edits in flight. discord.py queues requests per
+rate-limit bucket itself; the pool stays small so the guild's member bucket
+is not flooded, and a 429 that still comes back is retried after the delay
+Discord asked for.
+"""
+
+import asyncio
+import logging
+import time
+
+import discord
+
+logger = logging.getLogger('HeatSeeker')
+
+# Member edits in flight at once
+DEFAULT_CONCURRENCY = 4
+
+# Minimum seconds between two progress reports
+PROGRESS_INTERVAL = 2.0
+
+# Tries per member when Discord answers 429
+MAX_ATTEMPTS = 3
+
+
+def planned_roles(member, add=(), remove=()):
+    """The member's role list after the change, or None if it is a no-op"""
+    remove_ids = {role.id for role in remove}
+    current = member.roles[1:]  # without @everyone
+    roles = [role for role in current if role.id not in remove_ids]
+    held = {role.id for role in roles}
+    for role in add:
+        if role.id not in held:
+            roles.append(role)
+            held.add(role.id)
+    if held == {role.id for role in current}:
+        return None
+    return roles
+
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retrying a rate-limited edit"""
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None and getattr(error, 'response', None) is not None:
+        try:
+            retry_after = float(error.response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            retry_after = None
+    return retry_after if retry_after is not None else 2**attempt
+
+
+class RoleExecutor:
+    """Apply (member, roles to add, roles to remove) changes in bulk"""
+
+    def __init__(self,
+                 concurrency=DEFAULT_CONCURRENCY,
+                 progress_interval=PROGRESS_INTERVAL,
+                 clock=time.monotonic):
+        self.concurrency = concurrency
+        self.progress_interval = progress_interval
+        self.clock = clock
+
+    async def run(self, changes, reason=None, progress=None):
+        """Apply the changes and return their stats dict
+
+        Stats hold total, done, changed, skipped (already correct), failed
+        ([(member, error)]), applied (members edited or already correct),
+        elapsed seconds and rate (members per second). progress(stats) is
+        awaited at the start, at most every progress_interval seconds while
+        edits run, and once at the end.
+        """
+        start = self.clock()
+        stats = {
+            'total': 0,
+            'done': 0,
+            'changed': 0,
+            'skipped': 0,
+            'failed': [],
+            'applied': [],
+            'elapsed': 0.0,
+            'rate': 0.0
+        }
+        pending = []
+        for member, add, remove in changes:
+            stats['total'] += 1
+            roles = planned_roles(member, add, remove)
+            if roles is None:
+                stats['skipped'] += 1
+                stats['done'] += 1
+                stats['applied'].append(member)
+            else:
+                pending.append((member, roles))
+
+        if progress:
+            await self._report(progress, stats)
+        last_report = start
+        work = iter(pending)  # shared by the workers
+
+        async def worker():
+            nonlocal last_report
+            for member, roles in work:
+                try:
+                    await self._edit(member, roles, reason)
+                    stats['changed'] += 1
+                    stats['applied'].append(member)
+                except Exception as e:
+                    stats['failed'].append((member, e))
+                    logger.error(
+                        f"ROLE EXECUTOR: Could not update roles of {member.display_name}: {e}"
+                    )
+                stats['done'] += 1
+                if progress and self.clock(
+                ) - last_report >= self.progress_interval:
+                    last_report = self.clock()
+                    self._measure(stats, start)
+                    await self._report(progress, stats)
+
+        await asyncio.gather(*(worker() for _ in range(
+            min(self.concurrency, len(pending)))))
+
+        self._measure(stats, start)
+        if progress:
+            await self._report(progress, stats)
+        logger.info(
+            f"ROLE EXECUTOR: {stats['changed']} members updated, {stats['skipped']} already correct, {len(stats['failed'])} failed in {stats['elapsed']:.1f}s ({stats['rate']:.1f}/s)"
+        )
+        return stats
+
+    async def _edit(self, member, roles, reason):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                await member.edit(roles=roles, reason=reason)
+                return
+            except (discord.RateLimited, discord.HTTPException) as e:
+                if getattr(e, 'status', 429) != 429 or attempt == MAX_ATTEMPTS:
+                    raise
+                delay = retry_delay(e, attempt)
+                logger.warning(
+                    f"ROLE EXECUTOR: Rate limited editing {member.display_name}, retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def _measure(self, stats, start):
+        stats['elapsed'] = self.clock() - start
+        stats['rate'] = (stats['done'] / stats['elapsed']
+                         if stats['elapsed'] > 0 else 0.0)
+
+    async def _report(self, progress, stats):
+        try:
+            await progress(stats)
+        except Exception as e:
+            logger.warning(f"ROLE EXECUTOR: Progress report failed: {e}")
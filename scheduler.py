@@ -0,0 +1,119 @@
+"""
+HeatSeeker scheduler - Deadline timers driven by one asyncio task
+
+Timers live in a heap of (deadline, sequence, key); a single task sleeps
+until the earliest deadline, so nothing wakes up while no timer is due and
+an idle bot costs no wakeups at all. Rescheduling a key pushes a new heap
+entry in O(log n) and the old entry is skipped when it surfaces.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+
+logger = logging.getLogger('HeatSeeker')
+
+
+class DeadlineScheduler:
+    """Run a coroutine function per key at its deadline (clock time)"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._heap = []  # (deadline, sequence, key), may hold stale entries
+        self._timers = {}  # key -> (deadline, sequence, coroutine function)
+        self._sequence = 0
+        self._task = None
+        self._wakeup = None  # asyncio.Event set when an earlier timer lands
+        self._firing = set()  # running callbacks (the loop only keeps weak refs)
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def deadline_of(self, key):
+        """Deadline of a key's timer, or None"""
+        timer = self._timers.get(key)
+        return timer[0] if timer else None
+
+    def schedule(self, key, deadline, callback):
+        """Run callback() at deadline, replacing any timer for key"""
+        self._sequence += 1
+        self._timers[key] = (deadline, self._sequence, callback)
+        heapq.heappush(self._heap, (deadline, self._sequence, key))
+        if len(self._heap) > 2 * len(self._timers) + 64:
+            self._compact()
+        self._wake()
+
+    def schedule_in(self, key, delay, callback):
+        """schedule() delay seconds from now"""
+        self.schedule(key, self.clock() + delay, callback)
+
+    def cancel(self, key):
+        """Drop a key's timer; returns True if one was pending"""
+        return self._timers.pop(key, None) is not None
+
+    def _compact(self):
+        """Rebuild the heap from the live timers only"""
+        self._heap = [(deadline, sequence, key)
+                      for key, (deadline, sequence, _) in self._timers.items()]
+        heapq.heapify(self._heap)
+
+    def _wake(self):
+        """Start the runner, or make it recheck its next deadline"""
+        if self._task is None or self._task.done():
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # started by the first schedule() inside the loop
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        else:
+            self._wakeup.set()
+
+    def _pop_due(self, now):
+        """Remove and return the callbacks whose deadline has passed"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, sequence, key = heapq.heappop(self._heap)
+            timer = self._timers.get(key)
+            if timer is not None and timer[1] == sequence:
+                del self._timers[key]
+                due.append((key, timer[2]))
+        return due
+
+    def _next_deadline(self):
+        """Earliest live deadline (dropping stale heap entries), or None"""
+        while self._heap:
+            deadline, sequence, key = self._heap[0]
+            timer = self._timers.get(key)
+            if timer is not None and timer[1] == sequence:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            for key, callback in self._pop_due(self.clock()):
+                task = loop.create_task(self._fire(key, callback))
+                self._firing.add(task)
+                task.add_done_callback(self._firing.discard)
+
+            deadline = self._next_deadline()
+            if deadline is None:
+                return  # no timers: the next schedule() restarts the task
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(),
+                                       max(0, deadline - self.clock()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, key, callback):
+        try:
+            await callback()
+        except Exception as e:
+            logger.error(f"SCHEDULER: Timer {key} failed: {e}")
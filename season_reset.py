@@ -8,6 +8,8 @@ import sqlite3
 import logging
 from datetime import datetime
 
+from migrations import run_migrations
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +31,7 @@ def reset_new_season():
     try:
         # الاتصال بقاعدة البيانات
         conn = sqlite3.connect('players.db')
+        run_migrations(conn)
         c = conn.cursor()
         
         # الحصول على إحصائيات قبل الإعادة
@@ -66,6 +69,7 @@ def reset_new_season():
         print("-" * 40)
         
         c.execute("DELETE FROM matches")
+        c.execute("DELETE FROM match_participants")
         
         # إعادة تعيين عداد المباريات
         c.execute("DELETE FROM sqlite_sequence WHERE name = 'matches'")
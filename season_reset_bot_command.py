@@ -79,6 +79,7 @@ async def reset_season(interaction: discord.Interaction):
                     
                     # حذف المباريات
                     c.execute("DELETE FROM matches")
+                    c.execute("DELETE FROM match_participants")
                     c.execute("DELETE FROM sqlite_sequence WHERE name = 'matches'")
                     
                     # تنظيف الدردشات
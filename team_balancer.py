@@ -0,0 +1,299 @@
+"""
+HeatSeeker team balancer - Optimal MMR split for any lobby size
+
+Lobbies up to EXACT_LIMIT players are split exactly with a meet-in-the-middle
+search over subset sums (with the mirror-image split skipped). Larger lobbies
+fall back to a greedy split refined by bounded pairwise swaps.
+
+optimize_teams balances several objectives at once (MMR totals, MMR spread,
+placement players, recent teammates) under a fixed time budget.
+"""
+
+import math
+import random
+import time
+from bisect import bisect_left
+from itertools import combinations
+
+# Largest lobby solved exactly (2^(n/2) subsets per half)
+EXACT_LIMIT = 26
+
+# Swap passes for the heuristic fallback
+MAX_SWAP_PASSES = 20
+
+
+def team_sums(team1, team2, key='mmr'):
+    """Return (team1 total, team2 total)"""
+    return sum(p[key] for p in team1), sum(p[key] for p in team2)
+
+
+def _half_subsets(values):
+    """Every subset of values as (size, total, bitmask)"""
+    subsets = [(0, 0, 0)]
+    for index, value in enumerate(values):
+        bit = 1 << index
+        subsets += [(size + 1, total + value, mask | bit)
+                    for size, total, mask in subsets]
+    return subsets
+
+
+def _exact_split(values, team_size):
+    """Indexes of the team_size values whose total is closest to half"""
+    total = sum(values)
+    count = len(values)
+
+    # Symmetry breaking: with equal team sizes every split appears twice,
+    # so pin the first player to team 1 and search the rest
+    if count == 2 * team_size:
+        fixed, rest, need = [0], list(range(1, count)), team_size - 1
+    else:
+        fixed, rest, need = [], list(range(count)), team_size
+    fixed_sum = sum(values[i] for i in fixed)
+
+    left = rest[:len(rest) // 2]
+    right = rest[len(rest) // 2:]
+
+    # Right-half subset sums grouped by size, sorted for bisection
+    right_by_size = {}
+    for size, subtotal, mask in _half_subsets([values[i] for i in right]):
+        right_by_size.setdefault(size, []).append((subtotal, mask))
+    for entries in right_by_size.values():
+        entries.sort()
+    right_sums = {
+        size: [subtotal for subtotal, _ in entries]
+        for size, entries in right_by_size.items()
+    }
+
+    best = None
+    for size, subtotal, left_mask in _half_subsets([values[i]
+                                                    for i in left]):
+        right_size = need - size
+        if right_size not in right_by_size:
+            continue
+        sums = right_sums[right_size]
+        # Team 1 total closest to total / 2
+        target = total / 2 - fixed_sum - subtotal
+        position = bisect_left(sums, target)
+        for candidate in (position - 1, position):
+            if 0 <= candidate < len(sums):
+                team_total = fixed_sum + subtotal + sums[candidate]
+                diff = abs(total - 2 * team_total)
+                if best is None or diff < best[0]:
+                    best = (diff, left_mask,
+                            right_by_size[right_size][candidate][1])
+        if best and best[0] == total % 2:
+            break  # cannot do better than a perfect split
+
+    _, left_mask, right_mask = best
+    chosen = set(fixed)
+    chosen.update(i for bit, i in enumerate(left) if left_mask >> bit & 1)
+    chosen.update(i for bit, i in enumerate(right) if right_mask >> bit & 1)
+    return chosen
+
+
+def _heuristic_split(values, team_size):
+    """Greedy split refined by best-improvement pairwise swaps"""
+    order = sorted(range(len(values)), key=lambda i: values[i], reverse=True)
+    team1, team2 = [], []
+    sum1 = sum2 = 0
+    other_size = len(values) - team_size
+    for i in order:
+        if len(team2) >= other_size or (len(team1) < team_size
+                                        and sum1 <= sum2):
+            team1.append(i)
+            sum1 += values[i]
+        else:
+            team2.append(i)
+            sum2 += values[i]
+
+    for _ in range(MAX_SWAP_PASSES):
+        diff = sum1 - sum2
+        best = (abs(diff), None, None)
+        for a, i in enumerate(team1):
+            for b, j in enumerate(team2):
+                swapped = abs(diff - 2 * (values[i] - values[j]))
+                if swapped < best[0]:
+                    best = (swapped, a, b)
+        if best[1] is None:
+            break
+        _, a, b = best
+        i, j = team1[a], team2[b]
+        team1[a], team2[b] = j, i
+        sum1 += values[j] - values[i]
+        sum2 += values[i] - values[j]
+    return set(team1)
+
+
+def balance_teams(players, key='mmr'):
+    """Split players into two teams with the closest possible MMR totals
+
+    Team 1 gets len(players) // 2 players. Both teams keep the players in
+    descending MMR order. Exact up to EXACT_LIMIT players, heuristic above.
+    """
+    sorted_players = sorted(players, key=lambda p: p[key], reverse=True)
+    if not sorted_players:
+        return [], []
+    team_size = len(sorted_players) // 2
+    values = [p[key] for p in sorted_players]
+
+    if len(values) <= EXACT_LIMIT:
+        chosen = _exact_split(values, team_size)
+    else:
+        chosen = _heuristic_split(values, team_size)
+
+    team1 = [p for i, p in enumerate(sorted_players) if i in chosen]
+    team2 = [p for i, p in enumerate(sorted_players) if i not in chosen]
+    return team1, team2
+
+
+# Multi-objective balancing
+#
+# A cost function takes (team1, team2, context) and returns a non-negative
+# number; an objective is a sequence of (weight, cost function) pairs.
+# context is a dict of extra inputs, e.g. {'recent_teammates': {pair: count}}.
+
+
+def sum_diff_cost(team1, team2, context):
+    """Absolute difference of the team MMR totals"""
+    team1_mmr, team2_mmr = team_sums(team1, team2)
+    return abs(team1_mmr - team2_mmr)
+
+
+def _spread(team):
+    if not team:
+        return 0
+    mean = sum(p['mmr'] for p in team) / len(team)
+    return (sum((p['mmr'] - mean)**2 for p in team) / len(team))**0.5
+
+
+def spread_diff_cost(team1, team2, context):
+    """Difference of the teams' MMR standard deviations (one smurf + one
+    beginner vs two average players)"""
+    return abs(_spread(team1) - _spread(team2))
+
+
+def placement_cost(team1, team2, context):
+    """Difference in the number of placement players per team"""
+    return abs(
+        sum(1 for p in team1 if p.get('is_placement')) -
+        sum(1 for p in team2 if p.get('is_placement')))
+
+
+def teammate_repeat_cost(team1, team2, context):
+    """Times each same-team pair already played together recently"""
+    recent = context.get('recent_teammates')
+    if not recent:
+        return 0
+    cost = 0
+    for team in (team1, team2):
+        for a in range(len(team)):
+            for b in range(a + 1, len(team)):
+                cost += recent.get(frozenset((team[a]['id'], team[b]['id'])),
+                                   0)
+    return cost
+
+
+DEFAULT_OBJECTIVE = (
+    (1.0, sum_diff_cost),
+    (0.5, spread_diff_cost),
+    (40.0, placement_cost),
+    (25.0, teammate_repeat_cost),
+)
+
+# Lobbies with at most this many distinct splits are searched exhaustively
+EXHAUSTIVE_SPLITS = 500
+
+# Default search budget in seconds
+DEFAULT_TIME_BUDGET = 0.05
+
+
+def evaluate_teams(team1, team2, objective=DEFAULT_OBJECTIVE, context=None):
+    """Weighted total cost of a split"""
+    context = context or {}
+    return sum(weight * cost(team1, team2, context)
+               for weight, cost in objective)
+
+
+def _random_swap(team1, team2, rng):
+    a = rng.randrange(len(team1))
+    b = rng.randrange(len(team2))
+    return (team1[:a] + [team2[b]] + team1[a + 1:],
+            team2[:b] + [team1[a]] + team2[b + 1:])
+
+
+def _initial_temperature(state, objective, context, rng, samples=20):
+    """Mean cost change of a few random swaps, so early moves are accepted"""
+    cost, team1, team2 = state
+    changes = [
+        abs(evaluate_teams(*_random_swap(team1, team2, rng), objective,
+                           context) - cost) for _ in range(samples)
+    ]
+    return max(1.0, sum(changes) / samples)
+
+
+def _split_count(count, team_size):
+    splits = math.comb(count, team_size)
+    return splits // 2 if count == 2 * team_size else splits
+
+
+def optimize_teams(players,
+                   objective=DEFAULT_OBJECTIVE,
+                   context=None,
+                   time_budget=DEFAULT_TIME_BUDGET,
+                   seed=None):
+    """Split players minimizing a weighted objective within time_budget
+
+    Starts from the exact MMR-sum split, then searches every split for small
+    lobbies or runs simulated annealing over player swaps for larger ones.
+    Always returns by the deadline with the best split seen.
+    """
+    context = context or {}
+    deadline = time.perf_counter() + time_budget
+    team1, team2 = balance_teams(players)
+    best = (evaluate_teams(team1, team2, objective, context), team1, team2)
+    if len(players) < 3:
+        return team1, team2
+
+    sorted_players = team1 + team2
+    count = len(sorted_players)
+    team_size = count // 2
+
+    if _split_count(count, team_size) <= EXHAUSTIVE_SPLITS:
+        # Pin the first player when sizes are equal (mirror splits)
+        first, rest = ((sorted_players[0], ), sorted_players[1:]) if (
+            count == 2 * team_size) else ((), sorted_players)
+        for checked, combo in enumerate(
+                combinations(range(len(rest)), team_size - len(first))):
+            if checked % 64 == 0 and time.perf_counter() > deadline:
+                break
+            chosen = set(combo)
+            candidate1 = list(first) + [rest[i] for i in combo]
+            candidate2 = [p for i, p in enumerate(rest) if i not in chosen]
+            cost = evaluate_teams(candidate1, candidate2, objective, context)
+            if cost < best[0]:
+                best = (cost, candidate1, candidate2)
+    else:
+        rng = random.Random(seed)
+        current = best
+        start_temperature = _initial_temperature(best, objective, context, rng)
+        iteration = 0
+        while True:
+            if iteration % 16 == 0:
+                now = time.perf_counter()
+                if now > deadline:
+                    break
+                temperature = max(
+                    start_temperature * (deadline - now) / time_budget, 1e-6)
+            iteration += 1
+            candidate1, candidate2 = _random_swap(current[1], current[2],
+                                                  rng)
+            cost = evaluate_teams(candidate1, candidate2, objective, context)
+            delta = cost - current[0]
+            if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+                current = (cost, candidate1, candidate2)
+                if cost < best[0]:
+                    best = current
+
+    _, team1, team2 = best
+    return (sorted(team1, key=lambda p: p['mmr'], reverse=True),
+            sorted(team2, key=lambda p: p['mmr'], reverse=True))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Team Balancer Benchmark - Latency of the exact balancer for lobby sizes 2-20
+
+Compares team_balancer.balance_teams with the old itertools.combinations
+brute force (checking both find the same MMR difference), times the
+heuristic fallback on lobbies too large to solve exactly, and shows the
+multi-objective search staying within its time budget.
+"""
+
+import random
+import time
+from itertools import combinations
+
+from team_balancer import (DEFAULT_TIME_BUDGET, EXACT_LIMIT, balance_teams,
+                           evaluate_teams, optimize_teams, team_sums)
+
+
+def brute_force_teams(players):
+    """The previous create_balanced_teams search, kept for comparison"""
+    sorted_players = sorted(players, key=lambda x: x['mmr'], reverse=True)
+    best_diff = float('inf')
+    best_teams = None
+    for team1_combo in combinations(sorted_players, len(players) // 2):
+        team1 = list(team1_combo)
+        team2 = [p for p in sorted_players if p not in team1]
+        diff = abs(
+            sum(p['mmr'] for p in team1) - sum(p['mmr'] for p in team2))
+        if diff < best_diff:
+            best_diff = diff
+            best_teams = (team1, team2)
+    return best_teams
+
+
+def make_lobby(size, rng):
+    return [{
+        'id': str(i),
+        'username': f"Player{i}",
+        'mmr': rng.randint(800, 1800)
+    } for i in range(size)]
+
+
+def time_call(func, players, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(players)
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    rng = random.Random(7)
+
+    print("⚖️ EXACT BALANCER VS BRUTE FORCE")
+    print("=" * 66)
+    print(f"{'Players':>7} {'Brute (ms)':>12} {'Exact (ms)':>12} "
+          f"{'Speedup':>9} {'Diff':>6} {'Match':>6}")
+    for size in range(2, 21, 2):
+        players = make_lobby(size, rng)
+        repeat = 1 if size >= 18 else 5
+        brute_ms, brute = time_call(brute_force_teams, players, repeat)
+        exact_ms, exact = time_call(balance_teams, players, 20)
+        brute_diff = abs(team_sums(*brute)[0] - team_sums(*brute)[1])
+        exact_diff = abs(team_sums(*exact)[0] - team_sums(*exact)[1])
+        speedup = brute_ms / exact_ms if exact_ms else float('inf')
+        print(f"{size:>7} {brute_ms:>12.3f} {exact_ms:>12.3f} "
+              f"{speedup:>8.1f}x {exact_diff:>6} "
+              f"{'✅' if exact_diff == brute_diff else '❌':>5}")
+
+    print()
+    print(f"🔀 HEURISTIC FALLBACK (above {EXACT_LIMIT} players)")
+    print("=" * 66)
+    for size in (30, 50, 100):
+        players = make_lobby(size, rng)
+        heuristic_ms, teams = time_call(balance_teams, players, 5)
+        team1_mmr, team2_mmr = team_sums(*teams)
+        print(f"{size:>7} players: {heuristic_ms:>8.3f} ms, "
+              f"MMR difference {abs(team1_mmr - team2_mmr)}")
+
+    print()
+    print(f"🎯 MULTI-OBJECTIVE SEARCH "
+          f"(budget {DEFAULT_TIME_BUDGET * 1000:.0f} ms)")
+    print("=" * 66)
+    for size in (4, 10, 16, 20, 40):
+        players = make_lobby(size, rng)
+        for player in players:
+            player['is_placement'] = rng.random() < 0.3
+        context = {
+            'recent_teammates': {
+                frozenset((players[0]['id'], players[1]['id'])): 3
+            }
+        }
+        start = time.perf_counter()
+        teams = optimize_teams(players, context=context, seed=1)
+        elapsed = (time.perf_counter() - start) * 1000
+        before = evaluate_teams(*balance_teams(players), context=context)
+        after = evaluate_teams(*teams, context=context)
+        print(f"{size:>7} players: {elapsed:>8.3f} ms, "
+              f"cost {before:.1f} -> {after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
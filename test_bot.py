@@ -6,17 +6,13 @@ Test Discord Bot - Run this to test the bot functionality locally
 import sqlite3
 import os
 
+from migrations import run_migrations
+
 # Create and setup database
 def setup_database():
     conn = sqlite3.connect("players.db")
     c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS players (
-        id TEXT PRIMARY KEY,
-        username TEXT,
-        mmr INTEGER DEFAULT 1000,
-        wins INTEGER DEFAULT 0,
-        losses INTEGER DEFAULT 0
-    )''')
+    run_migrations(conn)
     
     # Add sample data
     sample_players = [